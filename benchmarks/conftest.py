@@ -0,0 +1,59 @@
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from benchmarks.harness import BenchmarkReport
+from benchmarks.harness import load_baseline
+from dsp_permissions_scripts.testing.synthetic_project import SyntheticProjectConfig
+from dsp_permissions_scripts.utils import project
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("benchmarks")
+    group.addoption("--bench-resources", type=int, default=1_000, help="number of resources of the synthetic project")
+    group.addoption("--bench-seed", type=int, default=0, help="seed of the synthetic project")
+    group.addoption("--bench-json", type=Path, default=None, help="write the results into this JSON file")
+    group.addoption("--bench-no-memory", action="store_true", help="don't trace the peak memory (faster)")
+    group.addoption("--bench-baseline", type=Path, default=None, help="JSON file of a previous run to compare with")
+    group.addoption(
+        "--bench-threshold", type=float, default=1.3, help="maximum slowdown per object, compared to the baseline"
+    )
+
+
+@pytest.fixture(scope="session")
+def bench_config(request: pytest.FixtureRequest) -> SyntheticProjectConfig:
+    return SyntheticProjectConfig(
+        n_resources=request.config.getoption("--bench-resources"),
+        seed=request.config.getoption("--bench-seed"),
+    )
+
+
+@pytest.fixture(scope="session")
+def bench_report(request: pytest.FixtureRequest, bench_config: SyntheticProjectConfig) -> Iterator[BenchmarkReport]:
+    report = BenchmarkReport(bench_config, trace_memory=not request.config.getoption("--bench-no-memory"))
+    yield report
+    print(f"\n\n{report.summary()}")
+    if json_path := request.config.getoption("--bench-json"):
+        report.write(json_path)
+        print(f"Benchmark results written to {json_path}")
+
+
+@pytest.fixture(scope="session")
+def bench_baseline(request: pytest.FixtureRequest) -> dict[str, float]:
+    path: Path | None = request.config.getoption("--bench-baseline")
+    return load_baseline(path) if path else {}
+
+
+@pytest.fixture(scope="session")
+def bench_threshold(request: pytest.FixtureRequest) -> float:
+    threshold: float = request.config.getoption("--bench-threshold")
+    return threshold
+
+
+@pytest.fixture(autouse=True)
+def _clear_project_metadata_caches() -> Iterator[None]:
+    # every benchmark starts with a cold cache, like a new run of a script
+    project._caches.clear()
+    yield
+    project._caches.clear()
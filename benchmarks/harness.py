@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import platform
+import time
+import timeit
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from datetime import datetime
+from importlib.metadata import version
+from multiprocessing.queues import Queue
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Iterator
+from typing import TypeVar
+
+import requests
+
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeDspApi
+from dsp_permissions_scripts.testing.fake_dsp_api import FaultConfig
+from dsp_permissions_scripts.testing.synthetic_project import SyntheticProjectConfig
+from dsp_permissions_scripts.testing.synthetic_project import generate_synthetic_project
+from dsp_permissions_scripts.utils.helpers import PACKAGE_NAME
+
+T = TypeVar("T")
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    objects: int
+    seconds: float
+    requests: int = 0
+    peak_memory_mb: float | None = None
+
+    @property
+    def objects_per_second(self) -> float:
+        return self.objects / self.seconds if self.seconds else 0.0
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.requests / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self) | {
+            "objects_per_second": round(self.objects_per_second, 1),
+            "requests_per_second": round(self.requests_per_second, 1),
+        }
+
+
+@dataclass
+class BenchmarkReport:
+    """Collects the results of a benchmark session, and writes them into a JSON file that can be compared later."""
+
+    config: SyntheticProjectConfig
+    trace_memory: bool
+    results: list[BenchmarkResult] = field(default_factory=list)
+
+    def add(self, result: BenchmarkResult) -> None:
+        self.results.append(result)
+
+    def as_dict(self) -> dict[str, Any]:
+        metadata = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "package_version": version(PACKAGE_NAME),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            # tracing the memory slows down the code, so only results with the same setting are comparable
+            "memory_traced": self.trace_memory,
+            "synthetic_project": asdict(self.config),
+        }
+        return {"metadata": metadata, "results": [r.as_dict() for r in self.results]}
+
+    def write(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.as_dict(), indent=2), encoding="utf-8")
+
+    def summary(self) -> str:
+        lines = [f"{'benchmark':<44} {'objects':>9} {'seconds':>9} {'obj/s':>10} {'req/s':>9} {'peak MB':>9}"]
+        for r in self.results:
+            peak = f"{r.peak_memory_mb:.1f}" if r.peak_memory_mb is not None else "-"
+            lines.append(
+                f"{r.name:<44} {r.objects:>9} {r.seconds:>9.3f} {r.objects_per_second:>10.1f} "
+                f"{r.requests_per_second:>9.1f} {peak:>9}"
+            )
+        return "\n".join(lines)
+
+
+def _serve(config: SyntheticProjectConfig, faults: FaultConfig, url_queue: Queue[str]) -> None:
+    with FakeDspApi(projects=[generate_synthetic_project(config).fake_project], faults=faults) as api:
+        url_queue.put(api.url)
+        while True:
+            time.sleep(3600)
+
+
+@contextmanager
+def fake_api_in_subprocess(config: SyntheticProjectConfig, faults: FaultConfig | None = None) -> Iterator[str]:
+    """
+    Runs the fake DSP-API with a synthetic project in another process,
+    so that it doesn't compete with the benchmarked code for the GIL and doesn't count towards its memory.
+    Yields the URL of the server.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    url_queue: Queue[str] = ctx.Queue()
+    process = ctx.Process(target=_serve, args=(config, faults or FaultConfig(), url_queue), daemon=True)
+    process.start()
+    try:
+        yield url_queue.get(timeout=600)
+    finally:
+        process.terminate()
+        process.join()
+
+
+def get_request_count(server_url: str) -> int:
+    """Returns the number of requests the fake DSP-API has answered so far."""
+    counts: dict[str, int] = requests.get(f"{server_url}/fake/request-counts", timeout=10).json()
+    return sum(counts.values())
+
+
+def measure(
+    name: str,
+    func: Callable[[], T],
+    *,
+    count_objects: Callable[[T], int],
+    server_url: str | None = None,
+    trace_memory: bool = True,
+) -> tuple[BenchmarkResult, T]:
+    """
+    Runs func once, and measures its wall time, its peak memory (optional)
+    and the number of requests it sent to the fake DSP-API (if a server is given).
+    """
+    requests_before = get_request_count(server_url) if server_url else 0
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        output = func()
+        seconds = time.perf_counter() - start
+        peak_memory_mb = tracemalloc.get_traced_memory()[1] / 1024**2 if trace_memory else None
+    finally:
+        tracemalloc.stop()
+    nrequests = get_request_count(server_url) - requests_before if server_url else 0
+    result = BenchmarkResult(name, count_objects(output), seconds, nrequests, peak_memory_mb)
+    return result, output
+
+
+def measure_micro(name: str, func: Callable[[], object], *, calls_per_run: int, repeat: int = 15) -> BenchmarkResult:
+    """
+    Runs func several times, and keeps the fastest run,
+    because it is the one that was least disturbed by other processes.
+    """
+    func()  # warm up caches (e.g. the group registry, or pydantic's validators)
+    seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+    return BenchmarkResult(name, calls_per_run, seconds)
+
+
+def load_baseline(path: Path) -> dict[str, float]:
+    """Reads a JSON file written by BenchmarkReport, and returns the seconds per object of every benchmark."""
+    content = json.loads(path.read_text(encoding="utf-8"))
+    return {r["name"]: r["seconds"] / r["objects"] for r in content["results"] if r["objects"]}
+
+
+def assert_no_regression(result: BenchmarkResult, baseline: dict[str, float], threshold: float) -> None:
+    """Fails if the result is more than threshold times slower (per object) than in the baseline."""
+    if (seconds_per_object := baseline.get(result.name)) is None:
+        return
+    slowdown = result.seconds / result.objects / seconds_per_object
+    assert slowdown <= threshold, f"{result.name} is {slowdown:.2f}x slower than the baseline (threshold {threshold}x)"
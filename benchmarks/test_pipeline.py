@@ -0,0 +1,184 @@
+"""
+End-to-end benchmarks of the stages of the template pipeline,
+against the fake DSP-API (in another process) serving a synthetic project.
+
+Run them with e.g.:
+    pytest benchmarks/test_pipeline.py -s --bench-resources 10000 --bench-json bench/results.json
+"""
+
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from benchmarks.harness import BenchmarkReport
+from benchmarks.harness import fake_api_in_subprocess
+from benchmarks.harness import measure
+from dsp_permissions_scripts.ap.ap_batch import ApOperation
+from dsp_permissions_scripts.ap.ap_batch import UpdateAp
+from dsp_permissions_scripts.ap.ap_batch import execute_ap_operations
+from dsp_permissions_scripts.ap.ap_get import get_aps_of_project
+from dsp_permissions_scripts.ap.ap_model import ApValue
+from dsp_permissions_scripts.doap.doap_get import get_doaps_of_project
+from dsp_permissions_scripts.doap.doap_set import apply_updated_scopes_of_doaps_on_server
+from dsp_permissions_scripts.models.scope import PUBLIC
+from dsp_permissions_scripts.oap.oap_get import get_all_oaps_of_project
+from dsp_permissions_scripts.oap.oap_model import ModifiedOap
+from dsp_permissions_scripts.oap.oap_model import Oap
+from dsp_permissions_scripts.oap.oap_model import OapRetrieveConfig
+from dsp_permissions_scripts.oap.oap_serialize import deserialize_oaps
+from dsp_permissions_scripts.oap.oap_serialize import serialize_oaps
+from dsp_permissions_scripts.oap.oap_set import apply_updated_oaps_on_server
+from dsp_permissions_scripts.testing.synthetic_project import SyntheticProjectConfig
+from dsp_permissions_scripts.testing.synthetic_project import generate_synthetic_project
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+from dsp_permissions_scripts.utils.scope_serialization import create_scope_from_string
+from dsp_permissions_scripts.utils.scope_serialization import create_string_from_scope
+
+
+def _login(server_url: str) -> DspClient:
+    dsp_client = DspClient(server_url)
+    dsp_client.login("root@example.com", "test")
+    return dsp_client
+
+
+def _count_oaps(oaps: list[Oap]) -> int:
+    """Every resource and every value counts as one object"""
+    return sum(1 + len(oap.value_oaps) for oap in oaps)
+
+
+@pytest.fixture(scope="module")
+def server_url(bench_config: SyntheticProjectConfig) -> Iterator[str]:
+    """A server for the benchmarks that don't modify anything"""
+    with fake_api_in_subprocess(bench_config) as url:
+        yield url
+
+
+def test_get_all_oaps_of_project(
+    server_url: str, bench_config: SyntheticProjectConfig, bench_report: BenchmarkReport
+) -> None:
+    dsp_client = _login(server_url)
+    oap_config = OapRetrieveConfig(retrieve_resources="all", retrieve_values="all")
+    result, oaps = measure(
+        "get_all_oaps_of_project",
+        lambda: get_all_oaps_of_project(bench_config.shortcode, dsp_client, oap_config),
+        count_objects=_count_oaps,
+        server_url=server_url,
+        trace_memory=bench_report.trace_memory,
+    )
+    bench_report.add(result)
+    assert len(oaps) == bench_config.n_resources
+
+
+def test_serialize_and_deserialize_oaps(
+    bench_config: SyntheticProjectConfig,
+    bench_report: BenchmarkReport,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    oaps = list(generate_synthetic_project(bench_config).iter_oaps())
+    nobjects = _count_oaps(oaps)
+    result, _ = measure(
+        "serialize_oaps",
+        lambda: serialize_oaps(oaps, bench_config.shortcode, "original"),
+        count_objects=lambda _: nobjects,
+        trace_memory=bench_report.trace_memory,
+    )
+    bench_report.add(result)
+    result, deserialized = measure(
+        "deserialize_oaps",
+        lambda: deserialize_oaps(bench_config.shortcode, "original"),
+        count_objects=_count_oaps,
+        trace_memory=bench_report.trace_memory,
+    )
+    bench_report.add(result)
+    assert len(deserialized) == len(oaps)
+
+
+def test_scope_parsing_and_serialization(bench_config: SyntheticProjectConfig, bench_report: BenchmarkReport) -> None:
+    fake_project = generate_synthetic_project(bench_config).fake_project
+    perm_strings = [r.permissions for r in fake_project.resources.values()]
+    perm_strings += [v.permissions for r in fake_project.resources.values() for v in r.values]
+    dsp_client = DspClient("http://0.0.0.0:3333")  # only prefixed IRIs, so no request is made
+    result, scopes = measure(
+        "create_scope_from_string",
+        lambda: [create_scope_from_string(s, dsp_client) for s in perm_strings],
+        count_objects=len,
+        trace_memory=bench_report.trace_memory,
+    )
+    bench_report.add(result)
+    result, serialized = measure(
+        "create_string_from_scope",
+        lambda: [create_string_from_scope(s) for s in scopes],
+        count_objects=len,
+        trace_memory=bench_report.trace_memory,
+    )
+    bench_report.add(result)
+    # sort_groups() only orders custom groups by their first letter, so the strings may differ in the group order
+    assert [create_scope_from_string(s, dsp_client) for s in serialized] == scopes
+
+
+def test_apply_updated_oaps_on_server(bench_config: SyntheticProjectConfig, bench_report: BenchmarkReport) -> None:
+    modified_oaps = [
+        ModifiedOap(
+            resource_oap=oap.resource_oap.model_copy(update={"scope": PUBLIC}),
+            value_oaps=[v.model_copy(update={"scope": PUBLIC}) for v in oap.value_oaps],
+        )
+        for oap in generate_synthetic_project(bench_config).iter_oaps()
+    ]
+    nobjects = sum(1 + len(oap.value_oaps) for oap in modified_oaps)
+    with fake_api_in_subprocess(bench_config) as url:
+        dsp_client = _login(url)
+        result, _ = measure(
+            "apply_updated_oaps_on_server",
+            lambda: apply_updated_oaps_on_server(modified_oaps, bench_config.shortcode, dsp_client, nthreads=4),
+            count_objects=lambda _: nobjects,
+            server_url=url,
+            trace_memory=bench_report.trace_memory,
+        )
+    bench_report.add(result)
+
+
+def test_doaps_and_aps(bench_config: SyntheticProjectConfig, bench_report: BenchmarkReport) -> None:
+    with fake_api_in_subprocess(bench_config) as url:
+        dsp_client = _login(url)
+        result, doaps = measure(
+            "get_doaps_of_project",
+            lambda: get_doaps_of_project(bench_config.shortcode, dsp_client),
+            count_objects=len,
+            server_url=url,
+            trace_memory=bench_report.trace_memory,
+        )
+        bench_report.add(result)
+        modified_doaps = [d.model_copy(update={"scope": PUBLIC}) for d in doaps]
+        result, failed_doaps = measure(
+            "apply_updated_scopes_of_doaps_on_server",
+            lambda: apply_updated_scopes_of_doaps_on_server(modified_doaps, dsp_client),
+            count_objects=lambda _: len(modified_doaps),
+            server_url=url,
+            trace_memory=bench_report.trace_memory,
+        )
+        bench_report.add(result)
+        result, aps = measure(
+            "get_aps_of_project",
+            lambda: get_aps_of_project(bench_config.shortcode, dsp_client),
+            count_objects=len,
+            server_url=url,
+            trace_memory=bench_report.trace_memory,
+        )
+        bench_report.add(result)
+        new_ap_value = ApValue.ProjectAdminRightsAllPermission
+        operations: list[ApOperation] = [
+            UpdateAp(ap.model_copy(update={"hasPermissions": ap.hasPermissions | {new_ap_value}})) for ap in aps
+        ]
+        result, ap_results = measure(
+            "execute_ap_operations",
+            lambda: execute_ap_operations(operations, bench_config.shortcode, dsp_client),
+            count_objects=len,
+            server_url=url,
+            trace_memory=bench_report.trace_memory,
+        )
+        bench_report.add(result)
+    assert not failed_doaps
+    assert all(r.success for r in ap_results)
@@ -0,0 +1,144 @@
+"""
+Micro-benchmarks of the scope functions that run once per object in every stage of the pipeline.
+The fixtures are fixed (and don't depend on --bench-resources), so that the results of different runs are comparable.
+
+Record a baseline, and compare later runs with it (e.g. after a pydantic upgrade):
+    pytest benchmarks/test_scope_micro.py -s --bench-json bench/micro.json
+    pytest benchmarks/test_scope_micro.py -s --bench-baseline bench/micro.json --bench-threshold 1.3
+"""
+
+from typing import Callable
+from unittest.mock import Mock
+
+import pytest
+
+from benchmarks.harness import BenchmarkReport
+from benchmarks.harness import assert_no_regression
+from benchmarks.harness import measure_micro
+from dsp_permissions_scripts.models.group import group_builder
+from dsp_permissions_scripts.models.group_utils import GroupRegistry
+from dsp_permissions_scripts.models.group_utils import sort_groups
+from dsp_permissions_scripts.models.scope import PermissionScope
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+from dsp_permissions_scripts.utils.helpers import KNORA_ADMIN_ONTO_NAMESPACE
+from dsp_permissions_scripts.utils.scope_serialization import create_scope_from_admin_route_object
+from dsp_permissions_scripts.utils.scope_serialization import create_scope_from_string
+from dsp_permissions_scripts.utils.scope_serialization import create_string_from_scope
+
+REPETITIONS = 200
+"""How many times the fixtures are processed in one run"""
+
+PERMISSION_STRINGS = [
+    "CR knora-admin:ProjectAdmin|D knora-admin:ProjectMember|V knora-admin:KnownUser,knora-admin:UnknownUser",
+    "CR knora-admin:Creator,knora-admin:ProjectAdmin|M bench:editors|RV knora-admin:UnknownUser",
+    "CR knora-admin:ProjectAdmin|D bench:editors|V knora-admin:ProjectMember,bench:reviewers",
+    "CR knora-admin:SystemAdmin,knora-admin:ProjectAdmin|M knora-admin:ProjectMember,bench:archivists",
+    "CR knora-admin:ProjectAdmin",
+]
+GROUPS = [
+    {"id": f"http://rdfh.ch/groups/4123/{name}", "name": name, "project": {"shortname": "bench"}}
+    for name in ["editors", "reviewers", "archivists"]
+]
+
+
+def _to_full_iri(prefixed_iri: str) -> str:
+    prefix, name = prefixed_iri.split(":")
+    return f"{KNORA_ADMIN_ONTO_NAMESPACE}{name}" if prefix == "knora-admin" else f"http://rdfh.ch/groups/4123/{name}"
+
+
+def _to_dict(perm_string: str) -> dict[str, list[str]]:
+    return {letter: groups.split(",") for letter, groups in (s.split(" ") for s in perm_string.split("|"))}
+
+
+PERMISSION_DICTS = [_to_dict(s) for s in PERMISSION_STRINGS]
+ADMIN_ROUTE_OBJECTS = [
+    [{"name": k, "additionalInformation": _to_full_iri(g), "permissionCode": None} for k, gs in d.items() for g in gs]
+    for d in PERMISSION_DICTS
+]
+PREFIXED_GROUP_IRIS = sorted({g for d in PERMISSION_DICTS for gs in d.values() for g in gs})
+
+
+@pytest.fixture(scope="module")
+def dsp_client() -> DspClient:
+    # the groups are the only thing that is ever fetched, and the registry fetches them only once
+    return Mock(spec=DspClient, server="http://0.0.0.0:3333", get=Mock(return_value={"groups": GROUPS}))
+
+
+@pytest.fixture(scope="module")
+def group_registry(dsp_client: DspClient) -> GroupRegistry:
+    return GroupRegistry(dsp_client)
+
+
+RunMicro = Callable[[str, Callable[[], object], int], None]
+
+
+@pytest.fixture
+def run_micro(bench_report: BenchmarkReport, bench_baseline: dict[str, float], bench_threshold: float) -> RunMicro:
+    """Returns a function that benchmarks func, adds the result to the report, and compares it with the baseline"""
+
+    def run(name: str, func: Callable[[], object], calls_per_repetition: int) -> None:
+        def repeated() -> None:
+            for _ in range(REPETITIONS):
+                func()
+
+        result = measure_micro(f"micro:{name}", repeated, calls_per_run=REPETITIONS * calls_per_repetition)
+        bench_report.add(result)
+        assert_no_regression(result, bench_baseline, bench_threshold)
+
+    return run
+
+
+def test_create_scope_from_string(dsp_client: DspClient, run_micro: RunMicro) -> None:
+    def func() -> None:
+        for s in PERMISSION_STRINGS:
+            create_scope_from_string(s, dsp_client)
+
+    run_micro("create_scope_from_string", func, len(PERMISSION_STRINGS))
+
+
+def test_create_string_from_scope(dsp_client: DspClient, run_micro: RunMicro) -> None:
+    scopes = [create_scope_from_string(s, dsp_client) for s in PERMISSION_STRINGS]
+
+    def func() -> None:
+        for scope in scopes:
+            create_string_from_scope(scope)
+
+    run_micro("create_string_from_scope", func, len(scopes))
+    assert [create_string_from_scope(s) for s in scopes] == PERMISSION_STRINGS
+
+
+def test_create_scope_from_admin_route_object(
+    dsp_client: DspClient, group_registry: GroupRegistry, run_micro: RunMicro
+) -> None:
+    def func() -> None:
+        for obj in ADMIN_ROUTE_OBJECTS:
+            create_scope_from_admin_route_object(obj, dsp_client, group_registry)
+
+    run_micro("create_scope_from_admin_route_object", func, len(ADMIN_ROUTE_OBJECTS))
+    parsed = [create_scope_from_admin_route_object(obj, dsp_client, group_registry) for obj in ADMIN_ROUTE_OBJECTS]
+    assert parsed == [create_scope_from_string(s, dsp_client) for s in PERMISSION_STRINGS]
+
+
+def test_permission_scope_from_dict(dsp_client: DspClient, run_micro: RunMicro) -> None:
+    def func() -> None:
+        for d in PERMISSION_DICTS:
+            PermissionScope.from_dict(d, dsp_client)
+
+    run_micro("PermissionScope.from_dict", func, len(PERMISSION_DICTS))
+
+
+def test_sort_groups(run_micro: RunMicro) -> None:
+    groups = [group_builder(iri) for iri in reversed(PREFIXED_GROUP_IRIS)]
+
+    def func() -> None:
+        sort_groups(groups)
+
+    run_micro("sort_groups", func, len(groups))
+
+
+def test_group_builder(run_micro: RunMicro) -> None:
+    def func() -> None:
+        for iri in PREFIXED_GROUP_IRIS:
+            group_builder(iri)
+
+    run_micro("group_builder", func, len(PREFIXED_GROUP_IRIS))
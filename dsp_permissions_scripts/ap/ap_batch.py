@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+from dsp_permissions_scripts.ap.ap_delete import delete_ap_on_server
+from dsp_permissions_scripts.ap.ap_get import create_admin_route_object_for_new_ap
+from dsp_permissions_scripts.ap.ap_get import create_ap_from_admin_route_object
+from dsp_permissions_scripts.ap.ap_model import Ap
+from dsp_permissions_scripts.ap.ap_model import ApValue
+from dsp_permissions_scripts.ap.ap_set import update_ap_scope_on_server
+from dsp_permissions_scripts.models.errors import ApiError
+from dsp_permissions_scripts.models.errors import InvalidGroupError
+from dsp_permissions_scripts.models.errors import InvalidIRIError
+from dsp_permissions_scripts.models.group import Group
+from dsp_permissions_scripts.models.group_utils import GroupRegistry
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+from dsp_permissions_scripts.utils.get_logger import get_logger
+from dsp_permissions_scripts.utils.project import get_proj_iri_and_onto_iris_by_shortcode
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class CreateAp:
+    """Create a new Administrative Permission for a group of the project"""
+
+    forGroup: Group
+    hasPermissions: tuple[ApValue, ...]
+
+
+@dataclass(frozen=True)
+class UpdateAp:
+    """Overwrite the permissions of an existing Administrative Permission with ap.hasPermissions"""
+
+    ap: Ap
+
+
+@dataclass(frozen=True)
+class DeleteAp:
+    """Delete an existing Administrative Permission"""
+
+    ap: Ap
+
+
+ApOperation = CreateAp | UpdateAp | DeleteAp
+
+
+@dataclass(frozen=True)
+class ApOperationResult:
+    """
+    Outcome of one AP operation.
+
+    Attributes:
+        operation: the operation that was executed
+        ap: the AP as returned by the server (None for deletions and for failed operations)
+        err_msg: the reason of the failure, or None if the operation succeeded
+    """
+
+    operation: ApOperation
+    ap: Ap | None = None
+    err_msg: str | None = None
+
+    @property
+    def success(self) -> bool:
+        return self.err_msg is None
+
+
+@dataclass(frozen=True)
+class _BatchContext:
+    project_iri: str | None
+    dsp_client: DspClient
+    group_registry: GroupRegistry
+
+
+def _execute_operation(operation: ApOperation, ctx: _BatchContext) -> ApOperationResult:
+    try:
+        match operation:
+            case CreateAp():
+                ap = _create_ap(operation, ctx)
+                logger.info(f"Successfully created new AP for group {operation.forGroup.prefixed_iri}")
+                return ApOperationResult(operation, ap=ap)
+            case UpdateAp():
+                ap = update_ap_scope_on_server(operation.ap, ctx.dsp_client, ctx.group_registry)
+                logger.info(f"Successfully updated AP {operation.ap.iri}")
+                return ApOperationResult(operation, ap=ap)
+            case DeleteAp():
+                delete_ap_on_server(operation.ap, ctx.dsp_client)
+                logger.info(f"Deleted Administrative Permission {operation.ap.iri}")
+                return ApOperationResult(operation)
+    except (ApiError, InvalidGroupError, InvalidIRIError) as err:
+        logger.error(f"AP operation {operation} failed: {err}")
+        return ApOperationResult(operation, err_msg=err.message)
+
+
+def _create_ap(operation: CreateAp, ctx: _BatchContext) -> Ap:
+    group_iri = ctx.group_registry.get_full_iri(operation.forGroup.prefixed_iri)
+    payload = create_admin_route_object_for_new_ap(group_iri, ctx.project_iri, operation.hasPermissions)
+    try:
+        response = ctx.dsp_client.post("/admin/permissions/ap", data=payload)
+    except ApiError as err:
+        err.message = f"Could not create new AP for group {operation.forGroup.prefixed_iri}"
+        raise err from None
+    return create_ap_from_admin_route_object(response["administrative_permission"], ctx.dsp_client, ctx.group_registry)
+
+
+def execute_ap_operations(
+    operations: list[ApOperation],
+    shortcode: str,
+    dsp_client: DspClient,
+    nthreads: int = 4,
+) -> list[ApOperationResult]:
+    """
+    Executes creations, updates and deletions of Administrative Permissions of a project,
+    with at most nthreads requests in parallel.
+    The project IRI and the group IRIs are resolved only once for the whole batch.
+    The operations must be independent of each other, because their order of execution is not guaranteed.
+
+    Args:
+        operations: the operations to execute
+        shortcode: shortcode of the project the APs belong to
+        dsp_client: client to access the DSP server
+        nthreads: maximum number of parallel requests
+
+    Returns:
+        one result per operation, in the same order as the operations
+    """
+    if not operations:
+        logger.warning(f"There are no AP operations to execute on {dsp_client.server}")
+        return []
+    logger.info(f"****** Executing {len(operations)} AP operations on {dsp_client.server}... ******")
+    project_iri = None
+    if any(isinstance(op, CreateAp) for op in operations):
+        project_iri, _ = get_proj_iri_and_onto_iris_by_shortcode(shortcode, dsp_client)
+    ctx = _BatchContext(project_iri=project_iri, dsp_client=dsp_client, group_registry=GroupRegistry(dsp_client))
+    with ThreadPoolExecutor(max_workers=nthreads) as pool:
+        results = list(pool.map(partial(_execute_operation, ctx=ctx), operations))
+    if failed := [r for r in results if not r.success]:
+        logger.error(f"{len(failed)} of {len(operations)} AP operations failed on {dsp_client.server}")
+    else:
+        logger.info(f"Finished executing {len(operations)} AP operations on {dsp_client.server}")
+    return results
@@ -9,7 +9,7 @@ from dsp_permissions_scripts.utils.get_logger import get_logger
 logger = get_logger(__name__)
 
 
-def _delete_ap_on_server(ap: Ap, dsp_client: DspClient) -> None:
+def delete_ap_on_server(ap: Ap, dsp_client: DspClient) -> None:
     ap_iri = quote_plus(ap.iri, safe="")
     try:
         dsp_client.delete(f"/admin/permissions/{ap_iri}")
@@ -29,7 +29,7 @@ def delete_ap_of_group_on_server(
         return existing_aps
     logger.info(f"Deleting the Administrative Permissions for group {forGroup} on server {dsp_client.server}")
     for ap in aps_to_delete:
-        _delete_ap_on_server(ap, dsp_client)
+        delete_ap_on_server(ap, dsp_client)
         existing_aps.remove(ap)
         logger.info(f"Deleted Administrative Permission {ap.iri}")
     return existing_aps
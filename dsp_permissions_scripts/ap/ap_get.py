@@ -1,10 +1,12 @@
 from typing import Any
+from typing import Iterable
 from urllib.parse import quote_plus
 
 from dsp_permissions_scripts.ap.ap_model import Ap
 from dsp_permissions_scripts.ap.ap_model import ApValue
 from dsp_permissions_scripts.models.errors import ApiError
 from dsp_permissions_scripts.models.group import group_builder
+from dsp_permissions_scripts.models.group_utils import GroupRegistry
 from dsp_permissions_scripts.models.group_utils import get_prefixed_iri_from_full_iri
 from dsp_permissions_scripts.utils.dsp_client import DspClient
 from dsp_permissions_scripts.utils.get_logger import get_logger
@@ -13,9 +15,14 @@ from dsp_permissions_scripts.utils.project import get_proj_iri_and_onto_iris_by_
 logger = get_logger(__name__)
 
 
-def create_ap_from_admin_route_object(permission: dict[str, Any], dsp_client: DspClient) -> Ap:
+def create_ap_from_admin_route_object(
+    permission: dict[str, Any], dsp_client: DspClient, group_registry: GroupRegistry | None = None
+) -> Ap:
     """Deserializes a AP from JSON as returned by /admin/permissions/ap/{project_iri}"""
-    prefixed_group_iri = get_prefixed_iri_from_full_iri(permission["forGroup"], dsp_client)
+    if group_registry:
+        prefixed_group_iri = group_registry.get_prefixed_iri(permission["forGroup"])
+    else:
+        prefixed_group_iri = get_prefixed_iri_from_full_iri(permission["forGroup"], dsp_client)
     ap = Ap(
         forGroup=group_builder(prefixed_group_iri),
         forProject=permission["forProject"],
@@ -25,21 +32,35 @@ def create_ap_from_admin_route_object(permission: dict[str, Any], dsp_client: Ds
     return ap
 
 
+def _create_admin_route_object_from_ap_values(ap_values: Iterable[ApValue]) -> list[dict[str, Any]]:
+    return [{"additionalInformation": None, "name": p.value, "permissionCode": None} for p in ap_values]
+
+
 def create_admin_route_object_from_ap(ap: Ap) -> dict[str, Any]:
     """Serializes a AP to JSON as expected by /admin/permissions/ap/{project_iri}"""
-    has_permissions = [
-        {"additionalInformation": None, "name": p.value, "permissionCode": None} for p in ap.hasPermissions
-    ]
     ap_dict = {
         "forGroup": ap.forGroup,
         "forProject": ap.forProject,
-        "hasPermissions": has_permissions,
+        "hasPermissions": _create_admin_route_object_from_ap_values(ap.hasPermissions),
         "iri": ap.iri,
     }
     return ap_dict
 
 
-def _get_all_aps_of_project(project_iri: str, dsp_client: DspClient) -> list[Ap]:
+def create_admin_route_object_for_new_ap(
+    group_iri: str, project_iri: str | None, hasPermissions: Iterable[ApValue]
+) -> dict[str, Any]:
+    """Serializes a new AP (with the full IRIs of its group and project) as expected by POST /admin/permissions/ap"""
+    return {
+        "forGroup": group_iri,
+        "forProject": project_iri,
+        "hasPermissions": _create_admin_route_object_from_ap_values(hasPermissions),
+    }
+
+
+def _get_all_aps_of_project(
+    project_iri: str, dsp_client: DspClient, group_registry: GroupRegistry | None = None
+) -> list[Ap]:
     project_iri = quote_plus(project_iri, safe="")
     try:
         response = dsp_client.get(f"/admin/permissions/ap/{project_iri}")
@@ -47,14 +68,17 @@ def _get_all_aps_of_project(project_iri: str, dsp_client: DspClient) -> list[Ap]
         err.message = f"Could not get APs of project {project_iri}"
         raise err from None
     aps: list[dict[str, Any]] = response["administrative_permissions"]
-    ap_objects = [create_ap_from_admin_route_object(ap, dsp_client) for ap in aps]
+    ap_objects = [create_ap_from_admin_route_object(ap, dsp_client, group_registry) for ap in aps]
     return ap_objects
 
 
-def get_aps_of_project(shortcode: str, dsp_client: DspClient) -> list[Ap]:
-    """Returns the Administrative Permissions for a project."""
+def get_aps_of_project(shortcode: str, dsp_client: DspClient, group_registry: GroupRegistry | None = None) -> list[Ap]:
+    """
+    Returns the Administrative Permissions for a project.
+    If the APs of many projects are retrieved, pass a shared group registry, so that the groups are fetched only once.
+    """
     logger.info("****** Retrieving all Administrative Permissions... ******")
     project_iri, _ = get_proj_iri_and_onto_iris_by_shortcode(shortcode, dsp_client)
-    aps = _get_all_aps_of_project(project_iri, dsp_client)
+    aps = _get_all_aps_of_project(project_iri, dsp_client, group_registry)
     logger.info(f"Retrieved {len(aps)} Administrative Permissions")
     return aps
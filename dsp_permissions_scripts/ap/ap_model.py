@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Self
 
 from pydantic import BaseModel
 from pydantic import ConfigDict
@@ -40,3 +41,15 @@ class Ap(BaseModel):
         if permission not in self.hasPermissions:
             raise ValueError(f"Permission {permission} is not in the AP")
         self.hasPermissions = self.hasPermissions.difference({permission})
+
+    def with_permission_added(self, permission: ApValue) -> Self:
+        """Returns a copy of the AP with the permission added (the AP itself is not changed)"""
+        if permission in self.hasPermissions:
+            raise ValueError(f"Permission {permission} is already in the AP")
+        return self.model_copy(update={"hasPermissions": self.hasPermissions.union({permission})})
+
+    def with_permission_removed(self, permission: ApValue) -> Self:
+        """Returns a copy of the AP without the permission (the AP itself is not changed)"""
+        if permission not in self.hasPermissions:
+            raise ValueError(f"Permission {permission} is not in the AP")
+        return self.model_copy(update={"hasPermissions": self.hasPermissions.difference({permission})})
@@ -1,8 +1,8 @@
-import json
 from pathlib import Path
 from typing import Literal
 
 from dsp_permissions_scripts.ap.ap_model import Ap
+from dsp_permissions_scripts.utils import json_codec
 from dsp_permissions_scripts.utils.get_logger import get_logger
 from dsp_permissions_scripts.utils.get_logger import get_timestamp
 
@@ -25,8 +25,7 @@ def serialize_aps_of_project(
     explanation_string = f"{get_timestamp()}: Project {shortcode} on server {server} has {len(project_aps)} APs"
     aps_as_dicts = [ap.model_dump(exclude_none=True, mode="json") for ap in project_aps]
     aps_as_dict = {explanation_string: aps_as_dicts}
-    with open(filepath, mode="w", encoding="utf-8") as f:
-        f.write(json.dumps(aps_as_dict, ensure_ascii=False, indent=2))
+    filepath.write_bytes(json_codec.dumps(aps_as_dict, indent=True))
     logger.info(f"{len(project_aps)} APs have been written to file {filepath}")
 
 
@@ -36,7 +35,6 @@ def deserialize_aps_of_project(
 ) -> list[Ap]:
     """Deserialize the APs of a project from a JSON file."""
     filepath = _get_file_path(shortcode, mode)
-    with open(filepath, mode="r", encoding="utf-8") as f:
-        aps_as_dict = json.load(f)
+    aps_as_dict = json_codec.loads(filepath.read_bytes())
     aps_as_dicts = next(iter(aps_as_dict.values()))
     return [Ap.model_validate(d) for d in aps_as_dicts]
@@ -1,12 +1,14 @@
 from typing import Any
 from urllib.parse import quote_plus
 
+from dsp_permissions_scripts.ap.ap_get import create_admin_route_object_for_new_ap
 from dsp_permissions_scripts.ap.ap_get import create_admin_route_object_from_ap
 from dsp_permissions_scripts.ap.ap_get import create_ap_from_admin_route_object
 from dsp_permissions_scripts.ap.ap_model import Ap
 from dsp_permissions_scripts.ap.ap_model import ApValue
 from dsp_permissions_scripts.models.errors import ApiError
 from dsp_permissions_scripts.models.group import Group
+from dsp_permissions_scripts.models.group_utils import GroupRegistry
 from dsp_permissions_scripts.models.group_utils import get_full_iri_from_prefixed_iri
 from dsp_permissions_scripts.utils.dsp_client import DspClient
 from dsp_permissions_scripts.utils.get_logger import get_logger
@@ -15,7 +17,7 @@ from dsp_permissions_scripts.utils.project import get_proj_iri_and_onto_iris_by_
 logger = get_logger(__name__)
 
 
-def _update_ap_scope_on_server(ap: Ap, dsp_client: DspClient) -> Ap:
+def update_ap_scope_on_server(ap: Ap, dsp_client: DspClient, group_registry: GroupRegistry | None = None) -> Ap:
     iri = quote_plus(ap.iri, safe="")
     payload = {"hasPermissions": create_admin_route_object_from_ap(ap)["hasPermissions"]}
     try:
@@ -24,7 +26,7 @@ def _update_ap_scope_on_server(ap: Ap, dsp_client: DspClient) -> Ap:
         err.message = f"Could not update scope of Administrative Permission {ap.iri}"
         raise err from None
     ap_updated: dict[str, Any] = response["administrative_permission"]
-    ap_object_updated = create_ap_from_admin_route_object(ap_updated, dsp_client)
+    ap_object_updated = create_ap_from_admin_route_object(ap_updated, dsp_client, group_registry)
     return ap_object_updated
 
 
@@ -35,7 +37,7 @@ def apply_updated_scopes_of_aps_on_server(aps: list[Ap], dsp_client: DspClient)
     logger.info(f"****** Updating scopes of {len(aps)} Administrative Permissions on {dsp_client.server}... ******")
     for ap in aps:
         try:
-            _ = _update_ap_scope_on_server(ap, dsp_client)
+            _ = update_ap_scope_on_server(ap, dsp_client)
             logger.info(f"Successfully updated AP {ap.iri}")
         except ApiError as err:
             logger.error(err)
@@ -49,13 +51,8 @@ def create_new_ap_on_server(
     dsp_client: DspClient,
 ) -> Ap | None:
     proj_iri, _ = get_proj_iri_and_onto_iris_by_shortcode(shortcode, dsp_client)
-    payload = {
-        "forGroup": get_full_iri_from_prefixed_iri(forGroup.prefixed_iri, dsp_client),
-        "forProject": proj_iri,
-        "hasPermissions": [
-            {"additionalInformation": None, "name": ap_val.value, "permissionCode": None} for ap_val in hasPermissions
-        ],
-    }
+    group_iri = get_full_iri_from_prefixed_iri(forGroup.prefixed_iri, dsp_client)
+    payload = create_admin_route_object_for_new_ap(group_iri, proj_iri, hasPermissions)
     try:
         response = dsp_client.post("/admin/permissions/ap", data=payload)
         logger.info(f"Successfully created new AP for group {forGroup.prefixed_iri}")
@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from urllib.parse import quote_plus
 
 from dsp_permissions_scripts.doap.doap_model import Doap
@@ -19,11 +21,30 @@ def _delete_doap_on_server(doap: Doap, dsp_client: DspClient) -> None:
         raise err from None
 
 
+def delete_one_doap(doap: Doap, dsp_client: DspClient) -> bool:
+    """Deletes one DOAP, and returns whether it succeeded."""
+    try:
+        _delete_doap_on_server(doap, dsp_client)
+    except ApiError as err:
+        logger.error(err)
+        return False
+    logger.info(f"Deleted DOAP {doap.doap_iri}")
+    return True
+
+
 def delete_doap_of_group_on_server(
     existing_doaps: list[Doap],
     forGroup: Group,
     dsp_client: DspClient,
+    nthreads: int = 4,
 ) -> list[Doap]:
+    """
+    Deletes the DOAPs of a group, with at most nthreads requests in parallel.
+    DOAPs that could not be deleted are logged, and remain in the returned list.
+
+    Returns:
+        the DOAPs that still exist on the server
+    """
     doaps_to_delete = [
         doap for doap in existing_doaps if isinstance(doap.target, GroupDoapTarget) and doap.target.group == forGroup
     ]
@@ -31,8 +52,13 @@ def delete_doap_of_group_on_server(
         logger.warning(f"There are no DOAPs to delete on {dsp_client.server} for group {forGroup}")
         return existing_doaps
     logger.info(f"Deleting the DOAP for group {forGroup} on server {dsp_client.server}")
-    for doap in doaps_to_delete:
-        _delete_doap_on_server(doap, dsp_client)
-        existing_doaps.remove(doap)
-        logger.info(f"Deleted DOAP {doap.doap_iri}")
+    with ThreadPoolExecutor(max_workers=nthreads) as pool:
+        successes = list(pool.map(partial(delete_one_doap, dsp_client=dsp_client), doaps_to_delete))
+    for doap, success in zip(doaps_to_delete, successes):
+        if success:
+            existing_doaps.remove(doap)
+    if not all(successes):
+        logger.error(
+            f"{successes.count(False)} of {len(doaps_to_delete)} DOAPs of group {forGroup} could not be deleted"
+        )
     return existing_doaps
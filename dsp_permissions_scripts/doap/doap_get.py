@@ -6,6 +6,7 @@ from dsp_permissions_scripts.doap.doap_model import EntityDoapTarget
 from dsp_permissions_scripts.doap.doap_model import GroupDoapTarget
 from dsp_permissions_scripts.models.errors import ApiError
 from dsp_permissions_scripts.models.group import group_builder
+from dsp_permissions_scripts.models.group_utils import GroupRegistry
 from dsp_permissions_scripts.models.group_utils import get_prefixed_iri_from_full_iri
 from dsp_permissions_scripts.utils.dsp_client import DspClient
 from dsp_permissions_scripts.utils.get_logger import get_logger
@@ -15,7 +16,9 @@ from dsp_permissions_scripts.utils.scope_serialization import create_scope_from_
 logger = get_logger(__name__)
 
 
-def _get_all_doaps_of_project(project_iri: str, dsp_client: DspClient) -> list[Doap]:
+def get_all_doaps_of_project(
+    project_iri: str, dsp_client: DspClient, group_registry: GroupRegistry | None = None
+) -> list[Doap]:
     project_iri = quote_plus(project_iri, safe="")
     try:
         response = dsp_client.get(f"/admin/permissions/doap/{project_iri}")
@@ -23,17 +26,22 @@ def _get_all_doaps_of_project(project_iri: str, dsp_client: DspClient) -> list[D
         err.message = f"Error while getting DOAPs of project {project_iri}"
         raise err from None
     doaps: list[dict[str, Any]] = response["default_object_access_permissions"]
-    doap_objects = [create_doap_from_admin_route_response(doap, dsp_client) for doap in doaps]
+    doap_objects = [create_doap_from_admin_route_response(doap, dsp_client, group_registry) for doap in doaps]
     return doap_objects
 
 
-def create_doap_from_admin_route_response(permission: dict[str, Any], dsp_client: DspClient) -> Doap:
+def create_doap_from_admin_route_response(
+    permission: dict[str, Any], dsp_client: DspClient, group_registry: GroupRegistry | None = None
+) -> Doap:
     """Deserializes a DOAP from JSON as returned by /admin/permissions/doap/{project_iri}"""
-    scope = create_scope_from_admin_route_object(permission["hasPermissions"], dsp_client)
+    scope = create_scope_from_admin_route_object(permission["hasPermissions"], dsp_client, group_registry)
     target: GroupDoapTarget | EntityDoapTarget
     match permission:
         case {"forProject": project_iri, "forGroup": group}:
-            prefixed_group_iri = get_prefixed_iri_from_full_iri(group, dsp_client)
+            if group_registry:
+                prefixed_group_iri = group_registry.get_prefixed_iri(group)
+            else:
+                prefixed_group_iri = get_prefixed_iri_from_full_iri(group, dsp_client)
             target = GroupDoapTarget(project_iri=project_iri, group=group_builder(prefixed_group_iri))
         case {"forProject": project_iri, **p}:
             target = EntityDoapTarget(
@@ -46,15 +54,18 @@ def create_doap_from_admin_route_response(permission: dict[str, Any], dsp_client
     )
 
 
-def get_doaps_of_project(shortcode: str, dsp_client: DspClient) -> list[Doap]:
+def get_doaps_of_project(
+    shortcode: str, dsp_client: DspClient, group_registry: GroupRegistry | None = None
+) -> list[Doap]:
     """
     Returns the DOAPs for a project.
     Optionally, select only the DOAPs that are related to either a group, or a resource class, or a property.
     By default, all DOAPs are returned, regardless of their target (target=all).
+    If the DOAPs of many projects are retrieved, pass a shared group registry, so that the groups are fetched only once.
     """
     logger.info("****** Retrieving all DOAPs... ******")
     project_iri, _ = get_proj_iri_and_onto_iris_by_shortcode(shortcode, dsp_client)
-    doaps = _get_all_doaps_of_project(project_iri, dsp_client)
+    doaps = get_all_doaps_of_project(project_iri, dsp_client, group_registry)
     msg = f"Retrieved {len(doaps)} DOAPs"
     logger.info(msg)
     return doaps
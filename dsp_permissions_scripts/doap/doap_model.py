@@ -25,11 +25,15 @@ class Doap(BaseModel):
     scope: PermissionScope
     doap_iri: str
 
+    def with_scope(self, scope: PermissionScope) -> Self:
+        """Returns a copy of the DOAP with another scope (the DOAP itself is not changed)"""
+        return self.model_copy(update={"scope": scope})
+
 
 class GroupDoapTarget(BaseModel):
     """The group for which a DOAP is defined"""
 
-    model_config = ConfigDict(extra="forbid")
+    model_config = ConfigDict(frozen=True, extra="forbid")
 
     project_iri: str
     group: Group
@@ -38,7 +42,7 @@ class GroupDoapTarget(BaseModel):
 class EntityDoapTarget(BaseModel):
     """The resource class and/or property for which a DOAP is defined"""
 
-    model_config = ConfigDict(extra="forbid")
+    model_config = ConfigDict(frozen=True, extra="forbid")
 
     project_iri: str
     resclass_iri: str | None = None
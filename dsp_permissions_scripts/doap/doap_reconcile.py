@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+from functools import partial
+from typing import Mapping
+
+from dsp_permissions_scripts.doap.doap_delete import delete_one_doap
+from dsp_permissions_scripts.doap.doap_get import get_all_doaps_of_project
+from dsp_permissions_scripts.doap.doap_model import Doap
+from dsp_permissions_scripts.doap.doap_model import EntityDoapTarget
+from dsp_permissions_scripts.doap.doap_model import GroupDoapTarget
+from dsp_permissions_scripts.doap.doap_set import create_admin_route_object_for_new_doap
+from dsp_permissions_scripts.doap.doap_set import update_one_doap
+from dsp_permissions_scripts.models.errors import ApiError
+from dsp_permissions_scripts.models.errors import InvalidGroupError
+from dsp_permissions_scripts.models.errors import InvalidIRIError
+from dsp_permissions_scripts.models.group_utils import GroupRegistry
+from dsp_permissions_scripts.models.scope import PermissionScope
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+from dsp_permissions_scripts.utils.get_logger import get_logger
+from dsp_permissions_scripts.utils.project import get_proj_iri_and_onto_iris_by_shortcode
+from dsp_permissions_scripts.utils.scope_serialization import create_admin_route_object_from_scope
+
+logger = get_logger(__name__)
+
+DoapTarget = GroupDoapTarget | EntityDoapTarget
+
+
+@dataclass(frozen=True)
+class DoapPlan:
+    """
+    The minimal set of changes that makes the DOAPs on the server match the desired state.
+
+    Attributes:
+        to_create: targets that have no DOAP yet, with the scope their DOAP must get
+        to_update: existing DOAPs with the scope they must get
+        to_delete: existing DOAPs that must disappear
+    """
+
+    to_create: list[tuple[DoapTarget, PermissionScope]] = field(default_factory=list)
+    to_update: list[Doap] = field(default_factory=list)
+    to_delete: list[Doap] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not (self.to_create or self.to_update or self.to_delete)
+
+
+@dataclass(frozen=True)
+class DoapReconciliationResult:
+    plan: DoapPlan
+    failed_creations: list[DoapTarget] = field(default_factory=list)
+    failed_updates: list[Doap] = field(default_factory=list)
+    failed_deletions: list[Doap] = field(default_factory=list)
+
+    def is_success(self) -> bool:
+        return not (self.failed_creations or self.failed_updates or self.failed_deletions)
+
+
+def _normalize_entity_iri(iri: str | None) -> str | None:
+    """
+    DSP-API returns the IRIs of classes/properties sometimes in the internal representation,
+    so the IRIs are reduced to "<shortcode>/<onto>#<name>" (or "knora-base#<name>") before comparing them.
+    """
+    if iri is None:
+        return None
+    if match := re.search(r"/ontology/([A-Fa-f0-9]{4})/([^/#]+)(?:/v2)?#([^/#]+)$", iri):
+        return f"{match[1].upper()}/{match[2]}#{match[3]}"
+    if match := re.search(r"/ontology/knora-(?:api/v2|base)#([^/#]+)$", iri):
+        return f"knora-base#{match[1]}"
+    return iri
+
+
+def _target_key(target: DoapTarget) -> tuple[str | None, ...]:
+    if isinstance(target, GroupDoapTarget):
+        return ("group", target.project_iri, target.group.prefixed_iri)
+    resclass = _normalize_entity_iri(target.resclass_iri)
+    prop = _normalize_entity_iri(target.property_iri)
+    return ("entity", target.project_iri, resclass, prop)
+
+
+def compute_doap_plan(
+    current: list[Doap],
+    desired: Mapping[DoapTarget, PermissionScope | None],
+    delete_unlisted: bool = False,
+) -> DoapPlan:
+    """
+    Compares the current DOAPs of a project with the desired state, and computes which DOAPs must be
+    created, updated or deleted.
+
+    Args:
+        current: the DOAPs that currently exist on the server
+        desired: the scope that each target should have, or None if the target must not have a DOAP
+        delete_unlisted: if True, the DOAPs of targets that are not in desired are deleted as well
+
+    Returns:
+        the plan (if a target has several DOAPs, the first one is kept and the others are deleted)
+    """
+    index: dict[tuple[str | None, ...], list[Doap]] = defaultdict(list)
+    for doap in current:
+        index[_target_key(doap.target)].append(doap)
+
+    plan = DoapPlan()
+    desired_keys = set()
+    for target, scope in desired.items():
+        key = _target_key(target)
+        desired_keys.add(key)
+        existing = index.get(key, [])
+        if scope is None:
+            plan.to_delete.extend(existing)
+        elif not existing:
+            plan.to_create.append((target, scope))
+        else:
+            first, *duplicates = existing
+            if first.scope != scope:
+                plan.to_update.append(first.model_copy(update={"scope": scope}))
+            plan.to_delete.extend(duplicates)
+
+    if delete_unlisted:
+        plan.to_delete.extend(doap for key, doaps in index.items() if key not in desired_keys for doap in doaps)
+    return plan
+
+
+def _create_doap_for_target(
+    target: DoapTarget,
+    scope: PermissionScope,
+    dsp_client: DspClient,
+    group_registry: GroupRegistry,
+) -> bool:
+    """Creates a DOAP for an existing target, and returns whether it succeeded."""
+    forGroup, forProperty, forResourceClass = None, None, None
+    try:
+        if isinstance(target, GroupDoapTarget):
+            forGroup = group_registry.get_full_iri(target.group.prefixed_iri)
+        else:
+            forProperty, forResourceClass = target.property_iri, target.resclass_iri
+        payload = create_admin_route_object_for_new_doap(
+            target.project_iri,
+            create_admin_route_object_from_scope(scope, dsp_client, group_registry),
+            forGroup=forGroup,
+            forProperty=forProperty,
+            forResourceClass=forResourceClass,
+        )
+        dsp_client.post("/admin/permissions/doap", data=payload)
+    except (ApiError, InvalidGroupError, InvalidIRIError) as err:
+        logger.error(f"Could not create new DOAP for target {target}: {err}")
+        return False
+    logger.info(f"Successfully created new DOAP for target {target}")
+    return True
+
+
+def execute_doap_plan(plan: DoapPlan, dsp_client: DspClient, nthreads: int = 4) -> DoapReconciliationResult:
+    """Executes all changes of a plan in parallel, with at most nthreads requests at the same time."""
+    if plan.is_empty():
+        logger.info(f"The DOAPs on {dsp_client.server} are already in the desired state")
+        return DoapReconciliationResult(plan)
+    logger.info(
+        f"****** Reconciling DOAPs on {dsp_client.server}: {len(plan.to_create)} to create, "
+        f"{len(plan.to_update)} to update, {len(plan.to_delete)} to delete... ******"
+    )
+    group_registry = GroupRegistry(dsp_client)
+    with ThreadPoolExecutor(max_workers=nthreads) as pool:
+        creations = [
+            pool.submit(_create_doap_for_target, target, scope, dsp_client, group_registry)
+            for target, scope in plan.to_create
+        ]
+        updates = pool.map(
+            partial(update_one_doap, dsp_client=dsp_client, group_registry=group_registry), plan.to_update
+        )
+        deletions = pool.map(partial(delete_one_doap, dsp_client=dsp_client), plan.to_delete)
+        result = DoapReconciliationResult(
+            plan=plan,
+            failed_creations=[t for (t, _), job in zip(plan.to_create, creations) if not job.result()],
+            failed_updates=[d for d, err_msg in zip(plan.to_update, updates) if err_msg],
+            failed_deletions=[d for d, success in zip(plan.to_delete, deletions) if not success],
+        )
+    if result.is_success():
+        logger.info(f"Finished reconciling DOAPs on {dsp_client.server}")
+    else:
+        logger.error(
+            f"Reconciling DOAPs on {dsp_client.server} was incomplete: "
+            f"{len(result.failed_creations)} creations, {len(result.failed_updates)} updates "
+            f"and {len(result.failed_deletions)} deletions failed"
+        )
+    return result
+
+
+def reconcile_doaps_of_project(
+    shortcode: str,
+    desired: Mapping[DoapTarget, PermissionScope | None],
+    dsp_client: DspClient,
+    delete_unlisted: bool = False,
+    nthreads: int = 4,
+) -> DoapReconciliationResult:
+    """
+    Makes the DOAPs of a project match the desired state:
+    The current DOAPs are fetched once, the minimal plan is computed, and then executed in parallel.
+
+    Args:
+        shortcode: shortcode of the project
+        desired: the scope that each target should have, or None if the target must not have a DOAP
+        dsp_client: client to access the DSP server
+        delete_unlisted: if True, the DOAPs of targets that are not in desired are deleted as well
+        nthreads: maximum number of parallel requests
+
+    Raises:
+        ValueError: if a desired target belongs to another project
+
+    Returns:
+        the executed plan, and the changes that failed
+    """
+    project_iri, _ = get_proj_iri_and_onto_iris_by_shortcode(shortcode, dsp_client)
+    if foreign := [t for t in desired if t.project_iri != project_iri]:
+        raise ValueError(f"The targets {foreign} don't belong to project {shortcode} ({project_iri})")
+    current = get_all_doaps_of_project(project_iri, dsp_client, GroupRegistry(dsp_client))
+    plan = compute_doap_plan(current, desired, delete_unlisted)
+    return execute_doap_plan(plan, dsp_client, nthreads)
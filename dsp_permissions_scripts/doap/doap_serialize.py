@@ -1,8 +1,8 @@
-import json
 from pathlib import Path
 from typing import Literal
 
 from dsp_permissions_scripts.doap.doap_model import Doap
+from dsp_permissions_scripts.utils import json_codec
 from dsp_permissions_scripts.utils.get_logger import get_logger
 from dsp_permissions_scripts.utils.get_logger import get_timestamp
 
@@ -25,8 +25,7 @@ def serialize_doaps_of_project(
     explanation_string = f"{get_timestamp()}: Project {shortcode} on server {server} has {len(project_doaps)} DOAPs"
     doaps_as_dicts = [doap.model_dump(exclude_none=True, mode="json") for doap in project_doaps]
     doaps_as_dict = {explanation_string: doaps_as_dicts}
-    with open(filepath, mode="w", encoding="utf-8") as f:
-        f.write(json.dumps(doaps_as_dict, ensure_ascii=False, indent=2))
+    filepath.write_bytes(json_codec.dumps(doaps_as_dict, indent=True))
     logger.info(f"{len(project_doaps)} DOAPs have been written to file {filepath}")
 
 
@@ -36,7 +35,6 @@ def deserialize_doaps_of_project(
 ) -> list[Doap]:
     """Deserialize the DOAPs of a project from a JSON file."""
     filepath = _get_file_path(shortcode, mode)
-    with open(filepath, mode="r", encoding="utf-8") as f:
-        doaps_as_dict = json.load(f)
+    doaps_as_dict = json_codec.loads(filepath.read_bytes())
     doaps_as_dicts = next(iter(doaps_as_dict.values()))
     return [Doap.model_validate(d) for d in doaps_as_dicts]
@@ -1,3 +1,6 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any
 from urllib.parse import quote_plus
 
 from dsp_permissions_scripts.doap.doap_get import create_doap_from_admin_route_response
@@ -5,6 +8,9 @@ from dsp_permissions_scripts.doap.doap_model import Doap
 from dsp_permissions_scripts.doap.doap_model import NewEntityDoapTarget
 from dsp_permissions_scripts.doap.doap_model import NewGroupDoapTarget
 from dsp_permissions_scripts.models.errors import ApiError
+from dsp_permissions_scripts.models.errors import InvalidGroupError
+from dsp_permissions_scripts.models.errors import InvalidIRIError
+from dsp_permissions_scripts.models.group_utils import GroupRegistry
 from dsp_permissions_scripts.models.group_utils import get_full_iri_from_prefixed_iri
 from dsp_permissions_scripts.models.scope import PermissionScope
 from dsp_permissions_scripts.utils.dsp_client import DspClient
@@ -15,30 +21,77 @@ from dsp_permissions_scripts.utils.scope_serialization import create_admin_route
 logger = get_logger(__name__)
 
 
-def _update_doap_scope_on_server(doap_iri: str, scope: PermissionScope, dsp_client: DspClient) -> Doap:
+def _update_doap_scope_on_server(
+    doap_iri: str, scope: PermissionScope, dsp_client: DspClient, group_registry: GroupRegistry
+) -> None:
     iri = quote_plus(doap_iri, safe="")
-    payload = {"hasPermissions": create_admin_route_object_from_scope(scope, dsp_client)}
+    payload = {"hasPermissions": create_admin_route_object_from_scope(scope, dsp_client, group_registry)}
     try:
-        response = dsp_client.put(f"/admin/permissions/{iri}/hasPermissions", data=payload)
+        dsp_client.put(f"/admin/permissions/{iri}/hasPermissions", data=payload)
     except ApiError as err:
         err.message = f"Could not update scope of DOAP {doap_iri}"
         raise err from None
-    new_doap = create_doap_from_admin_route_response(response["default_object_access_permission"], dsp_client)
-    return new_doap
 
 
-def apply_updated_scopes_of_doaps_on_server(doaps: list[Doap], dsp_client: DspClient) -> None:
+def update_one_doap(doap: Doap, dsp_client: DspClient, group_registry: GroupRegistry) -> str | None:
+    """Updates the scope of one DOAP, and returns an error message if it failed."""
+    try:
+        _update_doap_scope_on_server(doap.doap_iri, doap.scope, dsp_client, group_registry)
+    except ApiError as err:
+        logger.error(err)
+        return err.message
+    except (InvalidGroupError, InvalidIRIError) as err:
+        logger.error(f"Could not update scope of DOAP {doap.doap_iri}: {err.message}")
+        return err.message
+    logger.info(f"Successfully updated DOAP {doap.doap_iri}")
+    return None
+
+
+def apply_updated_scopes_of_doaps_on_server(doaps: list[Doap], dsp_client: DspClient, nthreads: int = 4) -> list[Doap]:
+    """
+    Applies the scopes of the given DOAPs on a DSP server, with at most nthreads requests in parallel.
+    The group IRIs of all DOAPs are resolved with one single request.
+
+    Returns:
+        the DOAPs that could not be updated
+    """
     if not doaps:
         logger.warning(f"There are no DOAPs to update on {dsp_client.server}")
-        return
+        return []
     logger.info(f"****** Updating scopes of {len(doaps)} DOAPs on {dsp_client.server}... ******")
-    for d in doaps:
-        try:
-            _ = _update_doap_scope_on_server(d.doap_iri, d.scope, dsp_client)
-            logger.info(f"Successfully updated DOAP {d.doap_iri}")
-        except ApiError as err:
-            logger.error(err)
-    logger.info(f"Finished updating scopes of {len(doaps)} DOAPs on {dsp_client.server}")
+    update_one = partial(update_one_doap, dsp_client=dsp_client, group_registry=GroupRegistry(dsp_client))
+    with ThreadPoolExecutor(max_workers=nthreads) as pool:
+        err_msgs = list(pool.map(update_one, doaps))
+    failed_doaps = [doap for doap, err_msg in zip(doaps, err_msgs) if err_msg]
+    if failed_doaps:
+        logger.error(
+            f"{len(failed_doaps)} of {len(doaps)} DOAPs could not be updated on {dsp_client.server}: "
+            f"{', '.join(d.doap_iri for d in failed_doaps)}"
+        )
+    else:
+        logger.info(f"Finished updating scopes of {len(doaps)} DOAPs on {dsp_client.server}")
+    return failed_doaps
+
+
+def create_admin_route_object_for_new_doap(
+    project_iri: str,
+    hasPermissions: list[dict[str, str | None]],
+    *,
+    forGroup: str | None = None,
+    forProperty: str | None = None,
+    forResourceClass: str | None = None,
+) -> dict[str, Any]:
+    """
+    Serializes a new DOAP as expected by POST /admin/permissions/doap
+    (hasPermissions as returned by create_admin_route_object_from_scope(), all IRIs as full IRIs)
+    """
+    return {
+        "forGroup": forGroup,
+        "forProject": project_iri,
+        "forProperty": forProperty,
+        "forResourceClass": forResourceClass,
+        "hasPermissions": hasPermissions,
+    }
 
 
 def create_new_doap_on_server(
@@ -57,13 +110,13 @@ def create_new_doap_on_server(
     forProperty = None
     if isinstance(target, NewEntityDoapTarget) and target.prefixed_prop:
         forProperty = _get_iri_from_prefixed_name(target.prefixed_prop, shortcode, dsp_client.server)
-    payload = {
-        "forGroup": forGroup,
-        "forProject": proj_iri,
-        "forProperty": forProperty,
-        "forResourceClass": forResourceClass,
-        "hasPermissions": create_admin_route_object_from_scope(scope, dsp_client),
-    }
+    payload = create_admin_route_object_for_new_doap(
+        proj_iri,
+        create_admin_route_object_from_scope(scope, dsp_client),
+        forGroup=forGroup,
+        forProperty=forProperty,
+        forResourceClass=forResourceClass,
+    )
     try:
         response = dsp_client.post("/admin/permissions/doap", data=payload)
         logger.info(f"Successfully created new DOAP for target {target}")
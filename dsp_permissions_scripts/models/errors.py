@@ -14,6 +14,24 @@ class ApiError(Exception):
         return pprint.pformat(vars(self))
 
 
+@dataclass
+class RetryLaterError(Exception):
+    """
+    Raised by DspClient instead of sleeping before a retry, if the retries are deferred
+    (see dsp_permissions_scripts.utils.retry.deferred_retries()): the request should be repeated after delay seconds.
+    """
+
+    message: str
+    delay: float
+
+
+@dataclass
+class CassetteMissError(Exception):
+    """Raised when a request is replayed from a cassette that doesn't contain a matching request."""
+
+    message: str
+
+
 @dataclass
 class PermissionsAlreadyUpToDate(Exception):
     message: str = "The submitted permissions are the same as the current ones"
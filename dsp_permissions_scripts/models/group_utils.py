@@ -1,3 +1,7 @@
+from dataclasses import dataclass
+from dataclasses import field
+from threading import Lock
+from typing import Any
 from typing import Iterable
 
 from dsp_permissions_scripts.models.errors import InvalidGroupError
@@ -43,16 +47,20 @@ def get_prefixed_iri_from_full_iri(full_iri: str, dsp_client: DspClient) -> str:
         return full_iri.replace(KNORA_ADMIN_ONTO_NAMESPACE, "knora-admin:")
     elif full_iri.startswith("http://rdfh.ch/groups/"):
         all_groups = dsp_client.get("/admin/groups")["groups"]
-        if not (group := [grp for grp in all_groups if grp["id"].casefold() == full_iri.casefold()]):
-            raise InvalidGroupError(
-                f"{full_iri} is not a valid full IRI of a group. "
-                f"Available group IRIs: {', '.join([grp['id'] for grp in all_groups])}"
-            )
-        return f"{group[0]['project']['shortname']}:{group[0]['name']}"
+        return _find_prefixed_iri_of_custom_group(full_iri, all_groups)
     else:
         raise InvalidIRIError(f"Could not transform full IRI {full_iri} to prefixed IRI")
 
 
+def _find_prefixed_iri_of_custom_group(full_iri: str, all_groups: list[dict[str, Any]]) -> str:
+    if not (group := [grp for grp in all_groups if grp["id"].casefold() == full_iri.casefold()]):
+        raise InvalidGroupError(
+            f"{full_iri} is not a valid full IRI of a group. "
+            f"Available group IRIs: {', '.join([grp['id'] for grp in all_groups])}"
+        )
+    return f"{group[0]['project']['shortname']}:{group[0]['name']}"
+
+
 def get_full_iri_from_prefixed_iri(prefixed_iri: str, dsp_client: DspClient) -> str:
     if not is_valid_prefixed_group_iri(prefixed_iri):
         raise InvalidIRIError(f"{prefixed_iri} is not a valid prefixed group IRI")
@@ -71,6 +79,10 @@ def _get_full_iri_from_builtin_group(prefix: str, groupname: str) -> str:
 
 def _get_full_iri_from_custom_group(prefix: str, groupname: str, dsp_client: DspClient) -> str:
     all_groups = dsp_client.get("/admin/groups")["groups"]
+    return _find_full_iri_of_custom_group(prefix, groupname, all_groups)
+
+
+def _find_full_iri_of_custom_group(prefix: str, groupname: str, all_groups: list[dict[str, Any]]) -> str:
     proj_groups = [grp for grp in all_groups if grp["project"]["shortname"].casefold() == prefix.casefold()]
     if not (group := [grp for grp in proj_groups if grp["name"] == groupname]):
         raise InvalidGroupError(
@@ -79,3 +91,40 @@ def _get_full_iri_from_custom_group(prefix: str, groupname: str, dsp_client: Dsp
         )
     full_iri: str = group[0]["id"]
     return full_iri
+
+
+@dataclass
+class GroupRegistry:
+    """
+    Resolves group IRIs (prefixed <-> full) for many permissions at once.
+    The groups of the DSP server are fetched only once, on first use,
+    so that the registry can be shared by all threads that work on the same server.
+    """
+
+    dsp_client: DspClient
+    _all_groups: list[dict[str, Any]] | None = field(init=False, default=None)
+    _lock: Lock = field(init=False, default_factory=Lock)
+
+    def get_full_iri(self, prefixed_iri: str) -> str:
+        """Same as get_full_iri_from_prefixed_iri(), but without a request per custom group."""
+        if not is_valid_prefixed_group_iri(prefixed_iri):
+            raise InvalidIRIError(f"{prefixed_iri} is not a valid prefixed group IRI")
+        prefix, groupname = prefixed_iri.split(":")
+        if prefix == "knora-admin":
+            return _get_full_iri_from_builtin_group(prefix, groupname)
+        return _find_full_iri_of_custom_group(prefix, groupname, self._get_all_groups())
+
+    def get_prefixed_iri(self, full_iri: str) -> str:
+        """Same as get_prefixed_iri_from_full_iri(), but without a request per custom group."""
+        if full_iri.startswith(KNORA_ADMIN_ONTO_NAMESPACE) and full_iri.endswith(tuple(NAMES_OF_BUILTIN_GROUPS)):
+            return full_iri.replace(KNORA_ADMIN_ONTO_NAMESPACE, "knora-admin:")
+        elif full_iri.startswith("http://rdfh.ch/groups/"):
+            return _find_prefixed_iri_of_custom_group(full_iri, self._get_all_groups())
+        else:
+            raise InvalidIRIError(f"Could not transform full IRI {full_iri} to prefixed IRI")
+
+    def _get_all_groups(self) -> list[dict[str, Any]]:
+        with self._lock:
+            if self._all_groups is None:
+                self._all_groups = self.dsp_client.get("/admin/groups")["groups"]
+            return self._all_groups
@@ -16,6 +16,7 @@ from dsp_permissions_scripts.models.group import UNKNOWN_USER
 from dsp_permissions_scripts.models.group import Group
 from dsp_permissions_scripts.models.group import group_builder
 from dsp_permissions_scripts.models.group import is_valid_prefixed_group_iri
+from dsp_permissions_scripts.models.group_utils import GroupRegistry
 from dsp_permissions_scripts.models.group_utils import get_prefixed_iri_from_full_iri
 from dsp_permissions_scripts.utils.dsp_client import DspClient
 
@@ -49,12 +50,18 @@ class PermissionScope(BaseModel):
         )
 
     @staticmethod
-    def from_dict(d: dict[str, list[str]], dsp_client: DspClient) -> PermissionScope:
+    def from_dict(
+        d: dict[str, list[str]], dsp_client: DspClient, group_registry: GroupRegistry | None = None
+    ) -> PermissionScope:
+        def to_prefixed_iri(iri: str) -> str:
+            if is_valid_prefixed_group_iri(iri):
+                return iri
+            if group_registry:
+                return group_registry.get_prefixed_iri(iri)
+            return get_prefixed_iri_from_full_iri(iri, dsp_client)
+
         purged_kwargs = PermissionScope._remove_duplicates_from_kwargs(d)
-        purged_kwargs = {
-            k: [v if is_valid_prefixed_group_iri(v) else get_prefixed_iri_from_full_iri(v, dsp_client) for v in vs]
-            for k, vs in purged_kwargs.items()
-        }
+        purged_kwargs = {k: [to_prefixed_iri(v) for v in vs] for k, vs in purged_kwargs.items()}
         return PermissionScope.model_validate({k: [group_builder(v) for v in vs] for k, vs in purged_kwargs.items()})
 
     @staticmethod
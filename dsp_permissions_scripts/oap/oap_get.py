@@ -1,13 +1,27 @@
-import copy
+import multiprocessing
+from collections import deque
+from concurrent.futures import Executor
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import AbstractContextManager
+from contextlib import nullcontext
 from typing import Any
+from typing import Iterator
 from urllib.parse import quote
 from urllib.parse import quote_plus
 
 from dsp_permissions_scripts.models.errors import ApiError
+from dsp_permissions_scripts.models.scope import PermissionScope
 from dsp_permissions_scripts.oap.oap_model import Oap
 from dsp_permissions_scripts.oap.oap_model import OapRetrieveConfig
 from dsp_permissions_scripts.oap.oap_model import ResourceOap
 from dsp_permissions_scripts.oap.oap_model import ValueOap
+from dsp_permissions_scripts.oap.oap_page_parser import PageFilter
+from dsp_permissions_scripts.oap.oap_page_parser import ResourceRecord
+from dsp_permissions_scripts.oap.oap_page_parser import ValueRecord
+from dsp_permissions_scripts.oap.oap_page_parser import extract_value_records
+from dsp_permissions_scripts.oap.oap_page_parser import parse_page
+from dsp_permissions_scripts.oap.oap_table import OapTable
 from dsp_permissions_scripts.utils.dsp_client import DspClient
 from dsp_permissions_scripts.utils.get_logger import get_logger
 from dsp_permissions_scripts.utils.helpers import dereference_prefix
@@ -17,22 +31,6 @@ from dsp_permissions_scripts.utils.scope_serialization import create_scope_from_
 
 logger = get_logger(__name__)
 
-IGNORE_KEYS = [
-    "@id",
-    "@type",
-    "@context",
-    "rdfs:label",
-    "knora-api:DeletedValue",
-    "knora-api:lastModificationDate",
-    "knora-api:creationDate",
-    "knora-api:arkUrl",
-    "knora-api:versionArkUrl",
-    "knora-api:attachedToProject",
-    "knora-api:attachedToUser",
-    "knora-api:userHasPermission",
-    "knora-api:hasPermissions",
-    "knora-api:hasStandoffLinkToValue",
-]
 KB_RESCLASSES = [
     "knora-api:VideoSegment",
     "knora-api:AudioSegment",
@@ -78,10 +76,11 @@ def _enrich_with_value_oaps(
     dsp_client: DspClient, res_only_oaps: list[Oap], restrict_to_props: list[str] | None = None
 ) -> list[Oap]:
     logger.info(f"Enriching {len(res_only_oaps)} OAPs of knora-base resources with their value OAPs...")
-    complete_oaps = copy.deepcopy(res_only_oaps)
-    for oap in complete_oaps:
+    complete_oaps = []
+    for oap in res_only_oaps:
         full_resource = dsp_client.get(f"/v2/resources/{quote_plus(oap.resource_oap.resource_iri)}")
-        oap.value_oaps = get_value_oaps(dsp_client, full_resource, restrict_to_props)
+        value_oaps = get_value_oaps(dsp_client, full_resource, restrict_to_props)
+        complete_oaps.append(oap.model_copy(update={"value_oaps": value_oaps}))
     logger.info(f"Enriched {len(complete_oaps)} OAPs of knora-base resources with their value OAPs.")
     return complete_oaps
 
@@ -116,11 +115,12 @@ def _get_oaps_of_one_kb_resclass(dsp_client: DspClient, project_iri: str, rescla
     return oaps
 
 
-def _get_all_oaps_of_resclass(
+def _iter_oap_pages_of_resclass(
     resclass_localname: str, project_iri: str, dsp_client: DspClient, oap_config: OapRetrieveConfig
-) -> list[Oap]:
+) -> Iterator[list[Oap]]:
+    """Yields the OAPs of a resource class page by page"""
     headers = {"X-Knora-Accept-Project": project_iri}
-    all_oaps: list[Oap] = []
+    count = 0
     page = 0
     more = True
     while more:
@@ -133,13 +133,13 @@ def _get_all_oaps_of_resclass(
                 dsp_client=dsp_client,
                 oap_config=oap_config,
             )
-            all_oaps.extend(oaps)
+            count += len(oaps)
+            yield oaps
             page += 1
         except ApiError as err:
             logger.error(f"{err}\nStop getting more pages, return what has been retrieved so far.")
             more = False
-    logger.info(f"Retrieved {len(all_oaps)} OAPs of class {resclass_localname}")
-    return all_oaps
+    logger.info(f"Retrieved {count} OAPs of class {resclass_localname}")
 
 
 def _get_next_page(
@@ -204,44 +204,189 @@ def _get_oap_of_one_resource(r: dict[str, Any], oap_config: OapRetrieveConfig, d
 def get_value_oaps(
     dsp_client: DspClient, resource: dict[str, Any], restrict_to_props: list[str] | None = None
 ) -> list[ValueOap]:
-    res = []
-    for k, v in resource.items():
-        if k in IGNORE_KEYS:
-            continue
-        if restrict_to_props is not None and k not in restrict_to_props:
-            continue
-        values = v if isinstance(v, list) else [v]
-        for val in values:
-            if not isinstance(val, dict) or val.get("knora-api:isDeleted"):
-                continue
-            match val:
-                case {
-                    "@id": id_,
-                    "@type": type_,
-                    "knora-api:hasPermissions": perm_str,
-                } if "/values/" in id_:
-                    scope = create_scope_from_string(perm_str, dsp_client)
-                    oap = ValueOap(
-                        scope=scope, property=k, value_type=type_, value_iri=id_, resource_iri=resource["@id"]
-                    )
-                    res.append(oap)
-                case _:
-                    continue
-    return res
+    props = frozenset(restrict_to_props) if restrict_to_props is not None else None
+    return _create_value_oaps(resource["@id"], extract_value_records(resource, props), dsp_client)
+
+
+def _create_value_oaps(
+    resource_iri: str,
+    value_records: list[ValueRecord],
+    dsp_client: DspClient,
+    scopes: dict[str, PermissionScope] | None = None,
+) -> list[ValueOap]:
+    return [
+        ValueOap(
+            scope=_get_scope(perm_str, dsp_client, scopes),
+            property=prop,
+            value_type=value_type,
+            value_iri=value_iri,
+            resource_iri=resource_iri,
+        )
+        for prop, value_type, value_iri, perm_str in value_records
+    ]
+
+
+def _get_scope(perm_str: str, dsp_client: DspClient, scopes: dict[str, PermissionScope] | None) -> PermissionScope:
+    """Parses a permissions string, reusing the scopes of the strings that were parsed before (if scopes is given)"""
+    if scopes is None:
+        return create_scope_from_string(perm_str, dsp_client)
+    if (scope := scopes.get(perm_str)) is None:
+        scope = scopes[perm_str] = create_scope_from_string(perm_str, dsp_client)
+    return scope
+
+
+def _create_page_filter(oap_config: OapRetrieveConfig) -> PageFilter:
+    return PageFilter(
+        res_classes=frozenset(oap_config.specified_res_classes) if oap_config.retrieve_resources != "all" else None,
+        retrieve_values=oap_config.retrieve_values != "none",
+        props=frozenset(oap_config.specified_props) if oap_config.retrieve_values == "specified_props" else None,
+    )
+
+
+def _create_oaps_from_records(
+    records: list[ResourceRecord], dsp_client: DspClient, scopes: dict[str, PermissionScope]
+) -> list[Oap]:
+    return [
+        Oap(
+            resource_oap=ResourceOap(scope=_get_scope(perm_str, dsp_client, scopes), resource_iri=resource_iri),
+            value_oaps=_create_value_oaps(resource_iri, values or [], dsp_client, scopes),
+        )
+        for resource_iri, perm_str, values in records
+    ]
+
+
+def _iter_oap_pages_of_resclass_in_pool(  # noqa: PLR0913 (too many arguments)
+    resclass_localname: str,
+    project_iri: str,
+    dsp_client: DspClient,
+    oap_config: OapRetrieveConfig,
+    *,
+    pool: Executor,
+    max_lookahead: int,
+) -> Iterator[list[Oap]]:
+    """
+    Same as _iter_oap_pages_of_resclass(), but the pages are parsed in the worker processes of the pool,
+    while this thread already fetches the next pages.
+    Whether there is a next page is only known after parsing, so some pages are fetched in advance:
+    1 at the beginning, and twice as many after every full page, up to max_lookahead.
+    Like this, a class with few resources causes only few requests for the (empty) pages after the last one.
+    """
+    headers = {"X-Knora-Accept-Project": project_iri}
+    resclass_iri = quote_plus(dereference_prefix(resclass_localname, oap_config.context))
+    page_filter = _create_page_filter(oap_config)
+    scopes: dict[str, PermissionScope] = {}
+    count = 0
+    parsing: deque[Future[tuple[bool, list[ResourceRecord]]]] = deque()
+    page = 0
+    lookahead = 1
+    can_fetch = more = True
+    try:
+        while more:
+            while can_fetch and len(parsing) < lookahead:
+                logger.info(f"Getting page {page}...")
+                route = f"/v2/resources?resourceClass={resclass_iri}&page={page}"
+                try:
+                    body = dsp_client.get_raw(route, headers=headers)
+                except ApiError as err:
+                    logger.error(f"{err}\nStop getting more pages, return what has been retrieved so far.")
+                    can_fetch = False
+                    break
+                parsing.append(pool.submit(parse_page, body, page_filter))
+                page += 1
+            if not parsing:
+                break
+            more, records = parsing.popleft().result()
+            oaps = _create_oaps_from_records(records, dsp_client, scopes)
+            count += len(oaps)
+            yield oaps
+            if more:
+                lookahead = min(2 * lookahead, max_lookahead)
+    finally:
+        for future in parsing:
+            future.cancel()
+    logger.info(f"Retrieved {count} OAPs of class {resclass_localname}")
+
+
+def _create_parse_pool(parse_processes: int) -> AbstractContextManager[Executor | None]:
+    if not parse_processes:
+        return nullcontext()
+    # "spawn" instead of "fork", because forking a process that has threads (e.g. the logging thread) is unsafe
+    return ProcessPoolExecutor(max_workers=parse_processes, mp_context=multiprocessing.get_context("spawn"))
 
 
 def get_all_oaps_of_project(
     shortcode: str,
     dsp_client: DspClient,
     oap_config: OapRetrieveConfig,
+    parse_processes: int = 0,
 ) -> list[Oap]:
-    logger.info("******* Retrieving all OAPs... *******")
-    project_iri, onto_iris = get_proj_iri_and_onto_iris_by_shortcode(shortcode, dsp_client)
-    resclass_localnames = get_all_resource_class_localnames_of_project(onto_iris, dsp_client, oap_config)
+    """
+    Retrieves the OAPs of the resources (and values) of a project.
+
+    Args:
+        shortcode: shortcode of the project
+        dsp_client: client connected to the DSP server
+        oap_config: which resources and values to retrieve
+        parse_processes: if > 0, the pages of /v2/resources are parsed in this many worker processes,
+            while the main process fetches the next pages.
+            Worth it for big projects, if the parsing on one core is slower than the server.
+
+    Returns:
+        the OAPs
+    """
     all_oaps: list[Oap] = []
-    for resclass_localname in resclass_localnames:
-        oaps = _get_all_oaps_of_resclass(resclass_localname, project_iri, dsp_client, oap_config)
+    for _, oaps in _iter_oap_pages_of_project(shortcode, dsp_client, oap_config, parse_processes):
         all_oaps.extend(oaps)
-    all_oaps.extend(get_oaps_of_kb_resclasses(dsp_client, project_iri, oap_config))
     logger.info(f"Retrieved a TOTAL of {len(all_oaps)} OAPs")
     return all_oaps
+
+
+def get_oap_table_of_project(
+    shortcode: str,
+    dsp_client: DspClient,
+    oap_config: OapRetrieveConfig,
+    parse_processes: int = 0,
+) -> OapTable:
+    """
+    Same as get_all_oaps_of_project(), but the OAPs are stored in an OapTable as soon as a page is retrieved,
+    so that the OAPs of the whole project never exist as pydantic objects at the same time.
+    The table also knows the class of every resource (the class by which it was retrieved).
+    """
+    table = OapTable()
+    for resource_class, oaps in _iter_oap_pages_of_project(shortcode, dsp_client, oap_config, parse_processes):
+        table.extend(oaps, resource_class)
+    logger.info(f"Retrieved a TOTAL of {len(table)} OAPs with {table.value_count} values")
+    return table
+
+
+def _iter_oap_pages_of_project(
+    shortcode: str,
+    dsp_client: DspClient,
+    oap_config: OapRetrieveConfig,
+    parse_processes: int,
+) -> Iterator[tuple[str, list[Oap]]]:
+    """Yields the OAPs page by page, together with the (prefixed) resource class of the page"""
+    logger.info("******* Retrieving all OAPs... *******")
+    project_iri, onto_iris = get_proj_iri_and_onto_iris_by_shortcode(shortcode, dsp_client)
+    resclass_localnames = get_all_resource_class_localnames_of_project(onto_iris, dsp_client, oap_config)
+    with _create_parse_pool(parse_processes) as pool:
+        for resclass_localname in resclass_localnames:
+            if pool:
+                pages = _iter_oap_pages_of_resclass_in_pool(
+                    resclass_localname,
+                    project_iri,
+                    dsp_client,
+                    oap_config,
+                    pool=pool,
+                    max_lookahead=2 * parse_processes,
+                )
+            else:
+                pages = _iter_oap_pages_of_resclass(resclass_localname, project_iri, dsp_client, oap_config)
+            for oaps in pages:
+                yield resclass_localname, oaps
+    for kb_resclass in KB_RESCLASSES:
+        if oap_config.retrieve_resources == "all" or kb_resclass in oap_config.specified_res_classes:
+            kb_resclass_config = oap_config.model_copy(
+                update={"retrieve_resources": "specified_res_classes", "specified_res_classes": [kb_resclass]}
+            )
+            yield kb_resclass, get_oaps_of_kb_resclasses(dsp_client, project_iri, kb_resclass_config)
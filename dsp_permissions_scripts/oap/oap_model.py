@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from typing import Literal
+from typing import Self
 
 from pydantic import BaseModel
 from pydantic import ConfigDict
@@ -49,6 +50,10 @@ class ResourceOap(BaseModel):
     scope: PermissionScope
     resource_iri: str
 
+    def with_scope(self, scope: PermissionScope) -> Self:
+        """Returns a copy with another scope (the ResourceOap itself is not changed)"""
+        return self.model_copy(update={"scope": scope})
+
 
 class ValueOap(BaseModel):
     """
@@ -69,6 +74,10 @@ class ValueOap(BaseModel):
     value_iri: str
     resource_iri: str
 
+    def with_scope(self, scope: PermissionScope) -> Self:
+        """Returns a copy with another scope (the ValueOap itself is not changed)"""
+        return self.model_copy(update={"scope": scope})
+
 
 class OapRetrieveConfig(BaseModel):
     """
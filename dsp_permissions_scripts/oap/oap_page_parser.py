@@ -0,0 +1,102 @@
+"""
+Extracts the permissions of resources and values from the JSON-LD of DSP-API.
+This module only depends on the standard library (and on json_codec),
+so that it can be imported quickly by the worker processes that parse the pages of /v2/resources
+(see get_all_oaps_of_project()).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from dsp_permissions_scripts.utils import json_codec
+
+IGNORE_KEYS = [
+    "@id",
+    "@type",
+    "@context",
+    "rdfs:label",
+    "knora-api:DeletedValue",
+    "knora-api:lastModificationDate",
+    "knora-api:creationDate",
+    "knora-api:arkUrl",
+    "knora-api:versionArkUrl",
+    "knora-api:attachedToProject",
+    "knora-api:attachedToUser",
+    "knora-api:userHasPermission",
+    "knora-api:hasPermissions",
+    "knora-api:hasStandoffLinkToValue",
+]
+
+ValueRecord = tuple[str, str, str, str]
+"""property, value type, value IRI, permissions string"""
+
+ResourceRecord = tuple[str, str, list[ValueRecord] | None]
+"""resource IRI, permissions string, values (None if the values are not retrieved)"""
+
+
+@dataclass(frozen=True)
+class PageFilter:
+    """
+    Which resources and values of a page are extracted (a picklable excerpt of the OapRetrieveConfig).
+
+    Attributes:
+        res_classes: only the resources of these classes (None: all resources)
+        retrieve_values: whether the values are extracted at all
+        props: only the values of these properties (None: all values)
+    """
+
+    res_classes: frozenset[str] | None = None
+    retrieve_values: bool = False
+    props: frozenset[str] | None = None
+
+
+def extract_value_records(resource: dict[str, Any], restrict_to_props: frozenset[str] | None) -> list[ValueRecord]:
+    """Returns the values of a resource that have permissions, without the deleted ones"""
+    res = []
+    for k, v in resource.items():
+        if k in IGNORE_KEYS:
+            continue
+        if restrict_to_props is not None and k not in restrict_to_props:
+            continue
+        values = v if isinstance(v, list) else [v]
+        for val in values:
+            if not isinstance(val, dict) or val.get("knora-api:isDeleted"):
+                continue
+            match val:
+                case {
+                    "@id": id_,
+                    "@type": type_,
+                    "knora-api:hasPermissions": perm_str,
+                } if "/values/" in id_:
+                    res.append((k, type_, id_, perm_str))
+                case _:
+                    continue
+    return res
+
+
+def parse_page(body: bytes, page_filter: PageFilter) -> tuple[bool, list[ResourceRecord]]:
+    """
+    Parses a page of /v2/resources into compact records.
+    A page with several resources has a "@graph", and there may be more pages after it.
+    A page with 1 resource is the resource itself, and an empty page is an empty object:
+    in both cases, there are no more pages.
+
+    Returns:
+        whether there may be more pages, and the records of the resources of the page
+    """
+    result = json_codec.loads(body) if body.strip() else {}
+    if "@graph" in result:
+        more, resources = True, result["@graph"]
+    elif "@id" in result:
+        more, resources = False, [result]
+    else:
+        return False, []
+    records: list[ResourceRecord] = []
+    for r in resources:
+        if page_filter.res_classes is not None and r["@type"] not in page_filter.res_classes:
+            continue
+        values = extract_value_records(r, page_filter.props) if page_filter.retrieve_values else None
+        records.append((r["@id"], r["knora-api:hasPermissions"], values))
+    return more, records
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable
+from typing import Iterable
+from typing import Literal
+from typing import Sequence
+
+from dsp_permissions_scripts.models.scope import PermissionScope
+from dsp_permissions_scripts.oap.oap_model import ModifiedOap
+from dsp_permissions_scripts.oap.oap_model import Oap
+from dsp_permissions_scripts.oap.oap_table import OapTable
+from dsp_permissions_scripts.utils.get_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class OapRule:
+    """
+    A rule for apply_oap_rules(): the resources/values that match all criteria get the new scope.
+    A criterion that is None matches everything.
+    A rule with a property or a value type only matches values (resources have neither).
+
+    Attributes:
+        new_scope: the new scope, or a function that computes it from the current scope
+        resource_class: class of the resource (of the value), e.g. "my-onto:Book"
+        property: property of the value, e.g. "my-onto:hasTitle"
+        value_type: type of the value, e.g. "knora-api:TextValue"
+        scope: current scope
+        applies_to: whether the rule matches resources, values, or both
+    """
+
+    new_scope: PermissionScope | Callable[[PermissionScope], PermissionScope]
+    resource_class: str | None = None
+    property: str | None = None
+    value_type: str | None = None
+    scope: PermissionScope | None = None
+    applies_to: Literal["resources", "values", "all"] = "all"
+
+    def matches(
+        self, resource_class: str | None, prop: str | None, value_type: str | None, scope: PermissionScope
+    ) -> bool:
+        """Whether the rule matches a resource (prop and value_type are None) or a value"""
+        is_value = prop is not None
+        return (
+            self.applies_to in ("all", "values" if is_value else "resources")
+            and (self.resource_class is None or self.resource_class == resource_class)
+            and (self.property is None or self.property == prop)
+            and (self.value_type is None or self.value_type == value_type)
+            and (self.scope is None or self.scope == scope)
+        )
+
+    def apply(self, scope: PermissionScope) -> PermissionScope:
+        return self.new_scope if isinstance(self.new_scope, PermissionScope) else self.new_scope(scope)
+
+
+def apply_oap_rules(oaps: OapTable | Iterable[Oap], rules: Sequence[OapRule]) -> list[ModifiedOap]:
+    """
+    Modifies the scopes of resources and values according to rules:
+    Every resource/value gets the new scope of the first rule that matches it (if any rule matches it).
+
+    The resources and values are grouped by their (resource class, property, value type, scope),
+    and the rules are evaluated once per group, not once per resource/value.
+    Only the resources and values whose scope changes are copied into ModifiedOaps.
+    The resource classes are only known if the OAPs were retrieved with get_oap_table_of_project():
+    otherwise, only the rules without resource class can match.
+
+    Args:
+        oaps: the OAPs to modify (they are not changed)
+        rules: the rules, in the order of precedence
+
+    Returns:
+        the modified OAPs, in the form that apply_updated_oaps_on_server() expects
+    """
+    table = oaps if isinstance(oaps, OapTable) else OapTable.from_oaps(oaps)
+    decide = _Decider(table, rules)
+    class_ids, scope_ids = table.resource_class_ids, table.resource_scope_ids
+    new_resource_scopes = {
+        i: new_scope
+        for i, key in enumerate(zip(class_ids, scope_ids))
+        if (new_scope := decide.for_resources(*key)) is not None
+    }
+    value_class_ids = (class_ids[resource_id] for resource_id in table.value_resource_ids)
+    value_keys = zip(value_class_ids, table.value_property_ids, table.value_type_ids, table.value_scope_ids)
+    new_value_scopes = {
+        i: new_scope for i, key in enumerate(value_keys) if (new_scope := decide.for_values(*key)) is not None
+    }
+    logger.info(
+        f"{len(rules)} rules on {len(table)} resources and {table.value_count} values "
+        f"({decide.evaluated_groups} distinct groups): "
+        f"{len(new_resource_scopes)} resources and {len(new_value_scopes)} values get a new scope"
+    )
+    return table.create_modified_oaps(new_resource_scopes, new_value_scopes)
+
+
+class _Decider:
+    """Finds the new scope of a group of resources/values, and remembers it for the next member of the group"""
+
+    def __init__(self, table: OapTable, rules: Sequence[OapRule]) -> None:
+        self.table = table
+        self.rules = rules
+        self.resource_decisions: dict[tuple[int, int], PermissionScope | None] = {}
+        self.value_decisions: dict[tuple[int, int, int, int], PermissionScope | None] = {}
+
+    @property
+    def evaluated_groups(self) -> int:
+        return len(self.resource_decisions) + len(self.value_decisions)
+
+    def for_resources(self, class_id: int, scope_id: int) -> PermissionScope | None:
+        key = (class_id, scope_id)
+        if key not in self.resource_decisions:
+            self.resource_decisions[key] = self._decide(self.table.resource_classes[class_id], None, None, scope_id)
+        return self.resource_decisions[key]
+
+    def for_values(self, class_id: int, property_id: int, type_id: int, scope_id: int) -> PermissionScope | None:
+        key = (class_id, property_id, type_id, scope_id)
+        if key not in self.value_decisions:
+            self.value_decisions[key] = self._decide(
+                self.table.resource_classes[class_id],
+                self.table.properties[property_id],
+                self.table.value_types[type_id],
+                scope_id,
+            )
+        return self.value_decisions[key]
+
+    def _decide(
+        self, resource_class: str | None, prop: str | None, value_type: str | None, scope_id: int
+    ) -> PermissionScope | None:
+        """Returns the new scope, or None if the scope doesn't change"""
+        scope = self.table.scopes[scope_id]
+        rule = next((r for r in self.rules if r.matches(resource_class, prop, value_type, scope)), None)
+        if rule is None or (new_scope := rule.apply(scope)) == scope:
+            return None
+        return new_scope
@@ -1,11 +1,13 @@
 import itertools
 import re
 from pathlib import Path
+from typing import Iterable
 from typing import Literal
 
 from dsp_permissions_scripts.oap.oap_model import Oap
 from dsp_permissions_scripts.oap.oap_model import ResourceOap
 from dsp_permissions_scripts.oap.oap_model import ValueOap
+from dsp_permissions_scripts.oap.oap_table import OapTable
 from dsp_permissions_scripts.utils.get_logger import get_logger
 
 logger = get_logger(__name__)
@@ -21,18 +23,42 @@ def serialize_oaps(
     mode: Literal["original", "modified"],
 ) -> None:
     """Serialize the OAPs to JSON files."""
-    if not oaps:
+    serialize_oap_stream(oaps, len(oaps), sum(len(oap.value_oaps) for oap in oaps), shortcode, mode)
+
+
+def serialize_oap_table(
+    table: OapTable,
+    shortcode: str,
+    mode: Literal["original", "modified"],
+) -> None:
+    """Serialize the OAPs of a table to the same JSON files as serialize_oaps(), creating the OAPs one by one."""
+    serialize_oap_stream(table.iter_oaps(), len(table), table.value_count, shortcode, mode)
+
+
+def serialize_oap_stream(
+    oaps: Iterable[Oap],
+    resource_oap_count: int,
+    value_oap_count: int,
+    shortcode: str,
+    mode: Literal["original", "modified"],
+) -> None:
+    """
+    Serialize OAPs to the same JSON files as serialize_oaps(), one by one, as they are produced
+    (the counts are only used for the log messages).
+    """
+    if not resource_oap_count:
         logger.warning("No OAPs to serialize.")
         return
     folder = _get_project_data_path(shortcode, mode)
     folder.mkdir(parents=True, exist_ok=True)
-    value_oap_count = sum(len(oap.value_oaps) for oap in oaps)
-    logger.info(f"Writing {len(oaps)} resource OAPs and {value_oap_count} value OAPs into {folder}")
+    logger.info(f"Writing {resource_oap_count} resource OAPs and {value_oap_count} value OAPs into {folder}")
     for oap in oaps:
         _serialize_oap(oap.resource_oap, folder)
         for value_oap in oap.value_oaps:
             _serialize_oap(value_oap, folder)
-    logger.info(f"Successfully wrote {len(oaps)} resource OAPs and {value_oap_count} value OAPs into folder {folder}")
+    logger.info(
+        f"Successfully wrote {resource_oap_count} resource OAPs and {value_oap_count} value OAPs into folder {folder}"
+    )
 
 
 def _serialize_oap(oap: ResourceOap | ValueOap, folder: Path) -> None:
@@ -52,6 +78,27 @@ def deserialize_oaps(
     return oaps
 
 
+def deserialize_oap_table(
+    shortcode: str,
+    mode: Literal["original", "modified"],
+) -> OapTable:
+    """
+    Deserialize the OAPs from JSON files into a table.
+    Every OAP is added to the table as soon as its file is read,
+    so that the OAPs of the whole project never exist as pydantic objects at the same time.
+    The resources (and the values of a resource) are in the order of their file names.
+    """
+    folder = _get_project_data_path(shortcode, mode)
+    all_files = sorted(folder.glob("**/*.json"), key=lambda f: f.stem)
+    table = OapTable()
+    for file in (f for f in all_files if "_values_" not in f.name):
+        table.add_resource_oap(ResourceOap.model_validate_json(file.read_text(encoding="utf-8")))
+    for file in (f for f in all_files if "_values_" in f.name):
+        table.add_value_oap(ValueOap.model_validate_json(file.read_text(encoding="utf-8")))
+    logger.info(f"Read {len(table)} resource OAPs and {table.value_count} value OAPs from {len(all_files)} files")
+    return table
+
+
 def _read_all_oaps_from_files(
     shortcode: str, mode: Literal["original", "modified"]
 ) -> tuple[list[ResourceOap], list[ValueOap]]:
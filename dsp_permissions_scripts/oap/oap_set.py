@@ -1,17 +1,22 @@
-import itertools
-from concurrent.futures import ThreadPoolExecutor
-from concurrent.futures import as_completed
+from contextlib import AbstractContextManager
+from contextlib import nullcontext
+from dataclasses import dataclass
+from dataclasses import field
 from datetime import datetime
+from functools import partial
 from urllib.parse import quote_plus
 
 from dsp_permissions_scripts.models.errors import ApiError
 from dsp_permissions_scripts.models.errors import PermissionsAlreadyUpToDate
+from dsp_permissions_scripts.models.errors import RetryLaterError
 from dsp_permissions_scripts.models.scope import PermissionScope
 from dsp_permissions_scripts.oap.oap_model import ModifiedOap
 from dsp_permissions_scripts.oap.oap_model import ValueOap
+from dsp_permissions_scripts.utils.concurrency import AimdLimiter
 from dsp_permissions_scripts.utils.dsp_client import DspClient
 from dsp_permissions_scripts.utils.get_logger import get_logger
 from dsp_permissions_scripts.utils.helpers import KNORA_ADMIN_ONTO_NAMESPACE
+from dsp_permissions_scripts.utils.retry import run_with_retries
 from dsp_permissions_scripts.utils.scope_serialization import create_string_from_scope
 
 logger = get_logger(__name__)
@@ -71,46 +76,75 @@ def update_permissions_for_resource(  # noqa: PLR0913
         raise err from None
 
 
-def _update_batch(batch: tuple[ModifiedOap, ...], dsp_client: DspClient) -> list[str]:
+@dataclass
+class _OapUpdateJob:
+    """
+    The update of a resource and its values.
+    It remembers which parts are done, so that it can be resumed if it is put back into the queue.
+    """
+
+    oap: ModifiedOap
+    resource_done: bool = False
+    done_value_iris: set[str] = field(default_factory=set)
+
+    @property
+    def resource_iri(self) -> str:
+        return self.oap.resource_oap.resource_iri if self.oap.resource_oap else self.oap.value_oaps[0].resource_iri
+
+    def remaining_iris(self) -> list[str]:
+        remaining = [self.resource_iri] if self.oap.resource_oap and not self.resource_done else []
+        remaining += [v.value_iri for v in self.oap.value_oaps if v.value_iri not in self.done_value_iris]
+        return remaining or [self.resource_iri]
+
+
+def _update_oap(job: _OapUpdateJob, dsp_client: DspClient) -> list[str]:
+    """Updates the parts of a resource that are not done yet, and returns the IRIs that failed"""
     failed_iris = []
-    for oap in batch:
-        res_iri = oap.resource_oap.resource_iri if oap.resource_oap else oap.value_oaps[0].resource_iri
+    res_iri = job.resource_iri
+    try:
+        resource = dsp_client.get(f"/v2/resources/{quote_plus(res_iri, safe='')}")
+    except ApiError as exc:
+        logger.error(
+            f"Cannot update resource {res_iri}. "
+            f"The resource cannot be retrieved for the following reason: {exc.message}"
+        )
+        return [res_iri]
+    if job.oap.resource_oap and not job.resource_done:
         try:
-            resource = dsp_client.get(f"/v2/resources/{quote_plus(res_iri, safe='')}")
-        except ApiError as exc:
-            logger.error(
-                f"Cannot update resource {res_iri}. "
-                f"The resource cannot be retrieved for the following reason: {exc.message}"
+            update_permissions_for_resource(
+                resource_iri=job.oap.resource_oap.resource_iri,
+                lmd=resource.get("knora-api:lastModificationDate"),
+                resource_type=resource["@type"],
+                context=resource["@context"] | {"knora-admin": KNORA_ADMIN_ONTO_NAMESPACE},
+                scope=job.oap.resource_oap.scope,
+                dsp_client=dsp_client,
             )
-            failed_iris.append(res_iri)
+        except ApiError as err:
+            logger.error(err)
+            failed_iris.append(job.oap.resource_oap.resource_iri)
+        job.resource_done = True
+    for val_oap in job.oap.value_oaps:
+        if val_oap.value_iri in job.done_value_iris:
             continue
-        if oap.resource_oap:
-            try:
-                update_permissions_for_resource(
-                    resource_iri=oap.resource_oap.resource_iri,
-                    lmd=resource.get("knora-api:lastModificationDate"),
-                    resource_type=resource["@type"],
-                    context=resource["@context"] | {"knora-admin": KNORA_ADMIN_ONTO_NAMESPACE},
-                    scope=oap.resource_oap.scope,
-                    dsp_client=dsp_client,
-                )
-            except ApiError as err:
-                logger.error(err)
-                failed_iris.append(oap.resource_oap.resource_iri)
-        for val_oap in oap.value_oaps:
-            try:
-                update_permissions_for_value(
-                    value=val_oap,
-                    resource_type=resource["@type"],
-                    context=resource["@context"] | {"knora-admin": KNORA_ADMIN_ONTO_NAMESPACE},
-                    dsp_client=dsp_client,
-                )
-            except ApiError as err:
-                logger.error(err)
-                failed_iris.append(val_oap.value_iri)
+        try:
+            update_permissions_for_value(
+                value=val_oap,
+                resource_type=resource["@type"],
+                context=resource["@context"] | {"knora-admin": KNORA_ADMIN_ONTO_NAMESPACE},
+                dsp_client=dsp_client,
+            )
+        except ApiError as err:
+            logger.error(err)
+            failed_iris.append(val_oap.value_iri)
+        job.done_value_iris.add(val_oap.value_iri)
     return failed_iris
 
 
+def _give_up(job: _OapUpdateJob, err: RetryLaterError) -> list[str]:
+    logger.error(f"Giving up on resource {job.resource_iri} after too many retries. Last error: {err.message}")
+    return job.remaining_iris()
+
+
 def _write_failed_iris_to_file(
     failed_iris: list[str],
     shortcode: str,
@@ -124,24 +158,34 @@ def _write_failed_iris_to_file(
 
 
 def _launch_thread_pool(oaps: list[ModifiedOap], nthreads: int, dsp_client: DspClient) -> list[str]:
-    all_failed_iris: list[str] = []
-    with ThreadPoolExecutor(max_workers=nthreads) as pool:
-        jobs = [pool.submit(_update_batch, batch, dsp_client) for batch in itertools.batched(oaps, 100)]
-        for result in as_completed(jobs):
-            failed_iris = result.result()
-            all_failed_iris.extend(failed_iris)
-    return all_failed_iris
+    # a job that fails transiently is put back into the queue, instead of blocking its thread while waiting
+    results = run_with_retries(
+        partial(_update_oap, dsp_client=dsp_client),
+        (_OapUpdateJob(oap) for oap in oaps),
+        nthreads=nthreads,
+        give_up=_give_up,
+        max_deferrals=dsp_client.retry_policy.max_retries,
+    )
+    return [iri for failed_iris in results for iri in failed_iris]
 
 
 def apply_updated_oaps_on_server(
     oaps: list[ModifiedOap],
     shortcode: str,
     dsp_client: DspClient,
-    nthreads: int = 2,
+    nthreads: int | None = None,
 ) -> None:
     """
     Applies modified Object Access Permissions of resources (and their values) on a DSP server.
-    Don't forget to set a number of threads that doesn't overload the server.
+
+    Args:
+        oaps: the modified OAPs
+        shortcode: shortcode of the project
+        dsp_client: client to access the DSP server
+        nthreads: number of threads that send requests in parallel.
+            If None, the number of parallel requests adapts to the load of the server:
+            the client gets an adaptive concurrency limiter for the duration of the updates
+            (unless it already has a limiter), and there are as many threads as its maximum limit.
     """
     oaps = [oap for oap in oaps if oap.resource_oap or oap.value_oaps]
     if not oaps:
@@ -152,7 +196,15 @@ def apply_updated_oaps_on_server(
     msg = f"Updating {res_oap_count} resource OAPs and {value_oap_count} value OAPs on {dsp_client.server}..."
     logger.info(f"******* {msg} *******")
 
-    if failed_iris := _launch_thread_pool(oaps, nthreads, dsp_client):
+    limited: AbstractContextManager[None] = nullcontext()
+    if nthreads is None:
+        if (limiter := dsp_client.concurrency_limiter) is None:
+            limiter = AimdLimiter()
+            limited = dsp_client.concurrency_limited(limiter)
+        nthreads = limiter.max_limit
+    with limited:
+        failed_iris = _launch_thread_pool(oaps, nthreads, dsp_client)
+    if failed_iris:
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         filename = f"FAILED_RESOURCES_AND_VALUES_{timestamp}.txt"
         _write_failed_iris_to_file(
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import TypeVar
+
+from dsp_permissions_scripts.models.scope import PermissionScope
+from dsp_permissions_scripts.oap.oap_model import ModifiedOap
+from dsp_permissions_scripts.oap.oap_model import Oap
+from dsp_permissions_scripts.oap.oap_model import ResourceOap
+from dsp_permissions_scripts.oap.oap_model import ValueOap
+
+T = TypeVar("T")
+
+
+def _ids() -> array[int]:
+    return array("I")
+
+
+def _intern(item: T, items: list[T], ids: dict[T, int]) -> int:
+    if (id_ := ids.get(item)) is None:
+        id_ = ids[item] = len(items)
+        items.append(item)
+    return id_
+
+
+def _value_iri_prefix(resource_iri: str) -> str:
+    return f"{resource_iri}/values/"
+
+
+@dataclass
+class OapTable:
+    """
+    The OAPs of a project, stored column-wise, as a compact alternative to a list[Oap]:
+    A list of pydantic objects costs several KB per resource,
+    because every ValueOap has its own PermissionScope and repeats the IRI of its resource,
+    its property and its value type.
+    Here, every row refers to these by an integer id (4 bytes in an array),
+    and every distinct scope, property and value type is stored only once.
+    Value IRIs of the form "<resource IRI>/values/<id>" are stored as "<id>".
+
+    The Oaps are created with model_construct(), i.e. without validating them again:
+    their parts have been validated before they were added to the table
+    (and validating a PermissionScope is expensive when it is done millions of times).
+
+    Use from_oaps()/to_oaps() or iter_oaps() to convert from/to a list[Oap],
+    and modified_oaps() for modifications that only depend on the scope
+    (or apply_oap_rules() for modifications that also depend on the class, property or value type).
+
+    Attributes:
+        resource_iris: IRI of every resource
+        resource_scope_ids: scope of every resource (index in scopes)
+        resource_class_ids: class of every resource (index in resource_classes)
+        value_resource_ids: resource of every value (index in resource_iris)
+        value_iris: IRI of every value (shortened, see above)
+        value_property_ids: property of every value (index in properties)
+        value_type_ids: type of every value (index in value_types)
+        value_scope_ids: scope of every value (index in scopes)
+        resource_classes: the distinct resource classes (None for the resources whose class is unknown)
+        properties: the distinct properties
+        value_types: the distinct value types
+        scopes: the distinct scopes
+    """
+
+    resource_iris: list[str] = field(default_factory=list)
+    resource_scope_ids: array[int] = field(default_factory=_ids)
+    resource_class_ids: array[int] = field(default_factory=_ids)
+    value_resource_ids: array[int] = field(default_factory=_ids)
+    value_iris: list[str] = field(default_factory=list)
+    value_property_ids: array[int] = field(default_factory=_ids)
+    value_type_ids: array[int] = field(default_factory=_ids)
+    value_scope_ids: array[int] = field(default_factory=_ids)
+    resource_classes: list[str | None] = field(default_factory=list)
+    properties: list[str] = field(default_factory=list)
+    value_types: list[str] = field(default_factory=list)
+    scopes: list[PermissionScope] = field(default_factory=list)
+    _resource_ids: dict[str, int] = field(init=False, default_factory=dict, repr=False, compare=False)
+    _resource_class_ids: dict[str | None, int] = field(init=False, default_factory=dict, repr=False, compare=False)
+    _property_ids: dict[str, int] = field(init=False, default_factory=dict, repr=False, compare=False)
+    _value_type_ids: dict[str, int] = field(init=False, default_factory=dict, repr=False, compare=False)
+    _scope_ids: dict[PermissionScope, int] = field(init=False, default_factory=dict, repr=False, compare=False)
+
+    @staticmethod
+    def from_oaps(oaps: Iterable[Oap]) -> OapTable:
+        table = OapTable()
+        table.extend(oaps)
+        return table
+
+    def __len__(self) -> int:
+        """Number of resources"""
+        return len(self.resource_iris)
+
+    @property
+    def value_count(self) -> int:
+        return len(self.value_iris)
+
+    def extend(self, oaps: Iterable[Oap], resource_class: str | None = None) -> None:
+        """Adds OAPs (with the class of their resources, if it is known)"""
+        for oap in oaps:
+            self.add_resource_oap(oap.resource_oap, resource_class)
+            for value_oap in oap.value_oaps:
+                self.add_value_oap(value_oap)
+
+    def add_resource_oap(self, resource_oap: ResourceOap, resource_class: str | None = None) -> int:
+        """
+        Adds a resource (or replaces the scope and class of a resource that is already in the table).
+
+        Returns:
+            the index of the resource
+        """
+        scope_id = _intern(resource_oap.scope, self.scopes, self._scope_ids)
+        class_id = _intern(resource_class, self.resource_classes, self._resource_class_ids)
+        if (resource_id := self._resource_ids.get(resource_oap.resource_iri)) is not None:
+            self.resource_scope_ids[resource_id] = scope_id
+            self.resource_class_ids[resource_id] = class_id
+            return resource_id
+        resource_id = self._resource_ids[resource_oap.resource_iri] = len(self.resource_iris)
+        self.resource_iris.append(resource_oap.resource_iri)
+        self.resource_scope_ids.append(scope_id)
+        self.resource_class_ids.append(class_id)
+        return resource_id
+
+    def add_value_oap(self, value_oap: ValueOap) -> None:
+        """
+        Adds a value of a resource that is already in the table.
+
+        Raises:
+            KeyError: if the resource of the value is not in the table
+        """
+        resource_id = self._resource_ids[value_oap.resource_iri]
+        prefix = _value_iri_prefix(value_oap.resource_iri)
+        value_iri = value_oap.value_iri
+        self.value_resource_ids.append(resource_id)
+        self.value_iris.append(value_iri.removeprefix(prefix) if value_iri.startswith(prefix) else value_iri)
+        self.value_property_ids.append(_intern(value_oap.property, self.properties, self._property_ids))
+        self.value_type_ids.append(_intern(value_oap.value_type, self.value_types, self._value_type_ids))
+        self.value_scope_ids.append(_intern(value_oap.scope, self.scopes, self._scope_ids))
+
+    def to_oaps(self) -> list[Oap]:
+        return list(self.iter_oaps())
+
+    def iter_oaps(self) -> Iterator[Oap]:
+        """Creates the Oaps one by one, in the order in which the resources were added"""
+        offsets, value_ids = self._values_by_resource()
+        for resource_id in range(len(self.resource_iris)):
+            yield Oap.model_construct(
+                resource_oap=self._resource_oap(resource_id),
+                value_oaps=[self._value_oap(j) for j in value_ids[offsets[resource_id] : offsets[resource_id + 1]]],
+            )
+
+    def modified_oaps(self, new_scope_of: Callable[[PermissionScope], PermissionScope]) -> list[ModifiedOap]:
+        """
+        Replaces every scope by new_scope_of(scope), and returns the resources and values whose scope has changed,
+        in the form that apply_updated_oaps_on_server() expects.
+        new_scope_of() is called only once per distinct scope, not once per resource/value.
+        The table itself is not modified.
+        """
+        new_scopes = [new_scope_of(scope) for scope in self.scopes]
+        changed = [new != old for new, old in zip(new_scopes, self.scopes, strict=True)]
+        return self.create_modified_oaps(
+            {i: new_scopes[scope_id] for i, scope_id in enumerate(self.resource_scope_ids) if changed[scope_id]},
+            {i: new_scopes[scope_id] for i, scope_id in enumerate(self.value_scope_ids) if changed[scope_id]},
+        )
+
+    def create_modified_oaps(
+        self, new_resource_scopes: dict[int, PermissionScope], new_value_scopes: dict[int, PermissionScope]
+    ) -> list[ModifiedOap]:
+        """
+        Creates the ModifiedOaps of the resources and values that get a new scope
+        (the others are not copied).
+
+        Args:
+            new_resource_scopes: index of a resource -> its new scope
+            new_value_scopes: index of a value -> its new scope
+
+        Returns:
+            the ModifiedOaps, in the order of the resources
+        """
+        modified = {
+            i: ModifiedOap.model_construct(resource_oap=self._resource_oap(i, scope), value_oaps=[])
+            for i, scope in new_resource_scopes.items()
+        }
+        for value_id, scope in new_value_scopes.items():
+            modified_oap = modified.setdefault(
+                self.value_resource_ids[value_id], ModifiedOap.model_construct(resource_oap=None, value_oaps=[])
+            )
+            modified_oap.value_oaps.append(self._value_oap(value_id, scope))
+        return [modified[resource_id] for resource_id in sorted(modified)]
+
+    def _resource_oap(self, resource_id: int, scope: PermissionScope | None = None) -> ResourceOap:
+        return ResourceOap.model_construct(
+            scope=scope if scope is not None else self.scopes[self.resource_scope_ids[resource_id]],
+            resource_iri=self.resource_iris[resource_id],
+        )
+
+    def _value_oap(self, value_id: int, scope: PermissionScope | None = None) -> ValueOap:
+        resource_iri = self.resource_iris[self.value_resource_ids[value_id]]
+        value_iri = self.value_iris[value_id]
+        return ValueOap.model_construct(
+            scope=scope if scope is not None else self.scopes[self.value_scope_ids[value_id]],
+            property=self.properties[self.value_property_ids[value_id]],
+            value_type=self.value_types[self.value_type_ids[value_id]],
+            value_iri=value_iri if "/" in value_iri else _value_iri_prefix(resource_iri) + value_iri,
+            resource_iri=resource_iri,
+        )
+
+    def _values_by_resource(self) -> tuple[array[int], array[int]]:
+        """
+        Groups the values by resource (a counting sort, which keeps the order of the values of a resource).
+
+        Returns:
+            offsets, value_ids: the values of resource i are value_ids[offsets[i] : offsets[i + 1]]
+        """
+        offsets = array("I", [0]) * (len(self.resource_iris) + 1)
+        for resource_id in self.value_resource_ids:
+            offsets[resource_id + 1] += 1
+        for i in range(1, len(offsets)):
+            offsets[i] += offsets[i - 1]
+        positions = array("I", offsets)
+        value_ids = array("I", [0]) * self.value_count
+        for value_id, resource_id in enumerate(self.value_resource_ids):
+            value_ids[positions[resource_id]] = value_id
+            positions[resource_id] += 1
+        return offsets, value_ids
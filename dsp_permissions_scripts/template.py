@@ -1,71 +1,68 @@
-import copy
-
-from dsp_permissions_scripts.ap.ap_delete import delete_ap_of_group_on_server
+from pathlib import Path
+from urllib.parse import urlparse
+
+from dsp_permissions_scripts.ap.ap_batch import ApOperation
+from dsp_permissions_scripts.ap.ap_batch import CreateAp
+from dsp_permissions_scripts.ap.ap_batch import DeleteAp
+from dsp_permissions_scripts.ap.ap_batch import UpdateAp
+from dsp_permissions_scripts.ap.ap_batch import execute_ap_operations
 from dsp_permissions_scripts.ap.ap_get import get_aps_of_project
 from dsp_permissions_scripts.ap.ap_model import Ap
 from dsp_permissions_scripts.ap.ap_model import ApValue
 from dsp_permissions_scripts.ap.ap_serialize import serialize_aps_of_project
-from dsp_permissions_scripts.ap.ap_set import apply_updated_scopes_of_aps_on_server
-from dsp_permissions_scripts.ap.ap_set import create_new_ap_on_server
-from dsp_permissions_scripts.doap.doap_delete import delete_doap_of_group_on_server
 from dsp_permissions_scripts.doap.doap_get import get_doaps_of_project
 from dsp_permissions_scripts.doap.doap_model import Doap
 from dsp_permissions_scripts.doap.doap_model import GroupDoapTarget
-from dsp_permissions_scripts.doap.doap_model import NewGroupDoapTarget
+from dsp_permissions_scripts.doap.doap_reconcile import DoapTarget
+from dsp_permissions_scripts.doap.doap_reconcile import compute_doap_plan
+from dsp_permissions_scripts.doap.doap_reconcile import execute_doap_plan
 from dsp_permissions_scripts.doap.doap_serialize import serialize_doaps_of_project
-from dsp_permissions_scripts.doap.doap_set import apply_updated_scopes_of_doaps_on_server
-from dsp_permissions_scripts.doap.doap_set import create_new_doap_on_server
 from dsp_permissions_scripts.models import group
 from dsp_permissions_scripts.models.host import Hosts
 from dsp_permissions_scripts.models.scope import PUBLIC
 from dsp_permissions_scripts.models.scope import PermissionScope
-from dsp_permissions_scripts.oap.oap_get import get_all_oaps_of_project
-from dsp_permissions_scripts.oap.oap_model import ModifiedOap
-from dsp_permissions_scripts.oap.oap_model import Oap
+from dsp_permissions_scripts.oap.oap_get import get_oap_table_of_project
 from dsp_permissions_scripts.oap.oap_model import OapRetrieveConfig
-from dsp_permissions_scripts.oap.oap_serialize import serialize_oaps
+from dsp_permissions_scripts.oap.oap_rules import OapRule
+from dsp_permissions_scripts.oap.oap_rules import apply_oap_rules
+from dsp_permissions_scripts.oap.oap_serialize import serialize_oap_table
 from dsp_permissions_scripts.oap.oap_set import apply_updated_oaps_on_server
 from dsp_permissions_scripts.utils.authentication import login
+from dsp_permissions_scripts.utils.concurrency import AimdLimiter
+from dsp_permissions_scripts.utils.copy_on_write import modified_copies
+from dsp_permissions_scripts.utils.dry_run import DryRun
 from dsp_permissions_scripts.utils.dsp_client import DspClient
 from dsp_permissions_scripts.utils.get_logger import get_logger
 from dsp_permissions_scripts.utils.get_logger import log_start_of_script
+from dsp_permissions_scripts.utils.project import get_proj_iri_and_onto_iris_by_shortcode
+from dsp_permissions_scripts.utils.project import persist_project_metadata_cache
+from dsp_permissions_scripts.utils.response_cache import ResponseCache
 
 logger = get_logger(__name__)
 
 
-def modify_aps(aps: list[Ap]) -> list[Ap]:
-    """Adapt this sample to your needs."""
-    modified_aps = []
-    for ap in copy.deepcopy(aps):
-        if ap.forGroup == group.PROJECT_ADMIN and ApValue.ProjectAdminRightsAllPermission not in ap.hasPermissions:
-            ap.add_permission(ApValue.ProjectAdminRightsAllPermission)
-            modified_aps.append(ap)
-    return modified_aps
-
-
-def modify_doaps(doaps: list[Doap]) -> list[Doap]:
-    """Adapt this sample to your needs."""
-    modified_doaps = []
-    for doap in copy.deepcopy(doaps):
-        if isinstance(doap.target, GroupDoapTarget) and doap.target.group == group.PROJECT_ADMIN:
-            doap.scope = PUBLIC
-            modified_doaps.append(doap)
-    return modified_doaps
-
-
-def modify_oaps(oaps: list[Oap]) -> list[ModifiedOap]:
-    """Adapt this sample to your needs."""
-    modified_oaps: list[ModifiedOap] = []
-    for oap in copy.deepcopy(oaps):
-        new_oap = ModifiedOap()
-        if oap.resource_oap.scope != PUBLIC:
-            new_oap.resource_oap = oap.resource_oap.model_copy(update={"scope": PUBLIC})
-        for value_oap in oap.value_oaps:
-            if value_oap.scope != PUBLIC:
-                new_oap.value_oaps.append(value_oap.model_copy(update={"scope": PUBLIC}))
-        if not new_oap.is_empty():
-            modified_oaps.append(new_oap)
-    return modified_oaps
+def modify_ap(ap: Ap) -> Ap | None:
+    """Adapt this sample to your needs: return a modified copy of the AP, or None to leave it as it is."""
+    if ap.forGroup == group.PROJECT_ADMIN and ApValue.ProjectAdminRightsAllPermission not in ap.hasPermissions:
+        return ap.with_permission_added(ApValue.ProjectAdminRightsAllPermission)
+    return None
+
+
+def modify_doap(doap: Doap) -> Doap | None:
+    """Adapt this sample to your needs: return a modified copy of the DOAP, or None to leave it as it is."""
+    if isinstance(doap.target, GroupDoapTarget) and doap.target.group == group.PROJECT_ADMIN:
+        return doap.with_scope(PUBLIC)
+    return None
+
+
+NTHREADS = 4
+"""Number of parallel requests for the APs and the DOAPs (the OAPs adapt their number to the load of the server)"""
+
+OAP_RULES = [
+    # Adapt this sample to your needs: every resource/value gets the new scope of the first rule that matches it.
+    # A rule can be restricted by resource_class, property, value_type, the current scope, and applies_to.
+    OapRule(new_scope=PUBLIC),
+]
 
 
 def update_aps(shortcode: str, dsp_client: DspClient) -> None:
@@ -77,22 +74,14 @@ def update_aps(shortcode: str, dsp_client: DspClient) -> None:
         mode="original",
         server=dsp_client.server,
     )
-    remaining_aps = delete_ap_of_group_on_server(
-        existing_aps=project_aps,
-        forGroup=group.PROJECT_MEMBER,
-        dsp_client=dsp_client,
-    )
-    _ = create_new_ap_on_server(
-        forGroup=group.CREATOR,
-        shortcode=shortcode,
-        hasPermissions=[ApValue.ProjectResourceCreateAllPermission],
-        dsp_client=dsp_client,
-    )
-    modified_aps = modify_aps(remaining_aps)
-    if not modified_aps:
-        logger.info("There are no APs to update.")
-        return
-    apply_updated_scopes_of_aps_on_server(modified_aps, dsp_client)
+    aps_to_delete = [ap for ap in project_aps if ap.forGroup == group.PROJECT_MEMBER]
+    remaining_aps = [ap for ap in project_aps if ap not in aps_to_delete]
+    operations: list[ApOperation] = [DeleteAp(ap) for ap in aps_to_delete]
+    operations.append(CreateAp(forGroup=group.CREATOR, hasPermissions=(ApValue.ProjectResourceCreateAllPermission,)))
+    operations.extend(UpdateAp(ap) for ap in modified_copies(remaining_aps, modify_ap))
+    _ = execute_ap_operations(operations, shortcode, dsp_client, nthreads=NTHREADS)
+    if dsp_client.dry_run:
+        return  # nothing has been modified, so the "modified" APs must not overwrite those of a real run
     project_aps_updated = get_aps_of_project(shortcode, dsp_client)
     serialize_aps_of_project(
         project_aps=project_aps_updated,
@@ -111,22 +100,21 @@ def update_doaps(shortcode: str, dsp_client: DspClient) -> None:
         mode="original",
         server=dsp_client.server,
     )
-    remaining_doaps = delete_doap_of_group_on_server(
-        existing_doaps=project_doaps,
-        forGroup=group.PROJECT_MEMBER,
-        dsp_client=dsp_client,
+    project_iri, _ = get_proj_iri_and_onto_iris_by_shortcode(shortcode, dsp_client)
+    desired_doaps: dict[DoapTarget, PermissionScope | None] = {
+        d.target: d.scope for d in modified_copies(project_doaps, modify_doap)
+    }
+    desired_doaps[GroupDoapTarget(project_iri=project_iri, group=group.PROJECT_MEMBER)] = None
+    desired_doaps[GroupDoapTarget(project_iri=project_iri, group=group.CREATOR)] = PermissionScope.create(
+        CR=[group.SYSTEM_ADMIN]
     )
-    _ = create_new_doap_on_server(
-        target=NewGroupDoapTarget(group=group.CREATOR),
-        shortcode=shortcode,
-        scope=PermissionScope.create(CR=[group.SYSTEM_ADMIN]),
-        dsp_client=dsp_client,
-    )
-    project_doaps_modified = modify_doaps(doaps=remaining_doaps)
-    if not project_doaps_modified:
+    plan = compute_doap_plan(current=project_doaps, desired=desired_doaps)
+    if plan.is_empty():
         logger.info("There are no DOAPs to update.")
         return
-    apply_updated_scopes_of_doaps_on_server(project_doaps_modified, dsp_client)
+    _ = execute_doap_plan(plan, dsp_client, nthreads=NTHREADS)
+    if dsp_client.dry_run:
+        return  # nothing has been modified, so the "modified" DOAPs must not overwrite those of a real run
     project_doaps_updated = get_doaps_of_project(shortcode, dsp_client)
     serialize_doaps_of_project(
         project_doaps=project_doaps_updated,
@@ -138,9 +126,9 @@ def update_doaps(shortcode: str, dsp_client: DspClient) -> None:
 
 def update_oaps(shortcode: str, dsp_client: DspClient, oap_config: OapRetrieveConfig) -> None:
     """Sample function to modify the Object Access Permissions of a project."""
-    oaps = get_all_oaps_of_project(shortcode, dsp_client, oap_config)
-    serialize_oaps(oaps, shortcode, mode="original")
-    oaps_modified = modify_oaps(oaps)
+    oap_table = get_oap_table_of_project(shortcode, dsp_client, oap_config)
+    serialize_oap_table(oap_table, shortcode, mode="original")
+    oaps_modified = apply_oap_rules(oap_table, OAP_RULES)
     if not oaps_modified:
         logger.info("There are no OAPs to update.")
         return
@@ -148,10 +136,11 @@ def update_oaps(shortcode: str, dsp_client: DspClient, oap_config: OapRetrieveCo
         oaps=oaps_modified,
         shortcode=shortcode,
         dsp_client=dsp_client,
-        nthreads=2,
     )
-    oaps_updated = get_all_oaps_of_project(shortcode, dsp_client, oap_config)
-    serialize_oaps(oaps_updated, shortcode, mode="modified")
+    if dsp_client.dry_run:
+        return  # nothing has been modified, so the "modified" OAPs must not overwrite those of a real run
+    oap_table_updated = get_oap_table_of_project(shortcode, dsp_client, oap_config)
+    serialize_oap_table(oap_table_updated, shortcode, mode="modified")
 
 
 def main() -> None:
@@ -164,8 +153,17 @@ def main() -> None:
     """
     host = Hosts.get_host("localhost")
     shortcode = "4123"
+    dry_run = False  # True: nothing is modified, only the requests are counted and the duration is estimated
     log_start_of_script(host, shortcode)
     dsp_client = login(host)
+    if dry_run:
+        dsp_client.use_dry_run(DryRun())
+    # the ontologies are only downloaded again if they were modified since the last run
+    cache_file = Path(f"project_data/metadata_cache_{urlparse(host).netloc.replace(':', '_')}.json")
+    metadata_cache = persist_project_metadata_cache(dsp_client, cache_file)
+    # groups, projects and APs/DOAPs are fetched once and reused
+    # (pass a path to ResponseCache to reuse them in the next run: it is loaded here and saved at the end)
+    dsp_client.use_response_cache(response_cache := ResponseCache())
 
     oap_config = OapRetrieveConfig(
         retrieve_resources="specified_res_classes",
@@ -174,19 +172,31 @@ def main() -> None:
         specified_props=["knora-api:hasStillImageFileValue"],
     )
 
-    update_aps(
-        shortcode=shortcode,
-        dsp_client=dsp_client,
-    )
-    update_doaps(
-        shortcode=shortcode,
-        dsp_client=dsp_client,
-    )
-    update_oaps(
-        shortcode=shortcode,
-        dsp_client=dsp_client,
-        oap_config=oap_config,
-    )
+    try:
+        with dsp_client.phase("update_aps"):
+            update_aps(
+                shortcode=shortcode,
+                dsp_client=dsp_client,
+            )
+        with dsp_client.phase("update_doaps"):
+            update_doaps(
+                shortcode=shortcode,
+                dsp_client=dsp_client,
+            )
+        with dsp_client.phase("update_oaps"):
+            update_oaps(
+                shortcode=shortcode,
+                dsp_client=dsp_client,
+                oap_config=oap_config,
+            )
+        if dsp_client.dry_run:
+            concurrency = {"update_aps": NTHREADS, "update_doaps": NTHREADS, "update_oaps": AimdLimiter().max_limit}
+            dsp_client.dry_run.log_estimate(concurrency)
+    finally:
+        metadata_cache.save()
+        response_cache.save()
+        # use the suffix .prom instead of .json to get the Prometheus text format
+        dsp_client.metrics.write(Path(f"project_data/{shortcode}/request_metrics.json"))
 
 
 if __name__ == "__main__":
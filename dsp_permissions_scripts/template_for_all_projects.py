@@ -0,0 +1,37 @@
+from datetime import datetime
+from pathlib import Path
+
+from dsp_permissions_scripts.models.host import Hosts
+from dsp_permissions_scripts.oap.oap_model import OapRetrieveConfig
+from dsp_permissions_scripts.utils.authentication import login
+from dsp_permissions_scripts.utils.get_logger import log_start_of_script
+from dsp_permissions_scripts.utils.harvest import HarvestStore
+from dsp_permissions_scripts.utils.harvest import harvest_permissions_of_projects
+
+
+def main() -> None:
+    """
+    Use this script if you want to audit the permissions of many projects at once.
+    The APs, DOAPs and (optionally) OAPs of all projects are written into one JSON Lines file.
+    Set oap_config to None to skip the OAPs, which are by far the most expensive to retrieve.
+    """
+    host = Hosts.get_host("localhost")
+    shortcodes = None  # None means: all projects of the server
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    store = HarvestStore(Path(f"project_data/harvest_{timestamp}.jsonl"))
+    oap_config = OapRetrieveConfig(retrieve_resources="all", retrieve_values="none")
+    log_start_of_script(host, "(all projects)")
+    dsp_client = login(host)
+
+    harvest_permissions_of_projects(
+        dsp_client=dsp_client,
+        store=store,
+        shortcodes=shortcodes,
+        oap_config=oap_config,
+        nprojects=4,
+        max_parallel_requests=8,
+    )
+
+
+if __name__ == "__main__":
+    main()
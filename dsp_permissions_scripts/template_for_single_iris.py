@@ -4,6 +4,7 @@ from dsp_permissions_scripts.models.host import Hosts
 from dsp_permissions_scripts.models.scope import PUBLIC
 from dsp_permissions_scripts.oap.update_iris import update_iris
 from dsp_permissions_scripts.utils.authentication import login
+from dsp_permissions_scripts.utils.dry_run import DryRun
 from dsp_permissions_scripts.utils.get_logger import log_start_of_script
 
 
@@ -17,14 +18,21 @@ def main() -> None:
     shortcode = "4123"
     iri_file = Path("project_data/4123/iris_to_update.txt")
     new_scope = PUBLIC
+    dry_run = False  # True: nothing is modified, only the requests are counted and the duration is estimated
     log_start_of_script(host, shortcode)
     dsp_client = login(host)
+    if dry_run:
+        dsp_client.use_dry_run(DryRun())
 
-    update_iris(
-        iri_file=iri_file,
-        new_scope=new_scope,
-        dsp_client=dsp_client,
-    )
+    with dsp_client.phase("update_iris"):
+        update_iris(
+            iri_file=iri_file,
+            new_scope=new_scope,
+            dsp_client=dsp_client,
+        )
+    if dsp_client.dry_run:
+        # the IRIs are updated one after the other
+        dsp_client.dry_run.log_estimate(concurrency=1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,568 @@
+from __future__ import annotations
+
+import json
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from datetime import UTC
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from itertools import count
+from pathlib import Path
+from threading import Lock
+from threading import Thread
+from typing import Any
+from typing import Callable
+from typing import Self
+from urllib.parse import parse_qs
+from urllib.parse import unquote_plus
+from urllib.parse import urlsplit
+
+from dsp_permissions_scripts.utils.get_logger import get_logger
+
+logger = get_logger(__name__)
+
+KNORA_API_ONTO_NAMESPACE = "http://api.knora.org/ontology/knora-api/v2#"
+RESOURCES_PER_PAGE = 25
+ALREADY_UP_TO_DATE = "dsp.errors.BadRequestException: The submitted permissions are the same as the current ones"
+
+
+@dataclass(slots=True)
+class FakeValue:
+    """A value of a resource, e.g. a text value of the property "testonto:hasText"."""
+
+    iri: str
+    property: str
+    value_type: str
+    permissions: str
+    text: str = ""
+
+
+@dataclass(slots=True)
+class FakeResource:
+    """A resource of a fake project, with its class in prefixed form (e.g. "testonto:ImageThing")."""
+
+    iri: str
+    resclass: str
+    permissions: str
+    values: list[FakeValue] = field(default_factory=list)
+    label: str = ""
+    last_modification_date: str = "2024-01-01T00:00:00Z"
+
+
+@dataclass
+class FakeProject:
+    """
+    An in-memory project of the fake DSP-API, with one ontology.
+    The APs and DOAPs are kept in the format of the /admin/permissions routes.
+    """
+
+    shortcode: str
+    shortname: str
+    onto_name: str
+    resclasses: list[str] = field(default_factory=list)
+    custom_groups: list[str] = field(default_factory=list)
+    aps: list[dict[str, Any]] = field(default_factory=list)
+    doaps: list[dict[str, Any]] = field(default_factory=list)
+    onto_last_modification_date: str = "2024-01-01T00:00:00Z"
+    resources: dict[str, FakeResource] = field(default_factory=dict)
+    _resources_by_class: dict[str, list[str]] = field(default_factory=dict, repr=False)
+
+    @property
+    def iri(self) -> str:
+        return f"http://rdfh.ch/projects/{self.shortcode}"
+
+    def group_iri(self, groupname: str) -> str:
+        return f"http://rdfh.ch/groups/{self.shortcode}/{groupname}"
+
+    def add_resource(self, resource: FakeResource) -> None:
+        self.resources[resource.iri] = resource
+        self._resources_by_class.setdefault(resource.resclass, []).append(resource.iri)
+
+    def resources_of_class(self, resclass: str) -> list[str]:
+        return self._resources_by_class.get(resclass, [])
+
+    def save(self, path: Path) -> None:
+        """Writes the project into a JSON file, from which load() can recreate it."""
+        content = asdict(self)
+        del content["_resources_by_class"]
+        content["resources"] = list(content["resources"].values())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(content, ensure_ascii=False), encoding="utf-8")
+
+    @staticmethod
+    def load(path: Path) -> FakeProject:
+        content = json.loads(path.read_text(encoding="utf-8"))
+        resources = content.pop("resources")
+        project = FakeProject(**content)
+        for res in resources:
+            values = [FakeValue(**v) for v in res.pop("values")]
+            project.add_resource(FakeResource(**res, values=values))
+        return project
+
+
+@dataclass
+class FaultConfig:
+    """
+    Misbehaviour of the fake DSP-API, to test the resilience and the throughput of the client.
+
+    Attributes:
+        latency: seconds every request takes
+        latency_jitter: additional random seconds (uniformly distributed) every request takes
+        error_rate: probability that a request fails with an HTTP 500
+        try_again_later_rate: probability that a request fails with an HTTP 400 that asks to "try again later"
+        retry_after: value of the Retry-After header of the "try again later" responses (None: no header)
+        seed: seed of the random generator, for reproducible faults
+    """
+
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    error_rate: float = 0.0
+    try_again_later_rate: float = 0.0
+    retry_after: int | None = None
+    seed: int | None = None
+
+
+@dataclass
+class _Response:
+    status: int
+    body: dict[str, Any]
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+class _FakeApiError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+@dataclass
+class FakeDspApi:
+    """
+    A stand-in for DSP-API that runs on localhost and serves the routes that this package uses,
+    backed by in-memory projects.
+    It is meant for offline integration tests and load tests, not as a faithful reimplementation of DSP-API.
+
+    Usage:
+        with FakeDspApi(projects=[project]) as api:
+            dsp_client = DspClient(api.url)
+            dsp_client.login("root@example.com", "test")
+            ...
+    """
+
+    projects: list[FakeProject] = field(default_factory=list)
+    faults: FaultConfig = field(default_factory=FaultConfig)
+    request_counts: Counter[str] = field(init=False, default_factory=Counter)
+    _server: ThreadingHTTPServer | None = field(init=False, default=None, repr=False)
+    _tokens: set[str] = field(init=False, default_factory=set, repr=False)
+    _ids: count[int] = field(init=False, default_factory=count, repr=False)
+    _lock: Lock = field(init=False, default_factory=Lock, repr=False)
+    _rng: random.Random = field(init=False, repr=False)
+    _routes: list[tuple[str, re.Pattern[str], Callable[..., dict[str, Any]]]] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._rng = random.Random(self.faults.seed)  # noqa: S311 (not used for cryptography)
+        self._routes = [
+            ("POST", re.compile(r"/v2/authentication"), self._login),
+            ("DELETE", re.compile(r"/v2/authentication"), self._logout),
+            ("GET", re.compile(r"/admin/projects"), self._get_projects),
+            ("GET", re.compile(r"/admin/projects/shortcode/([^/]+)"), self._get_project),
+            ("GET", re.compile(r"/admin/groups"), self._get_groups),
+            ("GET", re.compile(r"/admin/permissions/ap/([^/]+)"), self._get_aps),
+            ("GET", re.compile(r"/admin/permissions/doap/([^/]+)"), self._get_doaps),
+            ("POST", re.compile(r"/admin/permissions/ap"), self._create_ap),
+            ("POST", re.compile(r"/admin/permissions/doap"), self._create_doap),
+            ("PUT", re.compile(r"/admin/permissions/([^/]+)/hasPermissions"), self._update_permission),
+            ("DELETE", re.compile(r"/admin/permissions/([^/]+)"), self._delete_permission),
+            ("GET", re.compile(r"/v2/ontologies/metadata"), self._get_ontologies_metadata),
+            ("GET", re.compile(r"/v2/ontologies/allentities/([^/]+)"), self._get_all_entities),
+            ("GET", re.compile(r"/v2/resources"), self._get_resources_of_class),
+            ("GET", re.compile(r"/v2/resources/([^/]+)"), self._get_resource),
+            ("PUT", re.compile(r"/v2/resources"), self._update_resource),
+            ("PUT", re.compile(r"/v2/values"), self._update_value),
+            ("GET", re.compile(r"/v2/searchextended/([^/]+)"), self._search_extended),
+        ]
+
+    @property
+    def url(self) -> str:
+        if not self._server:
+            raise RuntimeError("The fake DSP-API is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def start(self) -> Self:
+        """Starts serving on a free port of localhost, in a background thread."""
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _RequestHandler)
+        self._server.daemon_threads = True
+        setattr(self._server, "api", self)
+        Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        logger.info(f"Started fake DSP-API on {self.url}")
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> Self:
+        return self.start()
+
+    def __exit__(self, *_: object) -> None:
+        self.stop()
+
+    def reset_request_counts(self) -> None:
+        with self._lock:
+            self.request_counts.clear()
+
+    def expire_tokens(self) -> None:
+        """Invalidate all tokens, as if they had expired"""
+        with self._lock:
+            self._tokens.clear()
+
+    def handle(self, method: str, raw_url: str, headers: dict[str, str], body: bytes) -> _Response:
+        """Answers one request. This is independent from the HTTP layer, so that it can also be used in-process."""
+        url = urlsplit(raw_url)
+        if url.path == "/fake/request-counts":
+            # introspection for load tests that run the fake DSP-API in another process
+            with self._lock:
+                return _Response(200, dict(self.request_counts))
+        for route_method, pattern, func in self._routes:
+            if route_method == method and (match := pattern.fullmatch(url.path)):
+                break
+        else:
+            return _Response(404, {"message": f"Unknown route {method} {url.path}"})
+        with self._lock:
+            self.request_counts[f"{method} {pattern.pattern}"] += 1
+        if fault := self._inject_faults():
+            return fault
+        args = [unquote_plus(g) for g in match.groups()]
+        try:
+            if method != "GET" and func != self._login:
+                self._check_token(headers)
+            payload = json.loads(body) if body else {}
+            return _Response(200, func(*args, query=parse_qs(url.query), headers=headers, payload=payload))
+        except _FakeApiError as err:
+            return _Response(err.status, {"message": err.message})
+
+    def _inject_faults(self) -> _Response | None:
+        with self._lock:
+            delay = self.faults.latency + self._rng.uniform(0, self.faults.latency_jitter)
+            dice = self._rng.random()
+        if delay:
+            time.sleep(delay)
+        if dice < self.faults.error_rate:
+            return _Response(500, {"message": "dsp.errors.TriplestoreTimeoutException: injected fault"})
+        if dice < self.faults.error_rate + self.faults.try_again_later_rate:
+            headers = {"Retry-After": str(self.faults.retry_after)} if self.faults.retry_after is not None else {}
+            return _Response(400, {"message": "The server is busy, please try again later (injected fault)"}, headers)
+        return None
+
+    def _check_token(self, headers: dict[str, str]) -> None:
+        token = headers.get("Authorization", "").removeprefix("Bearer ")
+        with self._lock:
+            if token not in self._tokens:
+                raise _FakeApiError(401, "dsp.errors.BadCredentialsException: Invalid or missing token")
+
+    def _new_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def _find_project(self, *, iri: str | None = None, shortcode: str | None = None) -> FakeProject:
+        for project in self.projects:
+            if project.iri == iri or project.shortcode == shortcode:
+                return project
+        raise _FakeApiError(404, f"dsp.errors.NotFoundException: Project {iri or shortcode} not found")
+
+    def _onto_iri(self, project: FakeProject) -> str:
+        return f"{self.url}/ontology/{project.shortcode}/{project.onto_name}/v2"
+
+    def _context(self, project: FakeProject) -> dict[str, str]:
+        return {
+            "knora-api": KNORA_API_ONTO_NAMESPACE,
+            project.onto_name: f"{self._onto_iri(project)}#",
+            "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+            "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+            "xsd": "http://www.w3.org/2001/XMLSchema#",
+        }
+
+    ##### authentication #####
+
+    def _login(self, **_: Any) -> dict[str, Any]:
+        token = f"fake-token-{self._new_id()}"
+        with self._lock:
+            self._tokens.add(token)
+        return {"token": token}
+
+    def _logout(self, headers: dict[str, str], **_: Any) -> dict[str, Any]:
+        with self._lock:
+            self._tokens.discard(headers.get("Authorization", "").removeprefix("Bearer "))
+        return {"message": "Logout OK"}
+
+    ##### admin routes #####
+
+    def _project_json(self, project: FakeProject) -> dict[str, Any]:
+        return {
+            "id": project.iri,
+            "shortcode": project.shortcode,
+            "shortname": project.shortname,
+            "ontologies": [self._onto_iri(project)],
+        }
+
+    def _get_projects(self, **_: Any) -> dict[str, Any]:
+        return {"projects": [self._project_json(p) for p in self.projects]}
+
+    def _get_project(self, shortcode: str, **_: Any) -> dict[str, Any]:
+        return {"project": self._project_json(self._find_project(shortcode=shortcode))}
+
+    def _get_groups(self, **_: Any) -> dict[str, Any]:
+        groups = [
+            {
+                "id": p.group_iri(name),
+                "name": name,
+                "project": {"id": p.iri, "shortname": p.shortname, "shortcode": p.shortcode},
+            }
+            for p in self.projects
+            for name in p.custom_groups
+        ]
+        return {"groups": groups}
+
+    def _get_aps(self, project_iri: str, **_: Any) -> dict[str, Any]:
+        project = self._find_project(iri=project_iri)
+        with self._lock:
+            return {"administrative_permissions": [dict(ap) for ap in project.aps]}
+
+    def _get_doaps(self, project_iri: str, **_: Any) -> dict[str, Any]:
+        project = self._find_project(iri=project_iri)
+        with self._lock:
+            return {"default_object_access_permissions": [dict(doap) for doap in project.doaps]}
+
+    def _create_ap(self, payload: dict[str, Any], **_: Any) -> dict[str, Any]:
+        project = self._find_project(iri=payload.get("forProject"))
+        ap = {
+            "iri": f"http://rdfh.ch/permissions/{project.shortcode}/fake-ap-{self._new_id()}",
+            "forProject": project.iri,
+            "forGroup": payload["forGroup"],
+            "hasPermissions": payload["hasPermissions"],
+        }
+        with self._lock:
+            if any(existing["forGroup"] == ap["forGroup"] for existing in project.aps):
+                raise _FakeApiError(400, f"dsp.errors.DuplicateValueException: AP for {ap['forGroup']} exists")
+            project.aps.append(ap)
+        return {"administrative_permission": ap}
+
+    def _create_doap(self, payload: dict[str, Any], **_: Any) -> dict[str, Any]:
+        project = self._find_project(iri=payload.get("forProject"))
+        target = {k: payload[k] for k in ("forGroup", "forResourceClass", "forProperty") if payload.get(k)}
+        if not target:
+            raise _FakeApiError(400, "dsp.errors.BadRequestException: A DOAP needs a group, a class or a property")
+        doap = {
+            "iri": f"http://rdfh.ch/permissions/{project.shortcode}/fake-doap-{self._new_id()}",
+            "forProject": project.iri,
+            **target,
+            "hasPermissions": payload["hasPermissions"],
+        }
+        with self._lock:
+            if any(all(existing.get(k) == v for k, v in target.items()) for existing in project.doaps):
+                raise _FakeApiError(400, f"dsp.errors.DuplicateValueException: DOAP for {target} exists")
+            project.doaps.append(doap)
+        return {"default_object_access_permission": doap}
+
+    def _find_permission(self, iri: str) -> tuple[str, list[dict[str, Any]], dict[str, Any]]:
+        for project in self.projects:
+            for kind, permissions in (
+                ("administrative_permission", project.aps),
+                ("default_object_access_permission", project.doaps),
+            ):
+                for permission in permissions:
+                    if permission["iri"] == iri:
+                        return kind, permissions, permission
+        raise _FakeApiError(404, f"dsp.errors.NotFoundException: Permission {iri} not found")
+
+    def _update_permission(self, iri: str, payload: dict[str, Any], **_: Any) -> dict[str, Any]:
+        with self._lock:
+            kind, _permissions, permission = self._find_permission(iri)
+            permission["hasPermissions"] = payload["hasPermissions"]
+            return {kind: dict(permission)}
+
+    def _delete_permission(self, iri: str, **_: Any) -> dict[str, Any]:
+        with self._lock:
+            _kind, permissions, permission = self._find_permission(iri)
+            permissions.remove(permission)
+        return {"permissionIri": iri, "deleted": True}
+
+    ##### ontologies #####
+
+    def _get_ontologies_metadata(self, **_: Any) -> dict[str, Any]:
+        ontos = [
+            {
+                "@id": self._onto_iri(p),
+                "@type": "owl:Ontology",
+                "rdfs:label": p.onto_name,
+                "knora-api:attachedToProject": {"@id": p.iri},
+                "knora-api:lastModificationDate": {
+                    "@type": "xsd:dateTimeStamp",
+                    "@value": p.onto_last_modification_date,
+                },
+            }
+            for p in self.projects
+        ]
+        return {"@graph": ontos}
+
+    def _get_all_entities(self, onto_iri: str, **_: Any) -> dict[str, Any]:
+        project = next((p for p in self.projects if self._onto_iri(p) == onto_iri), None)
+        if not project:
+            raise _FakeApiError(404, f"dsp.errors.NotFoundException: Ontology {onto_iri} not found")
+        classes = [
+            {"@id": c, "@type": "owl:Class", "knora-api:isResourceClass": True}
+            for c in project.resclasses
+            if not c.startswith("knora-api:")
+        ]
+        return {
+            "@id": onto_iri,
+            "@type": "owl:Ontology",
+            "knora-api:lastModificationDate": {
+                "@type": "xsd:dateTimeStamp",
+                "@value": project.onto_last_modification_date,
+            },
+            "@graph": classes,
+            "@context": self._context(project),
+        }
+
+    ##### resources and values #####
+
+    def _find_resource(self, iri: str) -> tuple[FakeProject, FakeResource]:
+        for project in self.projects:
+            if resource := project.resources.get(iri):
+                return project, resource
+        raise _FakeApiError(404, f"dsp.errors.NotFoundException: Resource {iri} not found")
+
+    def _resource_json(self, project: FakeProject, resource: FakeResource, with_values: bool = True) -> dict[str, Any]:
+        res: dict[str, Any] = {
+            "@id": resource.iri,
+            "@type": resource.resclass,
+            "rdfs:label": resource.label,
+            "knora-api:attachedToProject": {"@id": project.iri},
+            "knora-api:hasPermissions": resource.permissions,
+            "knora-api:lastModificationDate": {"@type": "xsd:dateTimeStamp", "@value": resource.last_modification_date},
+        }
+        if with_values:
+            for val in resource.values:
+                val_json = {
+                    "@id": val.iri,
+                    "@type": val.value_type,
+                    "knora-api:hasPermissions": val.permissions,
+                    "knora-api:valueAsString": val.text,
+                }
+                match res.get(val.property):
+                    case None:
+                        res[val.property] = val_json
+                    case list() as existing:
+                        existing.append(val_json)
+                    case existing:
+                        res[val.property] = [existing, val_json]
+        return res
+
+    def _page_json(self, project: FakeProject, iris: list[str], with_values: bool = True) -> dict[str, Any]:
+        """Packs resources like DSP-API: 0 resources as {}, 1 resource as such, several resources in a graph."""
+        with self._lock:
+            resources = [self._resource_json(project, project.resources[iri], with_values) for iri in iris]
+        match resources:
+            case []:
+                return {}
+            case [single]:
+                return single | {"@context": self._context(project)}
+            case _:
+                return {"@graph": resources, "@context": self._context(project)}
+
+    def _get_resources_of_class(self, query: dict[str, list[str]], headers: dict[str, str], **_: Any) -> dict[str, Any]:
+        resclass_iri = query["resourceClass"][0]
+        page = int(query.get("page", ["0"])[0])
+        projects = (
+            [self._find_project(iri=headers["X-Knora-Accept-Project"])]
+            if "X-Knora-Accept-Project" in headers
+            else self.projects
+        )
+        for project in projects:
+            onto_ns = f"{self._onto_iri(project)}#"
+            if resclass_iri.startswith(onto_ns):
+                iris = project.resources_of_class(f"{project.onto_name}:{resclass_iri.removeprefix(onto_ns)}")
+                return self._page_json(project, iris[page * RESOURCES_PER_PAGE : (page + 1) * RESOURCES_PER_PAGE])
+        return {}
+
+    def _get_resource(self, iri: str, **_: Any) -> dict[str, Any]:
+        project, resource = self._find_resource(iri)
+        with self._lock:
+            return self._resource_json(project, resource) | {"@context": self._context(project)}
+
+    def _search_extended(self, query_str: str, **_: Any) -> dict[str, Any]:
+        """Only supports the Gravsearch query for the resources of a knora-base class, as used by this package."""
+        resclass = re.search(r"\?kb_resclass a (\S+) \.", query_str)
+        project_iri = re.search(r"BIND\(<([^>]+)> as \?project_iri\)", query_str)
+        offset = re.search(r"OFFSET (\d+)", query_str)
+        if not (resclass and project_iri and offset):
+            raise _FakeApiError(400, "dsp.errors.GravsearchException: Unsupported query")
+        project = self._find_project(iri=project_iri[1])
+        iris = project.resources_of_class(resclass[1])
+        start = int(offset[1]) * RESOURCES_PER_PAGE
+        result = self._page_json(project, iris[start : start + RESOURCES_PER_PAGE], with_values=False)
+        if result and start + RESOURCES_PER_PAGE < len(iris):
+            result["knora-api:mayHaveMoreResults"] = True
+        return result
+
+    def _update_resource(self, payload: dict[str, Any], **_: Any) -> dict[str, Any]:
+        resource = self._find_resource(payload["@id"])[1]
+        lmd = payload.get("knora-api:lastModificationDate")
+        with self._lock:
+            if lmd and lmd["@value"] != resource.last_modification_date:
+                raise _FakeApiError(400, "dsp.errors.EditConflictException: The resource has been modified meanwhile")
+            if payload["knora-api:hasPermissions"] == resource.permissions:
+                raise _FakeApiError(400, ALREADY_UP_TO_DATE)
+            resource.permissions = payload["knora-api:hasPermissions"]
+            resource.last_modification_date = datetime.now(tz=UTC).isoformat()
+        return {
+            "knora-api:lastModificationDate": {"@type": "xsd:dateTimeStamp", "@value": resource.last_modification_date}
+        }
+
+    def _update_value(self, payload: dict[str, Any], **_: Any) -> dict[str, Any]:
+        resource = self._find_resource(payload["@id"])[1]
+        prop = next(k for k in payload if k not in ("@id", "@type", "@context"))
+        value_json = payload[prop]
+        with self._lock:
+            value = next((v for v in resource.values if v.iri == value_json["@id"] and v.property == prop), None)
+            if not value:
+                raise _FakeApiError(404, f"dsp.errors.NotFoundException: Value {value_json['@id']} not found")
+            if value_json["knora-api:hasPermissions"] == value.permissions:
+                raise _FakeApiError(400, ALREADY_UP_TO_DATE)
+            value.permissions = value_json["knora-api:hasPermissions"]
+        return {"@id": value.iri, "@type": value.value_type}
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like a real server
+    disable_nagle_algorithm = True  # otherwise, every response of a kept-alive connection is delayed by 40 ms
+
+    def _answer(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        api: FakeDspApi = getattr(self.server, "api")
+        response = api.handle(self.command, self.path, dict(self.headers.items()), body)
+        content = json.dumps(response.body, ensure_ascii=False).encode("utf-8")
+        self.send_response(response.status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _answer
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 (signature of the base class)
+        pass  # the client logs the requests already
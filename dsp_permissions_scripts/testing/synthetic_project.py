@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import base64
+import random
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+from typing import Iterator
+from typing import Literal
+
+from dsp_permissions_scripts.ap.ap_model import Ap
+from dsp_permissions_scripts.ap.ap_model import ApValue
+from dsp_permissions_scripts.ap.ap_serialize import serialize_aps_of_project
+from dsp_permissions_scripts.doap.doap_model import Doap
+from dsp_permissions_scripts.doap.doap_model import EntityDoapTarget
+from dsp_permissions_scripts.doap.doap_model import GroupDoapTarget
+from dsp_permissions_scripts.doap.doap_serialize import serialize_doaps_of_project
+from dsp_permissions_scripts.models import group
+from dsp_permissions_scripts.models.group import BuiltinGroup
+from dsp_permissions_scripts.models.group import Group
+from dsp_permissions_scripts.models.group import group_builder
+from dsp_permissions_scripts.models.scope import PermissionScope
+from dsp_permissions_scripts.oap.oap_model import Oap
+from dsp_permissions_scripts.oap.oap_model import ResourceOap
+from dsp_permissions_scripts.oap.oap_model import ValueOap
+from dsp_permissions_scripts.oap.oap_serialize import serialize_oap_stream
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeProject
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeResource
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeValue
+from dsp_permissions_scripts.utils.get_logger import get_logger
+from dsp_permissions_scripts.utils.helpers import KNORA_ADMIN_ONTO_NAMESPACE
+from dsp_permissions_scripts.utils.scope_serialization import create_string_from_scope
+
+logger = get_logger(__name__)
+
+VALUE_TYPES = [
+    "knora-api:TextValue",
+    "knora-api:IntValue",
+    "knora-api:DateValue",
+    "knora-api:UriValue",
+    "knora-api:BooleanValue",
+    "knora-api:LinkValue",
+]
+KB_RESCLASSES_OF_SYNTHETIC_PROJECTS = ["knora-api:Region", "knora-api:LinkObj"]
+_BUILTIN_GROUPS = [group.CREATOR, group.PROJECT_MEMBER, group.KNOWN_USER, group.UNKNOWN_USER]
+
+
+@dataclass(frozen=True)
+class SyntheticProjectConfig:
+    """
+    The shape of a synthetic project.
+    The same configuration (including the seed) always produces the same project.
+
+    Attributes:
+        shortcode: shortcode of the project
+        shortname: shortname of the project, which is also the prefix of its custom groups
+        onto_name: name of the (only) ontology of the project
+        n_resources: total number of resources
+        n_resclasses: number of resource classes of the ontology
+        zipf_exponent: the k-th biggest class has a size proportional to 1/k**zipf_exponent
+        values_per_resource: minimum and maximum number of values of a resource (uniformly distributed)
+        n_properties: number of properties of the ontology
+        n_custom_groups: number of custom groups of the project
+        n_permission_strings: number of distinct permission strings, which are again Zipf-distributed
+        custom_group_ratio: probability that a permission string contains custom groups
+        kb_resource_ratio: share of resources that belong to knora-base classes (e.g. knora-api:Region)
+        host_iri: server part of the ontology IRIs used in the DOAPs
+        seed: seed of the random generator
+    """
+
+    shortcode: str = "4123"
+    shortname: str = "synthetic"
+    onto_name: str = "synthonto"
+    n_resources: int = 1_000
+    n_resclasses: int = 10
+    zipf_exponent: float = 1.1
+    values_per_resource: tuple[int, int] = (0, 6)
+    n_properties: int = 8
+    n_custom_groups: int = 3
+    n_permission_strings: int = 20
+    custom_group_ratio: float = 0.3
+    kb_resource_ratio: float = 0.01
+    host_iri: str = "http://0.0.0.0:3333"
+    seed: int = 0
+
+
+@dataclass
+class SyntheticProject:
+    """
+    A generated project: the server-side fixture for the fake DSP-API,
+    and the same permissions as models of this package.
+    """
+
+    config: SyntheticProjectConfig
+    fake_project: FakeProject
+    scopes: dict[str, PermissionScope] = field(default_factory=dict)
+    aps: list[Ap] = field(default_factory=list)
+    doaps: list[Doap] = field(default_factory=list)
+
+    @property
+    def n_values(self) -> int:
+        return sum(len(r.values) for r in self.fake_project.resources.values())
+
+    def iter_oaps(self) -> Iterator[Oap]:
+        """Yields the OAPs of all resources and values, one after another, without keeping them in memory."""
+        for resource in self.fake_project.resources.values():
+            value_oaps = [
+                ValueOap(
+                    scope=self.scopes[v.permissions],
+                    property=v.property,
+                    value_type=v.value_type,
+                    value_iri=v.iri,
+                    resource_iri=resource.iri,
+                )
+                for v in resource.values
+            ]
+            resource_oap = ResourceOap(scope=self.scopes[resource.permissions], resource_iri=resource.iri)
+            yield Oap(resource_oap=resource_oap, value_oaps=value_oaps)
+
+    def write_project_data(self, mode: Literal["original", "modified"] = "original") -> None:
+        """Writes the APs, DOAPs and OAPs into project_data/<shortcode>/, in the same format as the serializers."""
+        shortcode = self.config.shortcode
+        serialize_aps_of_project(self.aps, shortcode, mode, server="synthetic")
+        serialize_doaps_of_project(self.doaps, shortcode, mode, server="synthetic")
+        serialize_oap_stream(self.iter_oaps(), len(self.fake_project.resources), self.n_values, shortcode, mode)
+
+    def write_server_fixture(self, path: Path) -> None:
+        """
+        Writes the server-side fixture (the project as served by the fake DSP-API) into a JSON file,
+        so that FakeProject.load() can serve the same project without generating it again.
+        """
+        self.fake_project.save(path)
+        logger.info(f"Wrote the server-side fixture of synthetic project {self.config.shortcode} into {path}")
+
+
+def _zipf_sizes(total: int, nclasses: int, exponent: float) -> list[int]:
+    """Distributes total over nclasses, so that the k-th class has a size proportional to 1/k**exponent."""
+    weights = [1 / (k + 1) ** exponent for k in range(nclasses)]
+    sizes = [int(total * w / sum(weights)) for w in weights]
+    for k in range(total - sum(sizes)):
+        sizes[k % nclasses] += 1
+    return sizes
+
+
+def _random_id(rng: random.Random) -> str:
+    """Returns a random ID in the format of DSP (22 characters, URL-safe base64)."""
+    return base64.urlsafe_b64encode(rng.randbytes(16)).decode("ascii")[:22]
+
+
+def _make_permission_strings(config: SyntheticProjectConfig, rng: random.Random) -> dict[str, PermissionScope]:
+    custom_groups = [group_builder(f"{config.shortname}:group{i}") for i in range(config.n_custom_groups)]
+    letters = ["D", "M", "V", "RV"]
+    scopes: dict[str, PermissionScope] = {}
+    for _ in range(config.n_permission_strings * 100):
+        if len(scopes) == config.n_permission_strings:
+            break
+        groups: list[Group] = rng.sample(_BUILTIN_GROUPS, k=rng.randint(1, len(_BUILTIN_GROUPS)))
+        if custom_groups and rng.random() < config.custom_group_ratio:
+            groups += rng.sample(custom_groups, k=rng.randint(1, len(custom_groups)))
+        kwargs: dict[str, list[Group]] = {"CR": [group.PROJECT_ADMIN]}
+        for grp in groups:
+            kwargs.setdefault(rng.choice(letters), []).append(grp)
+        scope = PermissionScope.create(**kwargs)
+        scopes[create_string_from_scope(scope)] = scope
+    return scopes
+
+
+def _full_group_iri(grp: Group, project: FakeProject) -> str:
+    name = grp.prefixed_iri.split(":")[1]
+    return f"{KNORA_ADMIN_ONTO_NAMESPACE}{name}" if isinstance(grp, BuiltinGroup) else project.group_iri(name)
+
+
+def _add_aps(synthetic: SyntheticProject) -> None:
+    project = synthetic.fake_project
+    ap_groups: list[tuple[Group, frozenset[ApValue]]] = [
+        (
+            group.PROJECT_ADMIN,
+            frozenset({ApValue.ProjectAdminAllPermission, ApValue.ProjectResourceCreateAllPermission}),
+        ),
+        (group.PROJECT_MEMBER, frozenset({ApValue.ProjectResourceCreateAllPermission})),
+    ]
+    ap_groups += [
+        (group_builder(f"{project.shortname}:{name}"), frozenset({ApValue.ProjectResourceCreateAllPermission}))
+        for name in project.custom_groups
+    ]
+    for i, (grp, ap_values) in enumerate(ap_groups):
+        ap = Ap(forGroup=grp, forProject=project.iri, hasPermissions=ap_values, iri=f"{project.iri}/permissions/ap-{i}")
+        synthetic.aps.append(ap)
+        project.aps.append(
+            {
+                "iri": ap.iri,
+                "forProject": project.iri,
+                "forGroup": _full_group_iri(grp, project),
+                "hasPermissions": [
+                    {"additionalInformation": None, "name": v.value, "permissionCode": None} for v in ap_values
+                ],
+            }
+        )
+
+
+def _add_doaps(synthetic: SyntheticProject, class_localnames: list[str]) -> None:
+    project, config = synthetic.fake_project, synthetic.config
+    default_scope = next(iter(synthetic.scopes.values()))
+    doaps = [
+        Doap(
+            target=GroupDoapTarget(project_iri=project.iri, group=grp),
+            scope=default_scope,
+            doap_iri=f"{project.iri}/permissions/doap-{grp.prefixed_iri.split(':')[1]}",
+        )
+        for grp in (group.PROJECT_ADMIN, group.PROJECT_MEMBER)
+    ]
+    # the biggest classes have their own DOAPs
+    for localname, scope in zip(class_localnames[:3], list(synthetic.scopes.values())[1:]):
+        resclass_iri = f"{config.host_iri}/ontology/{config.shortcode}/{config.onto_name}/v2#{localname}"
+        target = EntityDoapTarget(project_iri=project.iri, resclass_iri=resclass_iri)
+        doaps.append(Doap(target=target, scope=scope, doap_iri=f"{project.iri}/permissions/doap-{localname}"))
+    for doap in doaps:
+        synthetic.doaps.append(doap)
+        target_json: dict[str, str | None]
+        if isinstance(doap.target, GroupDoapTarget):
+            target_json = {"forGroup": _full_group_iri(doap.target.group, project)}
+        else:
+            target_json = {"forResourceClass": doap.target.resclass_iri}
+        has_permissions = [
+            {"additionalInformation": _full_group_iri(grp, project), "name": letter, "permissionCode": None}
+            for letter in PermissionScope.model_fields
+            for grp in doap.scope.get(letter)
+        ]
+        project.doaps.append(
+            {"iri": doap.doap_iri, "forProject": project.iri, **target_json, "hasPermissions": has_permissions}
+        )
+
+
+def generate_synthetic_project(config: SyntheticProjectConfig) -> SyntheticProject:
+    """
+    Generates a synthetic project with the given shape.
+    The resource classes have Zipf-distributed sizes, and so do the permission strings:
+    A few permission strings are used by most resources and values, and many are rare, like in real projects.
+    """
+    rng = random.Random(config.seed)  # noqa: S311 (not used for cryptography)
+    class_localnames = [f"Class{i:03d}" for i in range(config.n_resclasses)]
+    project = FakeProject(
+        shortcode=config.shortcode,
+        shortname=config.shortname,
+        onto_name=config.onto_name,
+        resclasses=[f"{config.onto_name}:{c}" for c in class_localnames] + KB_RESCLASSES_OF_SYNTHETIC_PROJECTS,
+        custom_groups=[f"group{i}" for i in range(config.n_custom_groups)],
+    )
+    synthetic = SyntheticProject(config=config, fake_project=project)
+    synthetic.scopes = _make_permission_strings(config, rng)
+    perm_strings = list(synthetic.scopes)
+    perm_weights = [1 / (k + 1) ** config.zipf_exponent for k in range(len(perm_strings))]
+    props = [(f"{config.onto_name}:hasProp{i}", VALUE_TYPES[i % len(VALUE_TYPES)]) for i in range(config.n_properties)]
+
+    n_kb = round(config.n_resources * config.kb_resource_ratio)
+    class_sizes = _zipf_sizes(config.n_resources - n_kb, config.n_resclasses, config.zipf_exponent)
+    class_sizes += _zipf_sizes(n_kb, len(KB_RESCLASSES_OF_SYNTHETIC_PROJECTS), config.zipf_exponent)
+    for resclass, size in zip(project.resclasses, class_sizes):
+        nvalues = [rng.randint(*config.values_per_resource) for _ in range(size)]
+        permissions = rng.choices(perm_strings, weights=perm_weights, k=size + sum(nvalues))
+        for i in range(size):
+            res_iri = f"http://rdfh.ch/{config.shortcode}/{_random_id(rng)}"
+            values = [
+                FakeValue(
+                    iri=f"{res_iri}/values/{_random_id(rng)}",
+                    property=prop,
+                    value_type=value_type,
+                    permissions=permissions.pop(),
+                    text=f"value {j} of resource {i}",
+                )
+                for j, (prop, value_type) in enumerate(rng.choices(props, k=nvalues[i]))
+            ]
+            resource = FakeResource(res_iri, resclass, permissions.pop(), values, label=f"{resclass} {i}")
+            project.add_resource(resource)
+
+    _add_aps(synthetic)
+    _add_doaps(synthetic, class_localnames)
+    logger.info(
+        f"Generated synthetic project {config.shortcode} with {len(project.resources)} resources, "
+        f"{synthetic.n_values} values and {len(perm_strings)} distinct permission strings"
+    )
+    return synthetic
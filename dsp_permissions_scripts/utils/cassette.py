@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import time
+from collections import defaultdict
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+from threading import Lock
+from typing import Any
+from typing import Literal
+from typing import Mapping
+from urllib.parse import urlsplit
+
+from requests import PreparedRequest
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from dsp_permissions_scripts.models.errors import CassetteMissError
+from dsp_permissions_scripts.utils.get_logger import get_logger
+
+logger = get_logger(__name__)
+
+_AUTHENTICATION_PATH = "/v2/authentication"
+_KEPT_RESPONSE_HEADERS = ("Content-Type", "Retry-After")
+_ANONYMIZED_TOKEN = "anonymized-token"  # noqa: S105 (not a password)
+
+
+@dataclass(frozen=True)
+class Exchange:
+    """
+    One request and its response, as stored in a cassette.
+    The cassette is anonymized: it contains no credentials, tokens, request headers or request bodies
+    (only a hash of the request body, to tell apart the requests with the same path).
+    The paths and the response bodies are kept as they are, because the replay needs them.
+    """
+
+    method: str
+    path: str
+    body_hash: str | None
+    status: int
+    headers: dict[str, str]
+    content: str
+    seconds: float
+
+
+def _path_of(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+
+def _hash_body(path: str, body: bytes | str | None) -> str | None:
+    if not body or path == _AUTHENTICATION_PATH:
+        # the credentials must not be derivable from the cassette
+        return None
+    return hashlib.sha256(body if isinstance(body, bytes) else body.encode("utf-8")).hexdigest()[:16]
+
+
+def _anonymize_content(path: str, content: str) -> str:
+    if path != _AUTHENTICATION_PATH or "token" not in content:
+        return content
+    return json.dumps({**json.loads(content), "token": _ANONYMIZED_TOKEN})
+
+
+@dataclass
+class Cassette:
+    """
+    Records the HTTP exchanges of a DspClient into a (gzipped) JSON lines file,
+    or replays them offline, without a server.
+    Use it with DspClient.use_cassette().
+
+    In the replay, a request is answered with the recorded response of the same method, path and request body.
+    If the same request was recorded several times, the responses are served in the recorded order,
+    and the last one is repeated when they are used up.
+
+    Attributes:
+        mode: "record" or "replay"
+        replay_speed: None to replay as fast as possible,
+            1.0 to wait as long as the recorded request took, 2.0 to wait half as long, etc.
+    """
+
+    mode: Literal["record", "replay"] = "record"
+    replay_speed: float | None = None
+    exchanges: list[Exchange] = field(default_factory=list)
+    _replay_index: dict[tuple[str, str, str | None], list[Exchange]] = field(init=False, default_factory=dict)
+    _replay_positions: defaultdict[tuple[str, str, str | None], int] = field(
+        init=False, default_factory=lambda: defaultdict(int)
+    )
+    _lock: Lock = field(init=False, default_factory=Lock, repr=False)
+
+    def __post_init__(self) -> None:
+        for exchange in self.exchanges:
+            self._replay_index.setdefault((exchange.method, exchange.path, exchange.body_hash), []).append(exchange)
+
+    @staticmethod
+    def load(path: Path, replay_speed: float | None = None) -> Cassette:
+        """Reads a cassette for replaying it"""
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as file:
+            exchanges = [Exchange(**json.loads(line)) for line in file if line.strip()]
+        logger.info(f"Loaded {len(exchanges)} HTTP exchanges from {path}")
+        return Cassette(mode="replay", replay_speed=replay_speed, exchanges=exchanges)
+
+    def save(self, path: Path) -> None:
+        """Writes the recorded exchanges into a file (gzipped if its suffix is .gz)"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        opener = gzip.open if path.suffix == ".gz" else open
+        with self._lock, opener(path, "wt", encoding="utf-8") as file:
+            file.writelines(json.dumps(asdict(e), ensure_ascii=False) + "\n" for e in self.exchanges)
+        logger.info(f"Saved {len(self.exchanges)} HTTP exchanges to {path}")
+
+    def record(self, request: PreparedRequest, response: Response, seconds: float) -> None:
+        path = _path_of(request.url or "")
+        exchange = Exchange(
+            method=request.method or "GET",
+            path=path,
+            body_hash=_hash_body(path, request.body),
+            status=response.status_code,
+            headers={k: v for k in _KEPT_RESPONSE_HEADERS if (v := response.headers.get(k)) is not None},
+            content=_anonymize_content(path, response.text),
+            seconds=round(seconds, 6),
+        )
+        with self._lock:
+            self.exchanges.append(exchange)
+
+    def replay(self, request: PreparedRequest) -> Exchange:
+        path = _path_of(request.url or "")
+        key = (request.method or "GET", path, _hash_body(path, request.body))
+        with self._lock:
+            if not (candidates := self._replay_index.get(key)):
+                raise CassetteMissError(f"The cassette contains no exchange for {key[0]} {path}")
+            position = self._replay_positions[key]
+            self._replay_positions[key] = position + 1
+        return candidates[min(position, len(candidates) - 1)]
+
+    def create_adapter(self, **http_adapter_kwargs: Any) -> BaseAdapter:
+        """Returns the transport adapter that records or replays the exchanges of a requests.Session"""
+        if self.mode == "replay":
+            return _ReplayAdapter(self)
+        return _RecordingAdapter(self, **http_adapter_kwargs)
+
+
+class _RecordingAdapter(HTTPAdapter):
+    def __init__(self, cassette: Cassette, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request: PreparedRequest, *args: Any, **kwargs: Any) -> Response:
+        start = time.perf_counter()
+        response = super().send(request, *args, **kwargs)
+        self.cassette.record(request, response, time.perf_counter() - start)
+        return response
+
+
+class _ReplayAdapter(BaseAdapter):
+    def __init__(self, cassette: Cassette) -> None:
+        super().__init__()
+        self.cassette = cassette
+
+    def send(  # noqa: PLR0913, PLR0917 (signature of the base class)
+        self,
+        request: PreparedRequest,
+        stream: bool = False,  # noqa: ARG002 (unused argument)
+        timeout: float | tuple[float, float] | tuple[float, None] | None = None,  # noqa: ARG002 (unused argument)
+        verify: bool | str = True,  # noqa: ARG002 (unused argument)
+        cert: bytes | str | tuple[bytes | str, bytes | str] | None = None,  # noqa: ARG002 (unused argument)
+        proxies: Mapping[str, str] | None = None,  # noqa: ARG002 (unused argument)
+    ) -> Response:
+        exchange = self.cassette.replay(request)
+        if self.cassette.replay_speed:
+            time.sleep(exchange.seconds / self.cassette.replay_speed)
+        response = Response()
+        response.status_code = exchange.status
+        response.headers = CaseInsensitiveDict(exchange.headers)
+        response._content = exchange.content.encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = request.url or ""
+        response.request = request
+        return response
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import time
+from collections import Counter
+from collections import deque
+from dataclasses import dataclass
+from dataclasses import field
+from threading import Condition
+from types import TracebackType
+from typing import Any
+
+from dsp_permissions_scripts.utils.get_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class LimitChange:
+    timestamp: float
+    old_limit: int
+    new_limit: int
+    reason: str
+
+
+@dataclass
+class AimdLimiter:
+    """
+    Limits the number of requests that are in flight at the same time, summed up over all threads that share it.
+    The limit adapts to the back-pressure of the server (AIMD: additive increase, multiplicative decrease):
+    It grows by 1 after every window of (limit) healthy responses,
+    and is multiplied by decrease_factor if the server is overloaded,
+    i.e. if it answers with a 5xx/"try again later", times out, or is slower than latency_threshold.
+    Signals of requests that were sent before the last decrease are ignored,
+    because they reflect the load before the limit was reduced.
+
+    Use it as context manager around a request (see DspClient.use_concurrency_limiter()).
+
+    Attributes:
+        initial_limit: the limit at the beginning
+        min_limit: the limit never goes below this value
+        max_limit: the limit never goes above this value (the thread pools should have at least this many threads)
+        decrease_factor: factor by which the limit is reduced when there is back-pressure
+        latency_threshold: responses that take longer than this (in seconds) count as back-pressure
+    """
+
+    initial_limit: int = 2
+    min_limit: int = 1
+    max_limit: int = 16
+    decrease_factor: float = 0.5
+    latency_threshold: float | None = 10.0
+    changes: deque[LimitChange] = field(init=False, default_factory=lambda: deque(maxlen=1000), repr=False)
+    change_reasons: Counter[str] = field(init=False, default_factory=Counter, repr=False)
+    _limit: int = field(init=False)
+    _healthy_responses: int = field(init=False, default=0)
+    _in_flight: int = field(init=False, default=0)
+    _last_decrease: float = field(init=False, default=float("-inf"))
+    _condition: Condition = field(init=False, default_factory=Condition, repr=False)
+
+    def __post_init__(self) -> None:
+        if not 1 <= self.min_limit <= self.initial_limit <= self.max_limit:
+            raise ValueError("The limits must satisfy 1 <= min_limit <= initial_limit <= max_limit")
+        self._limit = self.initial_limit
+
+    @staticmethod
+    def fixed(limit: int) -> AimdLimiter:
+        """A limiter that never changes its limit"""
+        return AimdLimiter(initial_limit=limit, min_limit=limit, max_limit=limit, latency_threshold=None)
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def __enter__(self) -> None:
+        with self._condition:
+            self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    def on_response(self, started_at: float, latency: float) -> None:
+        """Report a successful response of a request that was sent at started_at (time.perf_counter())"""
+        if self.latency_threshold is not None and latency > self.latency_threshold:
+            self.on_backpressure(started_at, f"latency above {self.latency_threshold}s")
+            return
+        with self._condition:
+            self._healthy_responses += 1
+            if self._healthy_responses >= self._limit and self._limit < self.max_limit:
+                self._limit += 1
+                self._healthy_responses = 0
+                self._record_change(self._limit - 1, "healthy responses")
+                self._condition.notify()
+
+    def on_backpressure(self, started_at: float, reason: str) -> None:
+        """Report that a request that was sent at started_at (time.perf_counter()) indicates an overloaded server"""
+        with self._condition:
+            if started_at < self._last_decrease:
+                return
+            old_limit = self._limit
+            self._limit = max(self.min_limit, int(self._limit * self.decrease_factor))
+            self._healthy_responses = 0
+            self._last_decrease = time.perf_counter()
+            if self._limit < old_limit:
+                self._record_change(old_limit, reason)
+
+    def _record_change(self, old_limit: int, reason: str) -> None:
+        self.changes.append(LimitChange(time.time(), old_limit, self.limit, reason))
+        self.change_reasons[reason] += 1
+        logger.debug(f"Concurrency limit changed from {old_limit} to {self.limit} ({reason})")
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "change_reasons": dict(self.change_reasons),
+                "recent_changes": [
+                    {"timestamp": c.timestamp, "old_limit": c.old_limit, "new_limit": c.new_limit, "reason": c.reason}
+                    for c in list(self.changes)[-20:]
+                ],
+            }
@@ -0,0 +1,36 @@
+"""
+Helpers to modify permissions without copying the objects that don't change.
+
+The objects retrieved from the server are never changed:
+a modification returns a shallow copy (with the with_...() methods of the models, or model_copy(update=...)),
+which shares its unchanged parts with the original.
+Since groups, scopes and DOAP targets are immutable, this sharing is safe,
+and a modify step needs additional memory only for what it modifies, not a deep copy of the whole project.
+The ModifiedOaps of a project are created by OapTable.modified_oaps() or apply_oap_rules().
+"""
+
+from __future__ import annotations
+
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+def modified_copies(items: Iterable[T], modify: Callable[[T], T | None]) -> Iterator[T]:
+    """
+    Calls modify() on every item, and yields the modified copies.
+
+    Args:
+        items: e.g. the APs or DOAPs of a project
+        modify: returns a modified copy of an item, or None if the item stays as it is.
+            It must not change the item itself.
+
+    Yields:
+        the modified copies (a copy that is equal to its original is skipped)
+    """
+    for item in items:
+        if (modified := modify(item)) is not None and modified is not item and modified != item:
+            yield modified
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import itertools
+from collections import Counter
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from dataclasses import field
+from threading import Lock
+from typing import Any
+from typing import Iterator
+from urllib.parse import unquote_plus
+from urllib.parse import urlparse
+
+from dsp_permissions_scripts.utils.get_logger import get_logger
+
+logger = get_logger(__name__)
+
+_PERMISSION_LIST_KEYS = ("administrative_permissions", "default_object_access_permissions")
+
+
+@dataclass
+class DryRun:
+    """
+    In a dry run, DspClient sends the GET requests as usual (or answers them from its response cache),
+    but doesn't send the mutating requests (POST/PUT/DELETE, except the login/logout):
+    it counts them, and answers them with a response that is built from the payload,
+    so that the calling code can continue as if the mutation had succeeded.
+
+    From the counts and the latencies of the GET requests,
+    estimate() estimates how long the real run will take at a given concurrency.
+    Use phase() to get the numbers per step of the run (e.g. update_aps, update_doaps, update_oaps).
+    Use it with DspClient.use_dry_run().
+
+    Attributes:
+        write_latency_factor: the mutations are assumed to take this many times as long as the average GET
+        requests: number of requests per phase, HTTP method and route template
+        read_seconds: sum of the latencies of the GET requests per phase
+    """
+
+    write_latency_factor: float = 2.0
+    requests: Counter[tuple[str, str, str]] = field(init=False, default_factory=Counter)
+    read_seconds: defaultdict[str, float] = field(init=False, default_factory=lambda: defaultdict(float))
+    _phase: str = field(init=False, default="run")
+    _permissions: dict[str, dict[str, Any]] = field(init=False, default_factory=dict, repr=False)
+    _ids: Iterator[int] = field(init=False, default_factory=itertools.count, repr=False)
+    _lock: Lock = field(init=False, default_factory=Lock, repr=False)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """The requests within this context are counted under the given name"""
+        previous, self._phase = self._phase, name
+        try:
+            yield
+        finally:
+            self._phase = previous
+
+    def record_read(self, method: str, route: str, seconds: float) -> None:
+        with self._lock:
+            self.requests[self._phase, method, route] += 1
+            self.read_seconds[self._phase] += seconds
+
+    def observe(self, route: str, content: Any) -> None:
+        """Remembers the permissions of a GET response, to answer the updates of their scopes"""
+        if not route.startswith("/admin/permissions/") or not isinstance(content, dict):
+            return
+        with self._lock:
+            for key in _PERMISSION_LIST_KEYS:
+                self._permissions.update({p["iri"]: p for p in content.get(key, [])})
+
+    def answer(self, method: str, url: str, route: str, data: dict[str, Any] | None) -> dict[str, Any]:
+        """Counts a mutation that is not sent, and returns the response that the server would presumably give"""
+        with self._lock:
+            self.requests[self._phase, method, route] += 1
+            path = urlparse(url).path
+            if method == "POST" and path in ("/admin/permissions/ap", "/admin/permissions/doap"):
+                permission = {**(data or {}), "iri": f"http://rdfh.ch/permissions/dry-run/{next(self._ids)}"}
+            elif method == "PUT" and path.startswith("/admin/permissions/"):
+                iri = unquote_plus(path.split("/")[3])
+                permission = {**self._permissions.get(iri, {"iri": iri}), **(data or {})}
+            else:
+                return {}
+            self._permissions[permission["iri"]] = permission
+        return {"administrative_permission": permission, "default_object_access_permission": permission}
+
+    def estimate(self, concurrency: int | dict[str, int] = 1) -> dict[str, Any]:
+        """
+        Estimates the number of requests and the duration of the real run, per phase and in total.
+
+        Args:
+            concurrency: number of requests that will be in flight at the same time,
+                or a dict with the number per phase (1 for the phases that are not in the dict)
+
+        Returns:
+            e.g. {"phases": {"update_oaps": {"requests": {"GET": 3, "PUT": 20}, "estimated_seconds": 4.2}, ...},
+            "total": {"requests": {...}, "estimated_seconds": ...}}
+        """
+        concurrency_of = concurrency.get if isinstance(concurrency, dict) else lambda _, __: concurrency
+        with self._lock:
+            requests = self.requests.copy()
+            read_seconds = dict(self.read_seconds)
+        reads = sum(n for (_, method, _), n in requests.items() if method == "GET")
+        mean_read_seconds = sum(read_seconds.values()) / reads if reads else 0.0
+        write_seconds = mean_read_seconds * self.write_latency_factor
+        phases: dict[str, dict[str, Any]] = {}
+        for (phase, method, _), n in sorted(requests.items()):
+            numbers = phases.setdefault(phase, {"requests": Counter(), "estimated_seconds": 0.0})
+            numbers["requests"][method] += n
+            if method != "GET":
+                numbers["estimated_seconds"] += n * write_seconds
+        for phase, numbers in phases.items():
+            seconds = numbers["estimated_seconds"] + read_seconds.get(phase, 0.0)
+            numbers["estimated_seconds"] = round(seconds / concurrency_of(phase, 1), 1)
+            numbers["requests"] = dict(numbers["requests"])
+        total_requests: Counter[str] = Counter()
+        for numbers in phases.values():
+            total_requests.update(numbers["requests"])
+        return {
+            "mean_read_seconds": round(mean_read_seconds, 4),
+            "phases": phases,
+            "total": {
+                "requests": dict(total_requests),
+                "estimated_seconds": round(sum(p["estimated_seconds"] for p in phases.values()), 1),
+            },
+        }
+
+    def log_estimate(self, concurrency: int | dict[str, int] = 1) -> dict[str, Any]:
+        """Writes the estimate (see estimate()) into the log, prints it, and returns it"""
+        estimate = self.estimate(concurrency)
+        lines = [f"Dry run: estimated requests and duration (parallel requests: {concurrency})"]
+        for name, numbers in [*estimate["phases"].items(), ("total", estimate["total"])]:
+            counts = ", ".join(f"{n} {method}" for method, n in sorted(numbers["requests"].items()))
+            lines.append(f"  {name}: {counts or 'no requests'}, about {numbers['estimated_seconds']} seconds")
+        for line in lines:
+            logger.info(line)
+        print("\n".join(lines))
+        return estimate
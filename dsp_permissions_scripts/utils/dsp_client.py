@@ -1,11 +1,20 @@
+import copy
 import json
+import logging
+import random
 import re
+import sys
 import time
+from contextlib import AbstractContextManager
+from contextlib import contextmanager
+from contextlib import nullcontext
 from dataclasses import dataclass
 from dataclasses import field
 from functools import partial
 from importlib.metadata import version
+from threading import Lock
 from typing import Any
+from typing import Iterator
 from typing import Literal
 from typing import Optional
 from typing import cast
@@ -14,17 +23,44 @@ from requests import ReadTimeout
 from requests import RequestException
 from requests import Response
 from requests import Session
+from requests.adapters import BaseAdapter
+from requests.adapters import HTTPAdapter
 
 from dsp_permissions_scripts.models.errors import ApiError
 from dsp_permissions_scripts.models.errors import PermissionsAlreadyUpToDate
+from dsp_permissions_scripts.models.errors import RetryLaterError
+from dsp_permissions_scripts.utils import json_codec
+from dsp_permissions_scripts.utils.cassette import Cassette
+from dsp_permissions_scripts.utils.concurrency import AimdLimiter
+from dsp_permissions_scripts.utils.dry_run import DryRun
 from dsp_permissions_scripts.utils.get_logger import get_logger
 from dsp_permissions_scripts.utils.helpers import PACKAGE_NAME
+from dsp_permissions_scripts.utils.request_metrics import RequestMetrics
+from dsp_permissions_scripts.utils.request_metrics import normalize_route
+from dsp_permissions_scripts.utils.response_cache import ResponseCache
+from dsp_permissions_scripts.utils.retry import RetryPolicy
+from dsp_permissions_scripts.utils.retry import get_previous_deferrals
+from dsp_permissions_scripts.utils.retry import parse_retry_after
+from dsp_permissions_scripts.utils.single_flight import SingleFlight
 
 # ruff: noqa: PLR2004 (magic value used in comparison)
 
 logger = get_logger(__name__)
 
 HTTP_OK = 200
+HTTP_UNAUTHORIZED = 401
+AUTHENTICATION_ROUTE = "/v2/authentication"
+STATIC_ROUTES = frozenset(
+    {
+        "/admin/groups",
+        "/admin/projects",
+        "/admin/projects/shortcode/{shortcode}",
+        "/v2/ontologies/metadata",
+        "/v2/ontologies/allentities/{iri}",
+    }
+)
+"""Routes whose responses don't change during a run, so that concurrent GETs to them can be coalesced"""
+_NOT_PARSED = object()
 
 
 @dataclass
@@ -35,11 +71,13 @@ class RequestParameters:
     data: dict[str, Any] | None = None
     data_serialized: bytes | None = field(init=False, default=None)
     headers: dict[str, str] | None = None
+    raw_response: bool = False
+    """If True, the body of the response is returned as bytes, without parsing it"""
 
     def __post_init__(self) -> None:
         # If data is not encoded as bytes, issues can occur with non-ASCII characters,
         # where the content-length of the request will turn out to be different from the actual length.
-        self.data_serialized = json.dumps(self.data, ensure_ascii=False).encode("utf-8") if self.data else None
+        self.data_serialized = json_codec.dumps(self.data) if self.data else None
 
     def as_kwargs(self) -> dict[str, Any]:
         return {
@@ -51,6 +89,74 @@ class RequestParameters:
         }
 
 
+def _is_transient_error(response: Response) -> bool:
+    """Whether the response indicates a non-permanent server-side problem, so that the request should be retried"""
+    return 500 <= response.status_code < 600 or "try again later" in response.text.lower()
+
+
+@dataclass(frozen=True)
+class HttpLogConfig:
+    """
+    Configures how much of the requests and responses is written to the log (at DEBUG level).
+    Big bodies (e.g. pages of /v2/resources) make the log file grow quickly,
+    so they are truncated, and can additionally be logged only for a sample of the requests.
+
+    Attributes:
+        max_body_chars: serialized bodies are truncated to this many characters (None: never truncated).
+            Only the part that is logged is serialized, so a multi-MB body costs no more than a short one.
+        body_sample_rate: fraction of the requests/responses whose body is logged (the others are logged without it)
+    """
+
+    max_body_chars: int | None = 2_000
+    body_sample_rate: float = 1.0
+
+
+class _LazyJson:
+    """
+    Log argument that is only serialized if the record is actually written,
+    i.e. not at all if DEBUG is disabled, and by the thread that writes the record.
+    """
+
+    __slots__ = ("body_key", "dumpobj", "max_body_chars")
+
+    def __init__(self, dumpobj: dict[str, Any], body_key: str, max_body_chars: int | None) -> None:
+        self.dumpobj = dumpobj
+        self.body_key = body_key
+        self.max_body_chars = max_body_chars
+
+    def __str__(self) -> str:
+        if self.max_body_chars is not None and self.body_key in self.dumpobj:
+            truncated = _truncated_json(self.dumpobj[self.body_key], self.max_body_chars)
+            if truncated is not None:
+                return json_codec.dumps_str(self.dumpobj | {self.body_key: truncated})
+        return json_codec.dumps_str(self.dumpobj)
+
+
+_LOG_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+"""Encodes the bodies that are truncated for the log incrementally (unlike json_codec, which only encodes at once)"""
+
+
+def _truncated_json(body: Any, max_chars: int) -> str | None:
+    """
+    Returns the first max_chars characters of the serialized body (or of the body itself, if it is a string),
+    or None if it is not longer than that.
+    The body is serialized chunk by chunk, and only until max_chars is exceeded.
+    """
+    if isinstance(body, str):
+        prefix = body[: max_chars + 1]
+    else:
+        chunks, length = [], 0
+        for chunk in _LOG_ENCODER.iterencode(body):
+            chunks.append(chunk)
+            length += len(chunk)
+            if length > max_chars:
+                break
+        prefix = "".join(chunks)
+    if len(prefix) <= max_chars:
+        return None
+    return f"{prefix[:max_chars]}...[truncated after {max_chars} chars]"
+
+
 @dataclass
 class DspClient:
     """
@@ -59,12 +165,39 @@ class DspClient:
     Attributes:
         server: address of the server, e.g https://api.dasch.swiss
         token: session token received by the server after login
+            (if it expires, the client logs in again with the credentials of login())
+        metrics: counts, sizes, latencies and retries of the requests, per HTTP method and route
+        log_config: how much of the requests and responses is logged
+        retry_policy: how often and after which delays failed requests are retried
+        concurrency_limiter: limits the number of parallel requests (see use_concurrency_limiter())
+        coalesced_routes: route templates (see normalize_route()) on which identical concurrent GETs are merged
+            into one request, whose response is shared.
+            Routes of mutable objects (e.g. "/v2/resources/{iri}") can be added,
+            because only the GETs that are in flight at the same time are merged, nothing is cached.
+        response_cache: caches the responses of read-only routes (see use_response_cache())
+        cassette: records or replays the HTTP exchanges (see use_cassette())
+        dry_run: if set, the mutating requests are not sent, but counted (see use_dry_run())
     """
 
     server: str
     token: Optional[str] = None
-    session: Session = field(init=False, default=Session())
+    log_config: HttpLogConfig = field(default_factory=HttpLogConfig, repr=False)
+    retry_policy: RetryPolicy = field(default_factory=RetryPolicy, repr=False)
+    coalesced_routes: frozenset[str] = field(default=STATIC_ROUTES, repr=False)
+    session: Session = field(init=False, default_factory=Session)
     timeout: int = field(init=False, default=30)
+    metrics: RequestMetrics = field(init=False, default_factory=RequestMetrics, repr=False)
+    concurrency_limiter: AimdLimiter | None = field(init=False, default=None, repr=False)
+    response_cache: ResponseCache | None = field(init=False, default=None, repr=False)
+    cassette: Cassette | None = field(init=False, default=None, repr=False)
+    dry_run: DryRun | None = field(init=False, default=None, repr=False)
+    _pool_size: int | None = field(init=False, default=None, repr=False)
+    _credentials: tuple[str, str] | None = field(init=False, default=None, repr=False)
+    _login_lock: Lock = field(init=False, default_factory=Lock, repr=False)
+    # only ApiErrors are shared: a RetryLaterError of the leader is meaningless to callers outside deferred_retries()
+    _single_flight: SingleFlight[tuple[str, str], Any] = field(
+        init=False, default_factory=partial(SingleFlight, shared_exceptions=(ApiError,)), repr=False
+    )
 
     def __post_init__(self) -> None:
         self.session.headers["User-Agent"] = f"{PACKAGE_NAME.upper()}/{version(PACKAGE_NAME)}"
@@ -74,6 +207,7 @@ class DspClient:
     def login(self, email: str, password: str) -> None:
         """
         Retrieve a session token and store it as class attribute.
+        The credentials are kept, to log in again when the token expires during a long run.
 
         Args:
             email: email address of the user
@@ -83,20 +217,135 @@ class DspClient:
             ApiError: if DSP-API returns no token with the provided user credentials
         """
         response = self.post(
-            route="/v2/authentication",
+            route=AUTHENTICATION_ROUTE,
             data={"email": email, "password": password},
             timeout=10,
         )
         self.token = response["token"]
         self.session.headers["Authorization"] = f"Bearer {self.token}"
+        self._credentials = (email, password)
+
+    def limit_parallel_requests(self, max_parallel_requests: int) -> None:
+        """
+        Limit the number of requests that are in flight at the same time to a fixed number,
+        summed up over all threads that share this client.
+
+        Args:
+            max_parallel_requests: the global request budget
+        """
+        self.use_concurrency_limiter(AimdLimiter.fixed(max_parallel_requests))
+
+    def parallel_requests_limited(self, max_parallel_requests: int) -> AbstractContextManager[None]:
+        """
+        Like limit_parallel_requests(), but only within this context (see concurrency_limited()).
+
+        Args:
+            max_parallel_requests: the global request budget within the context
+        """
+        return self.concurrency_limited(AimdLimiter.fixed(max_parallel_requests))
+
+    @contextmanager
+    def concurrency_limited(self, limiter: AimdLimiter) -> Iterator[None]:
+        """
+        Like use_concurrency_limiter(), but only within this context:
+        afterwards, the previous limiter and connection pool of the client are restored.
+
+        Args:
+            limiter: the limiter shared by all threads within the context
+        """
+        previous = (self.concurrency_limiter, self._pool_size, dict(self.session.adapters))
+        self.use_concurrency_limiter(limiter)
+        try:
+            yield
+        finally:
+            self.concurrency_limiter, self._pool_size, adapters = previous
+            self.metrics.concurrency = self.concurrency_limiter
+            for prefix, adapter in adapters.items():
+                self.session.mount(prefix, adapter)
+
+    def use_concurrency_limiter(self, limiter: AimdLimiter) -> None:
+        """
+        Limit the number of requests that are in flight at the same time,
+        summed up over all threads that share this client.
+        An adaptive limiter raises the limit while the server answers quickly,
+        and cuts it when the server shows back-pressure (5xx, "try again later", timeouts, high latency).
+        Its limit and the reasons of its changes are part of the metrics of this client.
+        The connection pool of the session is sized for the maximum limit,
+        so that the threads can reuse their connections instead of opening new ones.
+
+        Args:
+            limiter: the limiter shared by all threads
+        """
+        self.concurrency_limiter = limiter
+        self.metrics.concurrency = limiter
+        self._pool_size = limiter.max_limit
+        self._mount_adapters()
+
+    def use_response_cache(self, cache: ResponseCache) -> None:
+        """
+        Cache the responses of the GET requests to the routes that the cache is configured for.
+        The mutating requests of this client remove the cached responses that they can make stale.
+        The hit rate of the cache is part of the metrics of this client.
+        If the cache has a path, the responses of a previous run are loaded from it
+        (write them for the next run with ResponseCache.save() at the end of the run).
+
+        Args:
+            cache: the response cache
+        """
+        cache.load()
+        self.response_cache = cache
+        self.metrics.response_cache = cache
+
+    def use_cassette(self, cassette: Cassette) -> None:
+        """
+        Record the HTTP exchanges of this client into a cassette (save it with Cassette.save() at the end of the run),
+        or replay them from a cassette that was loaded with Cassette.load(), without contacting the server.
+        In the replay, the server of the client is irrelevant, and the login accepts any credentials
+        that were not recorded.
+
+        Args:
+            cassette: the cassette
+        """
+        self.cassette = cassette
+        self._mount_adapters()
+
+    def use_dry_run(self, dry_run: DryRun) -> None:
+        """
+        Don't send the mutating requests (POST/PUT/DELETE, except the login/logout), but count them,
+        and estimate how long the real run will take (see DryRun).
+        The GET requests are sent as usual.
+
+        Args:
+            dry_run: collects the numbers of the dry run
+        """
+        self.dry_run = dry_run
+
+    def phase(self, name: str) -> AbstractContextManager[None]:
+        """In a dry run, the requests within this context are counted under the given name"""
+        return self.dry_run.phase(name) if self.dry_run else nullcontext()
+
+    def _mount_adapters(self) -> None:
+        pool_kwargs: dict[str, Any] = (
+            {"pool_connections": self._pool_size, "pool_maxsize": self._pool_size} if self._pool_size else {}
+        )
+        adapter: BaseAdapter
+        if self.cassette:
+            adapter = self.cassette.create_adapter(**pool_kwargs)
+        elif self._pool_size:
+            adapter = HTTPAdapter(**pool_kwargs)
+        else:
+            return
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
     def logout(self) -> None:
         """
         Delete the token on the server and in this class.
         """
         if self.token:
-            self.delete(route="/v2/authentication")
+            self.delete(route=AUTHENTICATION_ROUTE)
             self.token = None
+            self._credentials = None
             del self.session.headers["Authorization"]
 
     def post(
@@ -126,8 +375,7 @@ class DspClient:
             if "Content-Type" not in headers:
                 headers["Content-Type"] = "application/json; charset=UTF-8"
         params = RequestParameters("POST", self._make_url(route), timeout or self.timeout, data, headers)
-        response = self._try_network_action(params)
-        return cast(dict[str, Any], response.json())
+        return self._mutate(params)
 
     def get(
         self,
@@ -148,8 +396,50 @@ class DspClient:
             ApiError: if the server returns a permanent error
         """
         params = RequestParameters("GET", self._make_url(route), self.timeout, headers=headers)
-        response = self._try_network_action(params)
-        return cast(dict[str, Any], response.json())
+        route_template = normalize_route(params.url)
+        cache = (
+            self.response_cache if self.response_cache and self.response_cache.is_cacheable(route_template) else None
+        )
+        if cache and (cached := cache.get(params.url, route_template)) is not None:
+            return cast(dict[str, Any], cached)
+        generation = cache.generation if cache else 0
+        content = self._get_coalesced(params, route_template)
+        if self.dry_run:
+            self.dry_run.observe(route_template, content)
+        if cache:
+            cache.put(params.url, route_template, content, generation)
+        return cast(dict[str, Any], content)
+
+    def _get_coalesced(self, params: RequestParameters, route_template: str) -> Any:
+        if route_template not in self.coalesced_routes:
+            return self._try_network_action(params)
+        key = (params.url, json.dumps(params.headers, sort_keys=True))
+        content, shared = self._single_flight.do(key, partial(self._try_network_action, params))
+        if not shared:
+            return content
+        self.metrics.record_coalesced("GET", route_template)
+        # the callers may modify the response, so every thread gets its own copy
+        return copy.deepcopy(content)
+
+    def _mutate(self, params: RequestParameters) -> dict[str, Any]:
+        if self.dry_run and params.url != self._make_url(AUTHENTICATION_ROUTE):
+            logger.info(f"Dry run: {params.method} {params.url} is not sent")
+            return self.dry_run.answer(params.method, params.url, normalize_route(params.url), params.data)
+        try:
+            return cast(dict[str, Any], self._try_network_action(params))
+        finally:
+            # also if the request failed, because it might have been executed nevertheless
+            if self.response_cache:
+                self.response_cache.invalidate_after_mutation(params.url, params.data)
+
+    def get_raw(self, route: str, headers: dict[str, str] | None = None) -> bytes:
+        """
+        Same as get(), but returns the body of the response without parsing it,
+        e.g. to parse it in another process.
+        The response cache and the coalescing of identical GETs are not used.
+        """
+        params = RequestParameters("GET", self._make_url(route), self.timeout, headers=headers, raw_response=True)
+        return cast(bytes, self._try_network_action(params))
 
     def put(
         self,
@@ -177,8 +467,7 @@ class DspClient:
             if "Content-Type" not in headers:
                 headers["Content-Type"] = "application/json; charset=UTF-8"
         params = RequestParameters("PUT", self._make_url(route), self.timeout, data, headers)
-        response = self._try_network_action(params)
-        return cast(dict[str, Any], response.json())
+        return self._mutate(params)
 
     def delete(
         self,
@@ -199,62 +488,117 @@ class DspClient:
             ApiError: if the server returns a permanent error
         """
         params = RequestParameters("DELETE", self._make_url(route), self.timeout, headers=headers)
-        response = self._try_network_action(params)
-        return cast(dict[str, Any], response.json())
+        return self._mutate(params)
 
     def _make_url(self, route: str) -> str:
         if not route.startswith("/"):
             route = f"/{route}"
         return self.server + route
 
-    def _try_network_action(self, params: RequestParameters) -> Response:
+    def _try_network_action(self, params: RequestParameters) -> Any:
         """
-        Try 7 times to execute an HTTP request.
+        Execute an HTTP request, and retry it according to the retry policy.
         If a timeout error, a ConnectionError, or a requests.RequestException occur,
         or if the response indicates that there is a non-permanent server-side problem,
         this function waits and retries the HTTP request.
-        The waiting times are 1, 2, 4, 8, 16, 32, 64 seconds.
+        If the token has expired (HTTP 401), it logs in again and retries the request once.
+        Within deferred_retries(), it raises a RetryLaterError instead of waiting.
 
         Args:
             params: keyword arguments for the HTTP request
 
         Raises:
-            ApiError: if the server returns a permanent error
+            ApiError: if the server returns a permanent error, or if the retry budget is exhausted
             PermissionsAlreadyUpToDate: if the permissions are already up to date
+            RetryLaterError: if the retries are deferred, and the request should be retried later
             unexpected exceptions: if the action fails with an unexpected exception
 
         Returns:
-            the return value of action
+            the parsed JSON body of the response (or the raw body, if params.raw_response is set)
         """
-        action = partial(self.session.request, **params.as_kwargs())
-        for i in range(10):
+        kwargs = params.as_kwargs()
+
+        def action() -> Response:
+            # self.session is looked up at every attempt, because it is replaced by _renew_session()
+            return self.session.request(**kwargs)
+
+        route = normalize_route(params.url)
+        reauthenticated = False
+        for i in range(self.retry_policy.max_retries):
+            self._log_request(params)
+            sent_with_token = self.token
             try:
-                self._log_request(params)
-                response = action()
-            except (TimeoutError, ReadTimeout):
-                self._log_and_sleep(reason="TimeoutError/ReadTimeout raised", retry_counter=i, exc_info=True)
+                # the slot of the limiter is released before the retry sleep
+                with self.concurrency_limiter or nullcontext():
+                    start = time.perf_counter()
+                    response = action()
+            except (TimeoutError, ReadTimeout) as err:
+                self.metrics.record_exception(params.method, route, exception=err, seconds=time.perf_counter() - start)
+                self._report_backpressure(start, "timeout")
+                if not self._wait_before_retry("TimeoutError/ReadTimeout raised", params, route, retry_counter=i):
+                    raise ApiError(f"The retry budget is exhausted: {err!r}") from err
                 continue
-            except (ConnectionError, RequestException):
+            except (ConnectionError, RequestException) as err:
+                self.metrics.record_exception(params.method, route, exception=err, seconds=time.perf_counter() - start)
+                self._report_backpressure(start, "connection error")
                 self._renew_session()
-                self._log_and_sleep(reason="ConnectionError/RequestException raised", retry_counter=i, exc_info=True)
+                if not self._wait_before_retry("ConnectionError/RequestException raised", params, route, i):
+                    raise ApiError(f"The retry budget is exhausted: {err!r}") from err
                 continue
 
-            self._log_response(response)
+            seconds = time.perf_counter() - start
+            self._record_response(params, route, response, seconds)
             if response.status_code == HTTP_OK:
-                return response
+                if self.concurrency_limiter:
+                    self.concurrency_limiter.on_response(start, seconds)
+                if self.retry_policy.budget:
+                    self.retry_policy.budget.on_success()
+                return self._parse_response(response, params)
 
-            self._handle_non_ok_responses(response, i)
-
-        # after 7 vain attempts to create a response, try it a last time and let it escalate
-        return action()
-
-    def _handle_non_ok_responses(self, response: Response, retry_counter: int) -> None:
-        in_500_range = 500 <= response.status_code < 600
-        try_again_later = "try again later" in response.text.lower()
-        should_retry = try_again_later or in_500_range
-        if should_retry:
-            self._log_and_sleep("Transient Error", retry_counter, exc_info=False)
-            return None
+            self._log_response(response)
+            if response.status_code == HTTP_UNAUTHORIZED and not reauthenticated:
+                reauthenticated = self._reauthenticate(params, sent_with_token)
+                if reauthenticated:
+                    continue
+            if _is_transient_error(response):
+                self._report_backpressure(start, f"HTTP {response.status_code}")
+            self._handle_non_ok_responses(response, params, route, i)
+
+        # after max_retries vain attempts to create a response, try it a last time and let it escalate
+        start = time.perf_counter()
+        response = action()
+        self._record_response(params, route, response, seconds=time.perf_counter() - start)
+        return self._parse_response(response, params)
+
+    def _parse_response(self, response: Response, params: RequestParameters) -> Any:
+        if params.raw_response:
+            self._log_response(response)
+            return response.content
+        # the body is parsed only once, and the parsed body is reused for the log
+        content = json_codec.loads(response.content)
+        self._log_response(response, content)
+        return content
+
+    def _record_response(self, params: RequestParameters, route: str, response: Response, seconds: float) -> None:
+        self.metrics.record_response(
+            params.method,
+            route,
+            status_code=response.status_code,
+            seconds=seconds,
+            request_bytes=len(params.data_serialized or b""),
+            response_bytes=len(response.content or b""),
+        )
+        if self.dry_run and params.method == "GET":
+            self.dry_run.record_read(params.method, route, seconds)
+
+    def _handle_non_ok_responses(
+        self, response: Response, params: RequestParameters, route: str, retry_counter: int
+    ) -> None:
+        if _is_transient_error(response):
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if self._wait_before_retry("Transient Error", params, route, retry_counter, retry_after):
+                return None
+            raise ApiError("The retry budget is exhausted", response.text, response.status_code)
 
         already = "dsp.errors.BadRequestException: The submitted permissions are the same as the current ones"
         if response.status_code == 400 and response.text and already in response.text:
@@ -262,28 +606,74 @@ class DspClient:
 
         raise ApiError("Permanently unable to execute the network action", response.text, response.status_code)
 
+    def _reauthenticate(self, params: RequestParameters, sent_with_token: str | None) -> bool:
+        """
+        Logs in again after the server rejected the token, and returns whether the request can be retried.
+        Only one thread logs in, the others wait for it and then use its new token.
+        """
+        if not self._credentials or params.url == self._make_url(AUTHENTICATION_ROUTE):
+            return False
+        with self._login_lock:
+            if self.token == sent_with_token:
+                logger.warning(f"The token was rejected by {params.method} {params.url}, logging in again")
+                self.login(*self._credentials)
+        return True
+
+    def _report_backpressure(self, started_at: float, reason: str) -> None:
+        if self.concurrency_limiter:
+            self.concurrency_limiter.on_backpressure(started_at, reason)
+
     def _renew_session(self) -> None:
         self.session.close()
         self.session = Session()
+        self._mount_adapters()
         self.session.headers["User-Agent"] = f"{PACKAGE_NAME.upper()}/{version(PACKAGE_NAME)}"
         if self.token:
             self.session.headers["Authorization"] = f"Bearer {self.token}"
 
-    def _log_and_sleep(self, reason: str, retry_counter: int, exc_info: bool) -> None:
-        msg = f"{reason}: Try reconnecting to DSP server, next attempt in {2**retry_counter} seconds..."
-        logger.error(f"{msg} ({retry_counter=:})", exc_info=exc_info)
-        time.sleep(2**retry_counter)
-
-    def _log_response(self, response: Response) -> None:
+    def _wait_before_retry(
+        self,
+        reason: str,
+        params: RequestParameters,
+        route: str,
+        retry_counter: int,
+        retry_after: float | None = None,
+    ) -> bool:
+        """
+        Waits before the next attempt (or raises a RetryLaterError if the retries are deferred).
+        Returns False if the retry budget is exhausted, i.e. if the request must not be retried.
+        """
+        if self.retry_policy.budget and not self.retry_policy.budget.try_spend():
+            logger.error(f"{reason}: The retry budget is exhausted, the request is not retried")
+            return False
+        previous_deferrals = get_previous_deferrals()
+        delay = self.retry_policy.get_delay(retry_counter + (previous_deferrals or 0), retry_after)
+        self.metrics.record_retry(params.method, route, sleep_seconds=delay)
+        if previous_deferrals is not None:
+            logger.warning(f"{reason}: {params.method} {params.url} will be retried in {delay:.1f} seconds")
+            raise RetryLaterError(f"{reason}: {params.method} {params.url}", delay) from None
+        msg = f"{reason}: Try reconnecting to DSP server, next attempt in {delay:.1f} seconds..."
+        logger.error(f"{msg} ({retry_counter=:})", exc_info=sys.exc_info()[1])
+        time.sleep(delay)
+        return True
+
+    def _log_response(self, response: Response, content: Any = _NOT_PARSED) -> None:
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
         dumpobj: dict[str, Any] = {
             "status_code": response.status_code,
             "headers": self._anonymize(dict(response.headers)),
         }
-        try:
-            dumpobj["content"] = self._anonymize(json.loads(response.text))
-        except json.JSONDecodeError:
-            dumpobj["content"] = response.text if "token" not in response.text else "***"
-        logger.debug(f"RESPONSE: {json.dumps(dumpobj)}")
+        if self._is_body_sampled():
+            if content is _NOT_PARSED:
+                # the raw body is logged as it is (and truncated without parsing it), e.g. big pages of /v2/resources
+                content = response.text if "token" not in response.text else "***"
+            dumpobj["content"] = self._anonymize(content) if isinstance(content, dict) else content
+        logger.debug("RESPONSE: %s", _LazyJson(dumpobj, "content", self.log_config.max_body_chars))
+
+    def _is_body_sampled(self) -> bool:
+        rate = self.log_config.body_sample_rate
+        return rate >= 1 or random.random() < rate  # noqa: S311 (not for cryptographic purposes)
 
     def _anonymize(self, data: dict[str, Any] | None) -> dict[str, Any] | None:
         if not data:
@@ -308,12 +698,14 @@ class DspClient:
             return f"{sensitive_info[:unmasked_until]}[+{len(sensitive_info) - unmasked_until}]"
 
     def _log_request(self, params: RequestParameters) -> None:
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
         dumpobj = {
             "method": params.method,
             "url": params.url,
             "headers": self._anonymize(dict(self.session.headers) | (params.headers or {})),
             "timeout": params.timeout,
         }
-        if params.data:
+        if params.data and self._is_body_sampled():
             dumpobj["data"] = self._anonymize(params.data)
-        logger.debug(f"REQUEST: {json.dumps(dumpobj)}")
+        logger.debug("REQUEST: %s", _LazyJson(dumpobj, "data", self.log_config.max_body_chars))
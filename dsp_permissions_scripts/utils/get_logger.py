@@ -1,14 +1,96 @@
+import atexit
 import logging
+import queue
 from datetime import datetime
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from threading import Lock
 
 from dsp_permissions_scripts.utils.helpers import PACKAGE_NAME
 
+_lock = Lock()
+_queue_handler: QueueHandler | None = None
+_listener: QueueListener | None = None
+_logfile: Path | None = None
+_PACKAGE_LOGGER = __name__.partition(".")[0]
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Puts the records into the queue without formatting them,
+    so that the formatting (including the lazy arguments of DspClient's request/response logs)
+    happens in the background thread of the listener, not in the thread that logs.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging(
+    filename: str | Path = "logging.log", *, max_bytes: int | None = None, backup_count: int = 5
+) -> None:
+    """
+    Configure the logging of this package:
+    The records are passed through a queue to a background thread, which writes them into a file.
+    Like this, the threads that send requests don't wait for the file I/O, and don't compete for the file's lock.
+    This is done automatically (without rotation) by the first call to get_logger(),
+    and can be called again to change the configuration.
+
+    Args:
+        filename: the log file
+        max_bytes: if given, the log file is rotated when it would exceed this size
+        backup_count: number of rotated log files that are kept (only relevant if max_bytes is given)
+    """
+    global _queue_handler, _listener, _logfile  # noqa: PLW0603 (global statement)
+    with _lock:
+        if _listener:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+        file_handler: logging.FileHandler
+        if max_bytes:
+            file_handler = RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count)
+        else:
+            file_handler = logging.FileHandler(filename, mode="a")
+        formatter = logging.Formatter(fmt="{asctime} {filename: <25} {levelname: <8} {message}", style="{")
+        formatter.default_time_format = "%Y-%m-%d %H:%M:%S"
+        file_handler.setFormatter(formatter)
+        log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        if _queue_handler:
+            # the loggers keep the same handler, only its queue is exchanged
+            _queue_handler.queue = log_queue
+        else:
+            _queue_handler = _DeferredQueueHandler(log_queue)
+            atexit.register(shutdown_logging)
+        _listener = QueueListener(log_queue, file_handler)
+        _listener.start()
+        _logfile = Path(file_handler.baseFilename)
+
+
+def shutdown_logging() -> None:
+    """Write all records that are still in the queue, and stop the background thread."""
+    global _listener  # noqa: PLW0603 (global statement)
+    with _lock:
+        if _listener:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+
+
+def get_log_file() -> Path | None:
+    """Returns the file the logs are written to, or None if the logging has not been configured yet."""
+    return _logfile
+
 
 def get_logger(name: str) -> logging.Logger:
     """
     Create a logger instance,
-    set its level to INFO,
-    and configure it to write to a file in the user's home directory.
+    set its level to DEBUG,
+    and configure it to write to the log file (see configure_logging()).
+    Calling it several times with the same name doesn't add more handlers.
 
     Args:
         name: name of the logger (usually __name__ of the calling module)
@@ -16,17 +98,16 @@ def get_logger(name: str) -> logging.Logger:
     Returns:
         a logger instance
     """
-    _logger = logging.getLogger(name)
-    _logger.setLevel(logging.DEBUG)
-    formatter = logging.Formatter(fmt="{asctime} {filename: <25} {levelname: <8} {message}", style="{")
-    formatter.default_time_format = "%Y-%m-%d %H:%M:%S"
-    handler = logging.FileHandler(
-        filename="logging.log",
-        mode="a",
-    )
-    handler.setFormatter(formatter)
-    _logger.addHandler(handler)
-    return _logger
+    if not _listener:
+        configure_logging()
+    # the loggers of the modules of this package propagate their records to the package logger,
+    # so that the handler is only added once
+    handler_owner = _PACKAGE_LOGGER if name.partition(".")[0] == _PACKAGE_LOGGER else name
+    owner = logging.getLogger(handler_owner)
+    owner.setLevel(logging.DEBUG)
+    if _queue_handler and _queue_handler not in owner.handlers:
+        owner.addHandler(_queue_handler)
+    return logging.getLogger(name)
 
 
 def get_timestamp() -> str:
@@ -47,5 +128,4 @@ def log_start_of_script(host: str, shortcode: str) -> None:
     logger.info("")
 
     print(f"\n{msg}")
-    logfile = next(handler.baseFilename for handler in logger.handlers if isinstance(handler, logging.FileHandler))
-    print(f"There will be no print output, only logging to file {logfile}")
+    print(f"There will be no print output, only logging to file {get_log_file()}")
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+from functools import partial
+from pathlib import Path
+from threading import Lock
+from typing import Any
+from typing import Iterator
+from typing import Literal
+from typing import Sequence
+
+from pydantic import BaseModel
+
+from dsp_permissions_scripts.ap.ap_get import get_aps_of_project
+from dsp_permissions_scripts.doap.doap_get import get_doaps_of_project
+from dsp_permissions_scripts.models.errors import ApiError
+from dsp_permissions_scripts.models.errors import InvalidGroupError
+from dsp_permissions_scripts.models.errors import InvalidIRIError
+from dsp_permissions_scripts.models.group_utils import GroupRegistry
+from dsp_permissions_scripts.oap.oap_get import get_all_oaps_of_project
+from dsp_permissions_scripts.oap.oap_model import OapRetrieveConfig
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+from dsp_permissions_scripts.utils.get_logger import get_logger
+from dsp_permissions_scripts.utils.project import get_all_project_shortcodes
+
+logger = get_logger(__name__)
+
+RecordKind = Literal["AP", "DOAP", "OAP", "ERROR"]
+
+
+@dataclass
+class HarvestStore:
+    """
+    Consolidated store for the permissions of many projects, in the JSON Lines format.
+    Every line is one permission object: {"shortcode": ..., "kind": "AP" | "DOAP" | "OAP" | "ERROR", "data": {...}}.
+    The records of a project are appended as soon as they are retrieved,
+    so that the memory consumption doesn't grow with the number of projects.
+    """
+
+    path: Path
+    _lock: Lock = field(init=False, default_factory=Lock, repr=False)
+
+    def append(self, shortcode: str, kind: RecordKind, data: list[dict[str, Any]]) -> None:
+        lines = [json.dumps({"shortcode": shortcode, "kind": kind, "data": d}, ensure_ascii=False) for d in data]
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, mode="a", encoding="utf-8") as f:
+                f.writelines(f"{line}\n" for line in lines)
+
+    def append_models(self, shortcode: str, kind: RecordKind, models: Sequence[BaseModel]) -> None:
+        self.append(shortcode, kind, [m.model_dump(exclude_none=True, mode="json") for m in models])
+
+    def read(self) -> Iterator[tuple[str, RecordKind, dict[str, Any]]]:
+        """Yields the records of the store, one by one, as (shortcode, kind, data)."""
+        with open(self.path, mode="r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                yield record["shortcode"], record["kind"], record["data"]
+
+
+def _harvest_project(
+    shortcode: str,
+    dsp_client: DspClient,
+    store: HarvestStore,
+    group_registry: GroupRegistry,
+    oap_config: OapRetrieveConfig | None,
+) -> bool:
+    logger.info(f"Harvesting the permissions of project {shortcode}...")
+    try:
+        store.append_models(shortcode, "AP", get_aps_of_project(shortcode, dsp_client, group_registry))
+        store.append_models(shortcode, "DOAP", get_doaps_of_project(shortcode, dsp_client, group_registry))
+        if oap_config:
+            # every project needs its own config, because the context of the config is filled during the retrieval
+            project_oap_config = oap_config.model_copy(deep=True)
+            oaps = get_all_oaps_of_project(shortcode, dsp_client, project_oap_config)
+            store.append_models(shortcode, "OAP", oaps)
+    except (ApiError, InvalidGroupError, InvalidIRIError) as err:
+        logger.error(f"Could not harvest the permissions of project {shortcode}: {err}")
+        store.append(shortcode, "ERROR", [{"message": err.message}])
+        return False
+    logger.info(f"Harvested the permissions of project {shortcode}")
+    return True
+
+
+def harvest_permissions_of_projects(  # noqa: PLR0913
+    dsp_client: DspClient,
+    store: HarvestStore,
+    *,
+    shortcodes: list[str] | None = None,
+    oap_config: OapRetrieveConfig | None = None,
+    nprojects: int = 4,
+    max_parallel_requests: int = 8,
+) -> list[str]:
+    """
+    Retrieves the APs, DOAPs and (optionally) OAPs of many projects concurrently,
+    and streams them into one consolidated store.
+    All projects share the same (authenticated) client and the same group registry.
+
+    Args:
+        dsp_client: client to access the DSP server
+        store: the store the permissions are written into
+        shortcodes: the projects to harvest (default: all projects of the server)
+        oap_config: which OAPs to retrieve (default: no OAPs at all)
+        nprojects: number of projects that are harvested at the same time
+        max_parallel_requests: maximum number of requests in flight at the same time, over all projects
+            (only during the harvest: afterwards, the client has its previous limit again)
+
+    Returns:
+        the shortcodes of the projects that could not be harvested completely
+    """
+    shortcodes = shortcodes if shortcodes is not None else get_all_project_shortcodes(dsp_client)
+    logger.info(f"******* Harvesting the permissions of {len(shortcodes)} projects into {store.path}... *******")
+    harvest_project = partial(
+        _harvest_project,
+        dsp_client=dsp_client,
+        store=store,
+        group_registry=GroupRegistry(dsp_client),
+        oap_config=oap_config,
+    )
+    with dsp_client.parallel_requests_limited(max_parallel_requests), ThreadPoolExecutor(nprojects) as pool:
+        successes = list(pool.map(harvest_project, shortcodes))
+    failed = [sc for sc, success in zip(shortcodes, successes) if not success]
+    if failed:
+        logger.error(f"{len(failed)} of {len(shortcodes)} projects could not be harvested: {', '.join(failed)}")
+    else:
+        logger.info(f"******* Harvested the permissions of {len(shortcodes)} projects into {store.path} *******")
+    return failed
@@ -0,0 +1,88 @@
+"""
+JSON encoding and decoding of request/response bodies and of the files in project_data.
+If orjson is installed, it is used (it is several times faster on the big pages of /v2/resources),
+otherwise the standard library.
+Both codecs produce the same bytes, so that e.g. the hashes of the request bodies in a cassette don't depend on it.
+"""
+
+from __future__ import annotations
+
+import importlib
+import json
+from dataclasses import dataclass
+from typing import Any
+from typing import Protocol
+
+JSONDecodeError = json.JSONDecodeError
+"""Raised by loads() for invalid JSON (orjson's error is a subclass of it)"""
+
+
+class JsonCodec(Protocol):
+    @property
+    def name(self) -> str: ...
+
+    def dumps(self, obj: Any, *, indent: bool = False, sort_keys: bool = False) -> bytes:
+        """Encodes obj as UTF-8 JSON, without escaping non-ASCII characters (indent: with 2 spaces)"""
+
+    def loads(self, data: bytes | str) -> Any: ...
+
+
+@dataclass(frozen=True)
+class StdlibJsonCodec:
+    name: str = "json"
+
+    def dumps(self, obj: Any, *, indent: bool = False, sort_keys: bool = False) -> bytes:
+        # the separators of the compact form are the same as orjson's
+        separators = (",", ": ") if indent else (",", ":")
+        text = json.dumps(
+            obj, ensure_ascii=False, indent=2 if indent else None, separators=separators, sort_keys=sort_keys
+        )
+        return text.encode("utf-8")
+
+    def loads(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+
+@dataclass(frozen=True)
+class OrjsonCodec:
+    orjson: Any
+    name: str = "orjson"
+
+    def dumps(self, obj: Any, *, indent: bool = False, sort_keys: bool = False) -> bytes:
+        option = (self.orjson.OPT_INDENT_2 if indent else 0) | (self.orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return self.orjson.dumps(obj, option=option)  # type: ignore[no-any-return]
+
+    def loads(self, data: bytes | str) -> Any:
+        return self.orjson.loads(data)
+
+
+def _best_available_codec() -> JsonCodec:
+    try:
+        return OrjsonCodec(importlib.import_module("orjson"))
+    except ImportError:
+        return StdlibJsonCodec()
+
+
+_codec: JsonCodec = _best_available_codec()
+
+
+def get_json_codec() -> JsonCodec:
+    return _codec
+
+
+def set_json_codec(codec: JsonCodec) -> None:
+    """Replaces the codec that is used by dumps() and loads(), e.g. to compare the codecs in a benchmark"""
+    global _codec  # noqa: PLW0603 (global statement)
+    _codec = codec
+
+
+def dumps(obj: Any, *, indent: bool = False, sort_keys: bool = False) -> bytes:
+    return _codec.dumps(obj, indent=indent, sort_keys=sort_keys)
+
+
+def dumps_str(obj: Any, *, indent: bool = False, sort_keys: bool = False) -> str:
+    return _codec.dumps(obj, indent=indent, sort_keys=sort_keys).decode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    return _codec.loads(data)
@@ -1,14 +1,227 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+from threading import Lock
 from urllib.parse import quote_plus
 
 from dsp_permissions_scripts.models.errors import ApiError
 from dsp_permissions_scripts.oap.oap_model import OapRetrieveConfig
 from dsp_permissions_scripts.utils.dsp_client import DspClient
 from dsp_permissions_scripts.utils.get_logger import get_logger
+from dsp_permissions_scripts.utils.helpers import KNORA_ADMIN_ONTO_NAMESPACE
 
 logger = get_logger(__name__)
 
 
+@dataclass(frozen=True)
+class OntologyMetadata:
+    """The resource classes and the JSON-LD context of an ontology, in the version of the last modification date."""
+
+    class_localnames: list[str]
+    context: dict[str, str]
+    last_modification_date: str | None = None
+
+
+@dataclass
+class ProjectMetadataCache:
+    """
+    Cache for the metadata of the projects of one DSP server:
+    the project IRI and ontology IRIs of every shortcode,
+    and the resource classes and the JSON-LD context of every ontology.
+    This metadata doesn't change while the permissions are modified,
+    so it only needs to be fetched once per run (or once at all, if the cache is persisted to disk).
+    Ontologies from a previous run are revalidated with their last modification date before they are used.
+    Projects from a previous run are fetched again (once per run), because ontologies may have been added to them.
+    Use invalidate() after the data model of a project has changed.
+    If the cache has a path, save() writes the changes into this file (call it once at the end of the run).
+    """
+
+    path: Path | None = None
+    projects: dict[str, tuple[str, list[str]]] = field(default_factory=dict)
+    ontologies: dict[str, OntologyMetadata] = field(default_factory=dict)
+    modification_dates: dict[str, str] | None = field(init=False, default=None)
+    _fresh_projects: set[str] = field(init=False, default_factory=set, repr=False)
+    _fresh_ontologies: set[str] = field(init=False, default_factory=set, repr=False)
+    _dirty: bool = field(init=False, default=False, repr=False)
+    _lock: Lock = field(init=False, default_factory=Lock, repr=False)
+
+    def get_project(self, shortcode: str) -> tuple[str, list[str]] | None:
+        """Returns the project IRI and the ontology IRIs of a project, if they have been fetched during this run."""
+        with self._lock:
+            return self.projects.get(shortcode) if shortcode in self._fresh_projects else None
+
+    def set_project(self, shortcode: str, project_iri: str, onto_iris: list[str]) -> None:
+        with self._lock:
+            self.projects[shortcode] = (project_iri, list(onto_iris))
+            self._fresh_projects.add(shortcode)
+            self._dirty = True
+
+    def get_ontology(self, onto_iri: str) -> OntologyMetadata | None:
+        with self._lock:
+            return self.ontologies.get(onto_iri)
+
+    def set_ontology(self, onto_iri: str, onto_metadata: OntologyMetadata) -> None:
+        with self._lock:
+            self.ontologies[onto_iri] = onto_metadata
+            self._fresh_ontologies.add(onto_iri)
+            self._dirty = True
+
+    def is_fresh(self, onto_iri: str) -> bool:
+        """Returns whether the ontology has been fetched or revalidated during this run."""
+        with self._lock:
+            return onto_iri in self._fresh_ontologies
+
+    def mark_fresh(self, onto_iri: str) -> None:
+        with self._lock:
+            self._fresh_ontologies.add(onto_iri)
+
+    def invalidate(self, shortcode: str | None = None) -> None:
+        """
+        Removes the metadata of a project and of its ontologies from the cache,
+        or everything if no shortcode is given.
+        """
+        with self._lock:
+            self.modification_dates = None
+            if shortcode is None:
+                self.projects.clear()
+                self.ontologies.clear()
+                self._fresh_projects.clear()
+                self._fresh_ontologies.clear()
+            elif project := self.projects.pop(shortcode, None):
+                self._fresh_projects.discard(shortcode)
+                for onto_iri in project[1]:
+                    self.ontologies.pop(onto_iri, None)
+                    self._fresh_ontologies.discard(onto_iri)
+            self._dirty = True
+
+    def load(self) -> None:
+        """
+        Reads the cache from its file, if it has one and the file exists.
+        An unreadable file (e.g. truncated by a crash of an older version) is ignored, i.e. the cache starts empty.
+        """
+        if not self.path or not self.path.exists():
+            return
+        try:
+            content = json.loads(self.path.read_text(encoding="utf-8"))
+            projects = {sc: (p["project_iri"], p["onto_iris"]) for sc, p in content["projects"].items()}
+            ontologies = {
+                iri: OntologyMetadata(o["class_localnames"], o["context"], o.get("last_modification_date"))
+                for iri, o in content["ontologies"].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as err:
+            logger.warning(f"Ignoring the unreadable project metadata cache {self.path}: {err!r}")
+            return
+        with self._lock:
+            self.projects = projects
+            self.ontologies = ontologies
+            self._fresh_projects.clear()
+            self._fresh_ontologies.clear()
+            self._dirty = False
+        logger.info(f"Loaded the metadata of {len(self.projects)} projects from {self.path}")
+
+    def save(self) -> None:
+        """
+        Writes the cache into its file, if it has one and if it has changed since it was loaded or saved.
+        Only taking the snapshot of the cache holds the lock, the serialization and the writing don't.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            content = {
+                "projects": {sc: {"project_iri": p[0], "onto_iris": p[1]} for sc, p in self.projects.items()},
+                "ontologies": {
+                    iri: {
+                        "class_localnames": o.class_localnames,
+                        "context": o.context,
+                        "last_modification_date": o.last_modification_date,
+                    }
+                    for iri, o in self.ontologies.items()
+                },
+            }
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first, so that a crash cannot leave a truncated cache file behind
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(content, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+_caches: dict[str, ProjectMetadataCache] = {}
+_caches_lock = Lock()
+
+
+def get_project_metadata_cache(dsp_client: DspClient) -> ProjectMetadataCache:
+    """Returns the project metadata cache of the server the client is connected to."""
+    with _caches_lock:
+        return _caches.setdefault(dsp_client.server, ProjectMetadataCache())
+
+
+def persist_project_metadata_cache(dsp_client: DspClient, path: Path) -> ProjectMetadataCache:
+    """
+    Makes the project metadata cache of the server persistent:
+    The cache is loaded from the file (if it exists),
+    and its changes are written back to it by ProjectMetadataCache.save() (call it once at the end of the run).
+    The file should be specific to the server.
+    """
+    cache = get_project_metadata_cache(dsp_client)
+    cache.path = path
+    cache.load()
+    return cache
+
+
+def invalidate_project_metadata_cache(dsp_client: DspClient, shortcode: str | None = None) -> None:
+    """Forgets the cached metadata of a project (or of all projects) of the server the client is connected to."""
+    get_project_metadata_cache(dsp_client).invalidate(shortcode)
+
+
+def _get_date_value(date: dict[str, str] | str | None) -> str | None:
+    if isinstance(date, dict):
+        return date.get("@value")
+    return date
+
+
+def _get_last_modification_dates(dsp_client: DspClient) -> dict[str, str]:
+    """
+    Returns the last modification date of every ontology of the server.
+    This is one small request, which is done at most once per run.
+    """
+    cache = get_project_metadata_cache(dsp_client)
+    if cache.modification_dates is not None:
+        return cache.modification_dates
+    try:
+        response = dsp_client.get("/v2/ontologies/metadata")
+    except ApiError as err:
+        err.message = "Could not get the metadata of the ontologies"
+        raise err from None
+    ontos = response.get("@graph", [response])  # a single ontology isn't wrapped into a graph
+    dates = {o["@id"]: _get_date_value(o.get("knora-api:lastModificationDate")) for o in ontos if "@id" in o}
+    cache.modification_dates = {iri: date for iri, date in dates.items() if date}
+    return cache.modification_dates
+
+
+def _get_cached_onto_metadata(onto_iri: str, dsp_client: DspClient) -> OntologyMetadata | None:
+    cache = get_project_metadata_cache(dsp_client)
+    if not (cached := cache.get_ontology(onto_iri)):
+        return None
+    if cache.is_fresh(onto_iri):
+        return cached
+    current_date = _get_last_modification_dates(dsp_client).get(onto_iri)
+    if not current_date or current_date != cached.last_modification_date:
+        logger.info(f"The cached version of onto {onto_iri} is outdated")
+        return None
+    cache.mark_fresh(onto_iri)
+    return cached
+
+
 def _get_class_localnames_of_onto_and_context(onto_iri: str, dsp_client: DspClient) -> tuple[list[str], dict[str, str]]:
+    if cached := _get_cached_onto_metadata(onto_iri, dsp_client):
+        return cached.class_localnames, cached.context
     try:
         response = dsp_client.get(f"/v2/ontologies/allentities/{quote_plus(onto_iri)}")
     except ApiError as err:
@@ -17,6 +230,9 @@ def _get_class_localnames_of_onto_and_context(onto_iri: str, dsp_client: DspClie
     all_entities = response["@graph"]
     context = response["@context"]
     class_localnames = [c["@id"] for c in all_entities if c.get("knora-api:isResourceClass")]
+    last_modification_date = _get_date_value(response.get("knora-api:lastModificationDate"))
+    onto_metadata = OntologyMetadata(class_localnames, context, last_modification_date)
+    get_project_metadata_cache(dsp_client).set_ontology(onto_iri, onto_metadata)
     return class_localnames, context
 
 
@@ -35,6 +251,9 @@ def get_all_resource_class_localnames_of_project(
 
 
 def get_proj_iri_and_onto_iris_by_shortcode(shortcode: str, dsp_client: DspClient) -> tuple[str, list[str]]:
+    cache = get_project_metadata_cache(dsp_client)
+    if cached := cache.get_project(shortcode):
+        return cached[0], list(cached[1])
     try:
         response = dsp_client.get(f"/admin/projects/shortcode/{shortcode}")
     except ApiError as err:
@@ -42,4 +261,16 @@ def get_proj_iri_and_onto_iris_by_shortcode(shortcode: str, dsp_client: DspClien
         raise err from None
     project_iri: str = response["project"]["id"]
     onto_iris: list[str] = response["project"]["ontologies"]
+    cache.set_project(shortcode, project_iri, onto_iris)
     return project_iri, onto_iris
+
+
+def get_all_project_shortcodes(dsp_client: DspClient) -> list[str]:
+    """Returns the shortcodes of all projects on the server, except the built-in system projects."""
+    try:
+        response = dsp_client.get("/admin/projects")
+    except ApiError as err:
+        err.message = "Could not get the projects of the server"
+        raise err from None
+    projects = [p for p in response["projects"] if not p["id"].startswith(KNORA_ADMIN_ONTO_NAMESPACE)]
+    return sorted(p["shortcode"] for p in projects)
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import json
+import re
+from collections import Counter
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+from threading import Lock
+from typing import Any
+from urllib.parse import urlparse
+
+from dsp_permissions_scripts.utils.concurrency import AimdLimiter
+from dsp_permissions_scripts.utils.response_cache import ResponseCache
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+"""Upper bounds (in seconds) of the latency histogram. A last bucket (+Inf) collects the slower requests."""
+
+_ROUTE_TEMPLATES = [
+    (re.compile(r"^/admin/projects/shortcode/[^/]+"), "/admin/projects/shortcode/{shortcode}"),
+    (re.compile(r"^/v2/searchextended/[^/]+"), "/v2/searchextended/{query}"),
+]
+
+
+def normalize_route(url: str) -> str:
+    """
+    Reduces the URL of a request to its route template,
+    so that e.g. all requests to /v2/resources/{iri} are counted together.
+    The query string is dropped, and URL-encoded IRIs are replaced by "{iri}".
+    """
+    path = urlparse(url).path or "/"
+    for regex, template in _ROUTE_TEMPLATES:
+        if regex.match(path):
+            return template
+    return "/".join("{iri}" if "%" in segment else segment for segment in path.split("/"))
+
+
+@dataclass
+class RouteMetrics:
+    """Aggregated numbers of all requests with the same HTTP method and route template"""
+
+    requests: int = 0
+    retries: int = 0
+    retry_sleep_seconds: float = 0.0
+    coalesced: int = 0
+    """Calls that were answered with the response of an identical request of another thread"""
+    request_bytes: int = 0
+    response_bytes: int = 0
+    latency_seconds_sum: float = 0.0
+    latency_buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    outcomes: Counter[str] = field(default_factory=Counter)
+    """Status codes of the responses, or names of the exceptions if there was no response"""
+
+    def observe_latency(self, seconds: float) -> None:
+        self.latency_seconds_sum += seconds
+        index = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+        self.latency_buckets[index] += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        bounds = [str(b) for b in LATENCY_BUCKETS] + ["+Inf"]
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "retry_sleep_seconds": round(self.retry_sleep_seconds, 3),
+            "coalesced": self.coalesced,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "latency_seconds_sum": round(self.latency_seconds_sum, 6),
+            "latency_seconds_mean": round(self.latency_seconds_sum / self.requests, 6) if self.requests else 0.0,
+            "latency_histogram": dict(zip(bounds, self.latency_buckets)),
+            "outcomes": dict(sorted(self.outcomes.items())),
+        }
+
+
+@dataclass
+class RequestMetrics:
+    """
+    Collects numbers about the requests of a DspClient, per HTTP method and route template.
+    It is thread-safe, so that the threads which share a client can record into the same instance.
+    """
+
+    routes: dict[tuple[str, str], RouteMetrics] = field(default_factory=dict)
+    concurrency: AimdLimiter | None = None
+    """The concurrency limiter of the client, if there is one"""
+    response_cache: ResponseCache | None = None
+    """The response cache of the client, if there is one"""
+    _lock: Lock = field(default_factory=Lock, repr=False)
+
+    def _get(self, method: str, route: str) -> RouteMetrics:
+        if (key := (method, route)) not in self.routes:
+            self.routes[key] = RouteMetrics()
+        return self.routes[key]
+
+    def record_response(  # noqa: PLR0913 (too many arguments)
+        self,
+        method: str,
+        route: str,
+        *,
+        status_code: int,
+        seconds: float,
+        request_bytes: int,
+        response_bytes: int,
+    ) -> None:
+        with self._lock:
+            metrics = self._get(method, route)
+            metrics.requests += 1
+            metrics.request_bytes += request_bytes
+            metrics.response_bytes += response_bytes
+            metrics.outcomes[str(status_code)] += 1
+            metrics.observe_latency(seconds)
+
+    def record_exception(self, method: str, route: str, *, exception: BaseException, seconds: float) -> None:
+        """Records a request that failed without a response (e.g. a timeout or a connection error)"""
+        with self._lock:
+            metrics = self._get(method, route)
+            metrics.requests += 1
+            metrics.outcomes[type(exception).__name__] += 1
+            metrics.observe_latency(seconds)
+
+    def record_retry(self, method: str, route: str, *, sleep_seconds: float) -> None:
+        with self._lock:
+            metrics = self._get(method, route)
+            metrics.retries += 1
+            metrics.retry_sleep_seconds += sleep_seconds
+
+    def record_coalesced(self, method: str, route: str) -> None:
+        with self._lock:
+            self._get(method, route).coalesced += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.routes.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Returns a copy of the numbers collected so far, e.g.:
+        {"totals": {...}, "routes": {"GET /v2/resources/{iri}": {"requests": 2, ..., "outcomes": {"200": 2}}}}
+        """
+        with self._lock:
+            routes = {f"{m} {r}": metrics.as_dict() for (m, r), metrics in sorted(self.routes.items())}
+        totals = {
+            key: sum(route[key] for route in routes.values())
+            for key in ["requests", "retries", "retry_sleep_seconds", "coalesced", "request_bytes", "response_bytes"]
+        }
+        totals["latency_seconds_sum"] = round(sum(route["latency_seconds_sum"] for route in routes.values()), 6)
+        snapshot = {"totals": totals, "routes": routes}
+        if self.concurrency:
+            snapshot["concurrency"] = self.concurrency.snapshot()
+        if self.response_cache:
+            snapshot["response_cache"] = self.response_cache.snapshot()
+        return snapshot
+
+    def to_prometheus(self) -> str:
+        """Returns the numbers in the text exposition format of Prometheus"""
+        lines = []
+        with self._lock:
+            items = [(m, r, metrics.as_dict()) for (m, r), metrics in sorted(self.routes.items())]
+        for name, key, help_text in [
+            ("dsp_requests_total", "requests", "Number of requests (including the retried ones)"),
+            ("dsp_request_retries_total", "retries", "Number of retries"),
+            ("dsp_request_retry_sleep_seconds_total", "retry_sleep_seconds", "Time spent waiting before retries"),
+            ("dsp_requests_coalesced_total", "coalesced", "Calls answered by an identical concurrent request"),
+            ("dsp_request_bytes_total", "request_bytes", "Size of the request bodies"),
+            ("dsp_response_bytes_total", "response_bytes", "Size of the response bodies"),
+        ]:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f'{name}{{method="{m}",route="{r}"}} {d[key]}' for m, r, d in items]
+        lines += [
+            "# HELP dsp_responses_total Number of responses per status code (or exception if there was no response)",
+            "# TYPE dsp_responses_total counter",
+        ]
+        for m, r, d in items:
+            lines += [
+                f'dsp_responses_total{{method="{m}",route="{r}",outcome="{o}"}} {n}' for o, n in d["outcomes"].items()
+            ]
+        lines += [
+            "# HELP dsp_request_duration_seconds Latency of the requests",
+            "# TYPE dsp_request_duration_seconds histogram",
+        ]
+        for m, r, d in items:
+            cumulative = 0
+            for bound, count in d["latency_histogram"].items():
+                cumulative += count
+                lines.append(
+                    f'dsp_request_duration_seconds_bucket{{method="{m}",route="{r}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'dsp_request_duration_seconds_sum{{method="{m}",route="{r}"}} {d["latency_seconds_sum"]}')
+            lines.append(f'dsp_request_duration_seconds_count{{method="{m}",route="{r}"}} {d["requests"]}')
+        if self.concurrency:
+            concurrency = self.concurrency.snapshot()
+            lines += [
+                "# HELP dsp_concurrency_limit Current limit of parallel requests",
+                "# TYPE dsp_concurrency_limit gauge",
+                f"dsp_concurrency_limit {concurrency['limit']}",
+                "# HELP dsp_concurrency_limit_changes_total Number of changes of the concurrency limit per reason",
+                "# TYPE dsp_concurrency_limit_changes_total counter",
+            ]
+            lines += [
+                f'dsp_concurrency_limit_changes_total{{reason="{reason}"}} {n}'
+                for reason, n in concurrency["change_reasons"].items()
+            ]
+        if self.response_cache:
+            cache = self.response_cache.snapshot()
+            for name, key, help_text in [
+                ("dsp_response_cache_hits_total", "hits", "Number of GETs answered from the response cache"),
+                ("dsp_response_cache_misses_total", "misses", "Number of cacheable GETs sent to the server"),
+            ]:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                lines += [f'{name}{{route="{r}"}} {d[key]}' for r, d in cache["routes"].items()]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path) -> None:
+        """Writes the numbers into a file: in the Prometheus text format if it ends with .prom, else as JSON."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == ".prom":
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), indent=2)
+        path.write_text(content, encoding="utf-8")
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import os
+import time
+from collections import Counter
+from collections import OrderedDict
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+from threading import Lock
+from typing import Any
+from typing import Iterable
+from urllib.parse import quote_plus
+from urllib.parse import urlparse
+
+from dsp_permissions_scripts.utils import json_codec
+from dsp_permissions_scripts.utils.get_logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_TTLS: dict[str, float] = {
+    "/admin/groups": 600,
+    "/admin/projects": 600,
+    "/admin/projects/shortcode/{shortcode}": 3600,
+    "/v2/ontologies/metadata": 600,
+    "/v2/ontologies/allentities/{iri}": 3600,
+    "/admin/permissions/ap/{iri}": 300,
+    "/admin/permissions/doap/{iri}": 300,
+}
+"""Time to live (in seconds) of the cached responses, per route template (see normalize_route())"""
+
+_INVALIDATED_BY_MUTATIONS_OF = {
+    "/admin/permissions": ("/admin/permissions/ap/{iri}", "/admin/permissions/doap/{iri}"),
+    "/v2/resources": ("/v2/resources/{iri}",),
+    "/v2/values": ("/v2/resources/{iri}",),
+}
+"""Path prefix of a mutating request -> route templates of the cached responses that it can make stale"""
+
+
+@dataclass
+class _Entry:
+    route: str
+    expires_at: float
+    body: bytes
+    """The response, serialized: every hit decodes its own copy, which is much cheaper than copy.deepcopy()"""
+
+
+@dataclass
+class ResponseCache:
+    """
+    Cache for the responses of GET requests to routes that don't change (or hardly change) during a run.
+    Only the routes that have a time to live in ttls are cached.
+    If there are more than max_entries responses, the least recently used ones are evicted.
+    A mutating request (POST/PUT/DELETE) removes the cached responses that it can make stale:
+    e.g. a new DOAP removes the cached APs/DOAPs of its project.
+    If a path is given, load() reads the responses of a previous run (as long as they haven't expired),
+    and save() writes the cache into this file (call it once at the end of the run).
+    Use it with DspClient.use_response_cache().
+    """
+
+    ttls: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_TTLS))
+    max_entries: int = 1000
+    path: Path | None = None
+    hits: Counter[str] = field(init=False, default_factory=Counter)
+    misses: Counter[str] = field(init=False, default_factory=Counter)
+    evictions: int = field(init=False, default=0)
+    generation: int = field(init=False, default=0)
+    """Incremented by every invalidation, so that responses that were requested before it are not stored"""
+    _entries: OrderedDict[str, _Entry] = field(init=False, default_factory=OrderedDict, repr=False)
+    _lock: Lock = field(init=False, default_factory=Lock, repr=False)
+
+    def is_cacheable(self, route: str) -> bool:
+        return route in self.ttls
+
+    def get(self, url: str, route: str) -> Any | None:
+        """Returns a copy of the cached response (of its own), or None if there is none or if it has expired"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry and entry.expires_at <= time.time():
+                del self._entries[url]
+                entry = None
+            if not entry:
+                self.misses[route] += 1
+                return None
+            self._entries.move_to_end(url)
+            self.hits[route] += 1
+            body = entry.body
+        return json_codec.loads(body)
+
+    def put(self, url: str, route: str, content: Any, generation: int) -> None:
+        """
+        Stores a copy of a response.
+        generation is the value of self.generation at the moment the request was sent:
+        if the cache has been invalidated in the meantime, the response might be stale, and is not stored.
+        """
+        body = json_codec.dumps(content)
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[url] = _Entry(route, time.time() + self.ttls[route], body)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, routes: Iterable[str] | None = None, url_contains: str | None = None) -> None:
+        """
+        Removes the cached responses of the given route templates (or of all routes),
+        optionally only those whose URL contains url_contains.
+        """
+        routes = set(routes) if routes is not None else None
+        with self._lock:
+            self.generation += 1
+            stale = [
+                url
+                for url, entry in self._entries.items()
+                if (routes is None or entry.route in routes) and (url_contains is None or url_contains in url)
+            ]
+            for url in stale:
+                del self._entries[url]
+
+    def invalidate_after_mutation(self, url: str, data: dict[str, Any] | None) -> None:
+        """
+        Removes the cached responses that a mutating request can have made stale.
+        If the payload names the project (or the resource), only the responses of this project (resource) are removed.
+        """
+        path = urlparse(url).path
+        for prefix, routes in _INVALIDATED_BY_MUTATIONS_OF.items():
+            if path.startswith(prefix):
+                scope = (data or {}).get("forProject") or (data or {}).get("@id")
+                self.invalidate(routes, url_contains=quote_plus(scope, safe="") if scope else None)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+            return {
+                "entries": len(self._entries),
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                "evictions": self.evictions,
+                "routes": {
+                    route: {"hits": self.hits[route], "misses": self.misses[route]}
+                    for route in sorted(self.hits.keys() | self.misses.keys())
+                },
+            }
+
+    def load(self) -> None:
+        """
+        Reads the cache from its file (without the expired responses), if it has one and the file exists.
+        An unreadable file is ignored, i.e. the cache starts empty.
+        """
+        if not self.path or not self.path.exists():
+            return
+        now = time.time()
+        try:
+            content = json_codec.loads(self.path.read_bytes())
+            entries = OrderedDict(
+                (e["url"], _Entry(e["route"], e["expires_at"], json_codec.dumps(e["content"])))
+                for e in content["entries"]
+                if e["expires_at"] > now and e["route"] in self.ttls
+            )
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as err:
+            logger.warning(f"Ignoring the unreadable response cache {self.path}: {err!r}")
+            return
+        with self._lock:
+            self._entries = entries
+        logger.info(f"Loaded {len(entries)} cached responses from {self.path}")
+
+    def save(self) -> None:
+        """
+        Writes the cache into its file, if it has one.
+        Only taking the snapshot of the entries holds the lock, the serialization and the writing don't.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            entries = list(self._entries.items())
+        content = {
+            "entries": [
+                {"url": url, "route": e.route, "expires_at": e.expires_at, "content": json_codec.loads(e.body)}
+                for url, e in entries
+            ]
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first, so that a crash cannot leave a truncated cache file behind
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(json_codec.dumps(content))
+        os.replace(tmp_path, self.path)
+        logger.info(f"Saved {len(entries)} cached responses into {self.path}")
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from dataclasses import field
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from typing import Callable
+from typing import Generic
+from typing import Iterable
+from typing import Iterator
+from typing import TypeVar
+
+from dsp_permissions_scripts.models.errors import RetryLaterError
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_deferrals: ContextVar[int | None] = ContextVar("deferrals", default=None)
+
+
+@dataclass
+class RetryBudget:
+    """
+    Limits the retries of all requests together (a token bucket, like the retry throttling of gRPC):
+    Every retry costs one token, and every successful request gives back refill_per_success tokens.
+    During a partial outage, when most requests fail, the budget runs out,
+    and the requests fail fast instead of piling up retries that overload the server even more.
+    It is opt-in (see RetryPolicy.budget): after a longer outage, the budget only recovers with successful requests,
+    so in a long run, a briefly degraded server can make many of the following failures final.
+    """
+
+    max_tokens: float = 100.0
+    refill_per_success: float = 0.1
+    _tokens: float = field(init=False)
+    _lock: Lock = field(init=False, default_factory=Lock, repr=False)
+
+    def __post_init__(self) -> None:
+        self._tokens = self.max_tokens
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+    def try_spend(self) -> bool:
+        """Takes a token for a retry, and returns False if there is none left"""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.refill_per_success)
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Decides how often and after which delay a request that failed transiently is retried.
+
+    Attributes:
+        max_retries: number of retries before the request is sent a last time, whose failure escalates
+        base_delay: delay (in seconds) before the first retry
+        max_delay: the delays double with every retry, but never exceed this value
+        full_jitter: the delay is a random value between 0 and the exponential delay,
+            so that the threads that failed at the same moment don't retry at the same moment
+        max_retry_after: the Retry-After header of the server is respected up to this value (in seconds)
+        budget: the retry budget shared by all requests (default: None, i.e. unlimited)
+    """
+
+    max_retries: int = 10
+    base_delay: float = 1.0
+    max_delay: float = 64.0
+    full_jitter: bool = True
+    max_retry_after: float = 300.0
+    budget: RetryBudget | None = None
+
+    def get_delay(self, retry_counter: int, retry_after: float | None = None) -> float:
+        """Returns the seconds to wait before the retry number retry_counter (counting from 0)"""
+        delay = min(self.max_delay, self.base_delay * 2.0 ** min(retry_counter, 32))
+        if self.full_jitter:
+            delay = random.uniform(0, delay)  # noqa: S311 (not for cryptographic purposes)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_retry_after))
+        return delay
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parses the value of a Retry-After header (seconds or HTTP date) into seconds from now"""
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@contextmanager
+def deferred_retries(previous_deferrals: int = 0) -> Iterator[None]:
+    """
+    Within this context, DspClient doesn't sleep before retrying a request, but raises a RetryLaterError,
+    so that the caller can put the work back into a queue and do something else in the meantime.
+
+    Args:
+        previous_deferrals: how often the work was already deferred (the delays grow with this number)
+    """
+    token = _deferrals.set(previous_deferrals)
+    try:
+        yield
+    finally:
+        _deferrals.reset(token)
+
+
+def get_previous_deferrals() -> int | None:
+    """Returns how often the current work was already deferred, or None if the retries are not deferred"""
+    return _deferrals.get()
+
+
+@dataclass(order=True)
+class _Deferred(Generic[T]):
+    ready_at: float
+    sequence: int
+    item: T = field(compare=False)
+    deferrals: int = field(compare=False)
+
+
+def run_with_retries(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    *,
+    nthreads: int,
+    give_up: Callable[[T, RetryLaterError], R],
+    max_deferrals: int = 10,
+) -> list[R]:
+    """
+    Runs func on all items in a thread pool, with deferred retries (see deferred_retries()):
+    If func raises a RetryLaterError, the item is put back into the queue and is run again after the delay,
+    while the threads work on other items.
+    func must therefore be resumable, i.e. the item should remember which of its parts are already done.
+    The items are taken from the iterable only when there is capacity, so that it can be a lazy generator.
+
+    Args:
+        func: the work to do for one item
+        items: the items
+        nthreads: number of threads
+        give_up: returns the result of an item that was deferred more than max_deferrals times
+        max_deferrals: maximum number of times an item is put back into the queue
+
+    Returns:
+        the results of all items, in the order in which they were finished
+    """
+
+    def run(item: T, deferrals: int) -> R:
+        with deferred_retries(deferrals):
+            return func(item)
+
+    results: list[R] = []
+    deferred: list[_Deferred[T]] = []
+    sequence = itertools.count()
+    pending = iter(items)
+    capacity = 2 * nthreads
+    with ThreadPoolExecutor(max_workers=nthreads) as pool:
+        running: dict[Future[R], tuple[T, int]] = {}
+        exhausted = False
+        while True:
+            while deferred and deferred[0].ready_at <= time.monotonic() and len(running) < capacity:
+                entry = heapq.heappop(deferred)
+                running[pool.submit(run, entry.item, entry.deferrals)] = (entry.item, entry.deferrals)
+            if not exhausted and (free := capacity - len(running)) > 0:
+                new_items = list(itertools.islice(pending, free))
+                exhausted = len(new_items) < free
+                running |= {pool.submit(run, item, 0): (item, 0) for item in new_items}
+            if not running and not deferred:
+                return results
+            timeout = None
+            if deferred and len(running) < capacity:
+                timeout = max(0.0, deferred[0].ready_at - time.monotonic())
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                item, deferrals = running.pop(future)
+                try:
+                    results.append(future.result())
+                except RetryLaterError as err:
+                    if deferrals >= max_deferrals:
+                        results.append(give_up(item, err))
+                    else:
+                        entry = _Deferred(time.monotonic() + err.delay, next(sequence), item, deferrals + 1)
+                        heapq.heappush(deferred, entry)
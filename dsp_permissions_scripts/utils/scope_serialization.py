@@ -1,6 +1,6 @@
 from typing import Any
 
-from dsp_permissions_scripts.models.group_utils import get_full_iri_from_prefixed_iri
+from dsp_permissions_scripts.models.group_utils import GroupRegistry
 from dsp_permissions_scripts.models.group_utils import sort_groups
 from dsp_permissions_scripts.models.scope import PermissionScope
 from dsp_permissions_scripts.utils.dsp_client import DspClient
@@ -28,7 +28,7 @@ def create_scope_from_string(permission_string: str, dsp_client: DspClient) -> P
 
 
 def create_scope_from_admin_route_object(
-    admin_route_object: list[dict[str, Any]], dsp_client: DspClient
+    admin_route_object: list[dict[str, Any]], dsp_client: DspClient, group_registry: GroupRegistry | None = None
 ) -> PermissionScope:
     """Deserializes an object returned by /admin/permissions routes to a PermissionScope object."""
     kwargs: dict[str, list[str]] = {}
@@ -38,21 +38,23 @@ def create_scope_from_admin_route_object(
             kwargs[attr_name].append(obj["additionalInformation"])
         else:
             kwargs[attr_name] = [obj["additionalInformation"]]
-    return PermissionScope.from_dict(kwargs, dsp_client)
+    return PermissionScope.from_dict(kwargs, dsp_client, group_registry)
 
 
 def create_admin_route_object_from_scope(
-    perm_scope: PermissionScope, dsp_client: DspClient
+    perm_scope: PermissionScope, dsp_client: DspClient, group_registry: GroupRegistry | None = None
 ) -> list[dict[str, str | None]]:
     """
     Serializes a permission scope to an object that can be used for requests to /admin/permissions routes.
     Note: This route doesn't accept relative IRIs.
+    If many scopes are serialized, pass a shared group registry, so that the groups are fetched only once.
     """
+    group_registry = group_registry or GroupRegistry(dsp_client)
     scope_elements: list[dict[str, str | None]] = []
     for perm_letter in perm_scope.model_fields:
         groups = perm_scope.get(perm_letter)
         for group in groups:
-            full_iri = get_full_iri_from_prefixed_iri(group.prefixed_iri, dsp_client)
+            full_iri = group_registry.get_full_iri(group.prefixed_iri)
             scope_elements.append(
                 {
                     "additionalInformation": full_iri,
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from concurrent.futures import Future
+from dataclasses import dataclass
+from dataclasses import field
+from threading import Lock
+from typing import Callable
+from typing import Generic
+from typing import Hashable
+from typing import TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class SingleFlight(Generic[K, V]):
+    """
+    Merges concurrent calls with the same key into one:
+    The first caller (the leader) does the work,
+    and the callers that arrive while it is in flight wait for it and get its result (or its exception).
+    Nothing is cached: once the leader is finished, the next call with the same key does the work again.
+
+    Attributes:
+        shared_exceptions: the exceptions of the leader that are raised in the waiting callers as well.
+            If the leader fails with another exception (e.g. one that only makes sense in the context of the leader),
+            the waiting callers do the work themselves.
+    """
+
+    shared_exceptions: tuple[type[Exception], ...] = (Exception,)
+    _in_flight: dict[K, Future[V]] = field(default_factory=dict, repr=False)
+    _lock: Lock = field(default_factory=Lock, repr=False)
+
+    def do(self, key: K, func: Callable[[], V]) -> tuple[V, bool]:
+        """
+        Calls func, unless a call with the same key is already in flight.
+
+        Args:
+            key: calls with the same key are merged
+            func: the work
+
+        Returns:
+            the result, and whether it was shared from the call of another thread
+        """
+        with self._lock:
+            in_flight = self._in_flight.get(key)
+            if not in_flight:
+                future: Future[V] = Future()
+                self._in_flight[key] = future
+        if in_flight:
+            try:
+                return in_flight.result(), True
+            except Exception as err:
+                if isinstance(err, self.shared_exceptions):
+                    raise
+            return self.do(key, func)
+        try:
+            result = func()
+        except BaseException as err:
+            # the key is released before the waiting callers wake up, so that they can start a new call
+            self._release(key)
+            future.set_exception(err)
+            raise
+        self._release(key)
+        future.set_result(result)
+        return result, False
+
+    def _release(self, key: K) -> None:
+        with self._lock:
+            del self._in_flight[key]
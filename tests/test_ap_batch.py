@@ -0,0 +1,105 @@
+from typing import Any
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+
+from dsp_permissions_scripts.ap.ap_batch import ApOperation
+from dsp_permissions_scripts.ap.ap_batch import CreateAp
+from dsp_permissions_scripts.ap.ap_batch import DeleteAp
+from dsp_permissions_scripts.ap.ap_batch import UpdateAp
+from dsp_permissions_scripts.ap.ap_batch import execute_ap_operations
+from dsp_permissions_scripts.ap.ap_model import Ap
+from dsp_permissions_scripts.ap.ap_model import ApValue
+from dsp_permissions_scripts.models import group
+from dsp_permissions_scripts.models.errors import ApiError
+from dsp_permissions_scripts.models.group import CustomGroup
+from dsp_permissions_scripts.utils.helpers import KNORA_ADMIN_ONTO_NAMESPACE
+
+PROJ_IRI = "http://rdfh.ch/projects/QykAkmHJTPS7ervbGynSHw"
+PROJ_SHORTCODE = "0000"
+CUSTOM_GROUP_IRI = "http://rdfh.ch/groups/0000/editors"
+GET_PROJ_IRI = "dsp_permissions_scripts.ap.ap_batch.get_proj_iri_and_onto_iris_by_shortcode"
+
+
+def _ap_json(iri: str, for_group: str, permission: str) -> dict[str, Any]:
+    return {"iri": iri, "forProject": PROJ_IRI, "forGroup": for_group, "hasPermissions": [{"name": permission}]}
+
+
+@pytest.fixture
+def existing_aps() -> list[Ap]:
+    return [
+        Ap(
+            forGroup=CustomGroup(prefixed_iri="limc:editors"),
+            forProject=PROJ_IRI,
+            hasPermissions=frozenset({ApValue.ProjectResourceCreateAllPermission}),
+            iri=f"http://rdfh.ch/permissions/{PROJ_SHORTCODE}/ap-{i}",
+        )
+        for i in range(2)
+    ]
+
+
+@pytest.fixture
+def dsp_client() -> Mock:
+    groups = {"groups": [{"id": CUSTOM_GROUP_IRI, "name": "editors", "project": {"shortname": "limc"}}]}
+    post_response = {
+        "administrative_permission": _ap_json(
+            "http://rdfh.ch/permissions/0000/new", f"{KNORA_ADMIN_ONTO_NAMESPACE}Creator", "ProjectAdminAllPermission"
+        )
+    }
+
+    def put(route: str, data: dict[str, Any]) -> dict[str, Any]:  # noqa: ARG001
+        if "ap-1" in route:
+            raise ApiError("Permanently unable to execute the network action", "", 400)
+        return {
+            "administrative_permission": _ap_json(
+                "http://rdfh.ch/permissions/0000/ap-0", CUSTOM_GROUP_IRI, "ProjectAdminAllPermission"
+            )
+        }
+
+    return Mock(
+        get=Mock(return_value=groups),
+        post=Mock(return_value=post_response),
+        put=Mock(side_effect=put),
+        delete=Mock(return_value={}),
+        server="http://0.0.0.0:3333",
+    )
+
+
+@patch(GET_PROJ_IRI, return_value=(PROJ_IRI, []))
+def test_execute_ap_operations(get_proj_iri: Mock, dsp_client: Mock, existing_aps: list[Ap]) -> None:
+    operations: list[ApOperation] = [
+        CreateAp(forGroup=group.CREATOR, hasPermissions=(ApValue.ProjectAdminAllPermission,)),
+        UpdateAp(existing_aps[0]),
+        UpdateAp(existing_aps[1]),
+        DeleteAp(existing_aps[1]),
+    ]
+    results = execute_ap_operations(operations, PROJ_SHORTCODE, dsp_client, nthreads=3)
+
+    assert [r.operation for r in results] == operations
+    assert [r.success for r in results] == [True, True, False, True]
+    assert results[0].ap
+    assert results[0].ap.forGroup == group.CREATOR
+    assert results[1].ap
+    assert results[1].ap.forGroup == CustomGroup(prefixed_iri="limc:editors")
+    assert results[3].ap is None
+    get_proj_iri.assert_called_once_with(PROJ_SHORTCODE, dsp_client)
+    dsp_client.get.assert_called_once_with("/admin/groups")
+    dsp_client.post.assert_called_once_with(
+        "/admin/permissions/ap",
+        data={
+            "forGroup": f"{KNORA_ADMIN_ONTO_NAMESPACE}Creator",
+            "forProject": PROJ_IRI,
+            "hasPermissions": [
+                {"additionalInformation": None, "name": "ProjectAdminAllPermission", "permissionCode": None}
+            ],
+        },
+    )
+
+
+@patch(GET_PROJ_IRI)
+def test_execute_ap_operations_without_creations(get_proj_iri: Mock, dsp_client: Mock, existing_aps: list[Ap]) -> None:
+    results = execute_ap_operations([DeleteAp(ap) for ap in existing_aps], PROJ_SHORTCODE, dsp_client)
+    assert all(r.success for r in results)
+    assert dsp_client.delete.call_count == len(existing_aps)
+    get_proj_iri.assert_not_called()
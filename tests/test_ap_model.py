@@ -29,6 +29,20 @@ class TestAp:
         with pytest.raises(ValueError):  # noqa: PT011 (exception too broad)
             self.ap.remove_permission(ApValue.ProjectAdminAllPermission)
 
+    def test_with_permission_added(self) -> None:
+        modified = self.ap.with_permission_added(ApValue.ProjectAdminAllPermission)
+        assert ApValue.ProjectAdminAllPermission in modified.hasPermissions
+        assert ApValue.ProjectAdminAllPermission not in self.ap.hasPermissions
+        assert modified.forGroup is self.ap.forGroup
+
+    def test_with_permission_removed(self) -> None:
+        permission = next(iter(self.ap.hasPermissions))
+        modified = self.ap.with_permission_removed(permission)
+        assert permission not in modified.hasPermissions
+        assert permission in self.ap.hasPermissions
+        with pytest.raises(ValueError):  # noqa: PT011 (exception too broad)
+            modified.with_permission_removed(permission)
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
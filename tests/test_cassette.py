@@ -0,0 +1,77 @@
+import gzip
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from dsp_permissions_scripts.models.errors import CassetteMissError
+from dsp_permissions_scripts.models.scope import PUBLIC
+from dsp_permissions_scripts.oap.oap_get import get_all_oaps_of_project
+from dsp_permissions_scripts.oap.oap_model import ModifiedOap
+from dsp_permissions_scripts.oap.oap_model import Oap
+from dsp_permissions_scripts.oap.oap_model import OapRetrieveConfig
+from dsp_permissions_scripts.oap.oap_set import apply_updated_oaps_on_server
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeDspApi
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeProject
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeResource
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeValue
+from dsp_permissions_scripts.utils import project
+from dsp_permissions_scripts.utils.cassette import Cassette
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+
+PERMS = "CR knora-admin:ProjectAdmin|V knora-admin:UnknownUser"
+PASSWORD = "secret-password"  # noqa: S105 (not a real password)
+CONFIG = OapRetrieveConfig(retrieve_resources="all", retrieve_values="all")
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches() -> Iterator[None]:
+    project._caches.clear()
+    yield
+    project._caches.clear()
+
+
+@pytest.fixture
+def fake_project() -> FakeProject:
+    proj = FakeProject(shortcode="4123", shortname="test", onto_name="testonto", resclasses=["testonto:Thing"])
+    for i in range(5):
+        iri = f"http://rdfh.ch/4123/thing-{i}"
+        value = FakeValue(f"{iri}/values/text", "testonto:hasText", "knora-api:TextValue", PERMS, text=f"text {i}")
+        proj.add_resource(FakeResource(iri, "testonto:Thing", PERMS, values=[value]))
+    return proj
+
+
+def _run(dsp_client: DspClient) -> list[Oap]:
+    dsp_client.login("root@example.com", PASSWORD)
+    oaps = get_all_oaps_of_project("4123", dsp_client, CONFIG)
+    modified = [ModifiedOap(resource_oap=oap.resource_oap.model_copy(update={"scope": PUBLIC})) for oap in oaps]
+    apply_updated_oaps_on_server(modified, "4123", dsp_client, nthreads=2)
+    return oaps
+
+
+def test_record_and_replay(fake_project: FakeProject, tmp_path: Path) -> None:
+    path = tmp_path / "cassette.jsonl.gz"
+    with FakeDspApi(projects=[fake_project]) as api:
+        dsp_client = DspClient(api.url)
+        cassette = Cassette()
+        dsp_client.use_cassette(cassette)
+        recorded_oaps = _run(dsp_client)
+        cassette.save(path)
+        recorded_requests = sum(api.request_counts.values())
+
+    project._caches.clear()
+    replay_client = DspClient("http://replay.invalid")
+    replay_client.use_cassette(Cassette.load(path))
+    assert _run(replay_client) == recorded_oaps
+    assert replay_client.metrics.snapshot()["totals"]["requests"] == recorded_requests
+
+    content = gzip.decompress(path.read_bytes()).decode("utf-8")
+    assert PASSWORD not in content
+    assert "fake-token" not in content
+
+
+def test_unknown_requests_are_not_replayed() -> None:
+    dsp_client = DspClient("http://replay.invalid")
+    dsp_client.use_cassette(Cassette(mode="replay"))
+    with pytest.raises(CassetteMissError):
+        dsp_client.get("/admin/groups")
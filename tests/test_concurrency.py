@@ -0,0 +1,137 @@
+import time
+from threading import Thread
+from unittest.mock import patch
+
+import pytest
+
+from dsp_permissions_scripts.models.scope import PUBLIC
+from dsp_permissions_scripts.oap.oap_model import ModifiedOap
+from dsp_permissions_scripts.oap.oap_model import ResourceOap
+from dsp_permissions_scripts.oap.oap_set import apply_updated_oaps_on_server
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeDspApi
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeProject
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeResource
+from dsp_permissions_scripts.testing.fake_dsp_api import FaultConfig
+from dsp_permissions_scripts.utils.concurrency import AimdLimiter
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+
+# ruff: noqa: PLR2004 (magic value used in comparison)
+
+_SLEEP = "dsp_permissions_scripts.utils.dsp_client.time.sleep"
+
+
+def test_additive_increase() -> None:
+    limiter = AimdLimiter(initial_limit=2, max_limit=4)
+    for _ in range(2):
+        limiter.on_response(time.perf_counter(), latency=0.1)
+    assert limiter.limit == 3
+    for _ in range(20):
+        limiter.on_response(time.perf_counter(), latency=0.1)
+    assert limiter.limit == 4
+    assert limiter.change_reasons == {"healthy responses": 2}
+
+
+def test_multiplicative_decrease() -> None:
+    limiter = AimdLimiter(initial_limit=8, max_limit=8)
+    limiter.on_backpressure(time.perf_counter(), "HTTP 503")
+    assert limiter.limit == 4
+    limiter.on_backpressure(time.perf_counter(), "timeout")
+    assert limiter.limit == 2
+    assert [(c.old_limit, c.new_limit, c.reason) for c in limiter.changes] == [(8, 4, "HTTP 503"), (4, 2, "timeout")]
+
+
+def test_backpressure_of_requests_sent_before_the_last_decrease_is_ignored() -> None:
+    limiter = AimdLimiter(initial_limit=8, max_limit=8)
+    started_at = time.perf_counter()
+    limiter.on_backpressure(started_at, "HTTP 503")
+    limiter.on_backpressure(started_at, "HTTP 503")
+    assert limiter.limit == 4
+
+
+def test_slow_responses_are_backpressure() -> None:
+    limiter = AimdLimiter(initial_limit=4, max_limit=8, latency_threshold=1)
+    limiter.on_response(time.perf_counter(), latency=2)
+    assert limiter.limit == 2
+    assert limiter.change_reasons == {"latency above 1s": 1}
+
+
+def test_limit_stays_within_bounds() -> None:
+    limiter = AimdLimiter(initial_limit=2, min_limit=2, max_limit=2)
+    limiter.on_backpressure(time.perf_counter(), "HTTP 503")
+    limiter.on_response(time.perf_counter(), latency=0.1)
+    assert limiter.limit == 2
+    assert not limiter.changes
+
+
+def test_invalid_limits() -> None:
+    with pytest.raises(ValueError):  # noqa: PT011 (exception too broad)
+        AimdLimiter(initial_limit=5, max_limit=4)
+
+
+def test_requests_wait_for_a_free_slot() -> None:
+    limiter = AimdLimiter.fixed(2)
+    max_in_flight = 0
+
+    def request() -> None:
+        nonlocal max_in_flight
+        with limiter:
+            max_in_flight = max(max_in_flight, limiter.in_flight)
+            time.sleep(0.01)
+
+    threads = [Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max_in_flight == 2
+    assert limiter.in_flight == 0
+
+
+def test_dsp_client_reports_backpressure() -> None:
+    project = FakeProject(shortcode="4123", shortname="test", onto_name="testonto", resclasses=[])
+    with FakeDspApi(projects=[project], faults=FaultConfig(error_rate=0.5, seed=3)) as api, patch(_SLEEP):
+        dsp_client = DspClient(api.url)
+        dsp_client.use_concurrency_limiter(AimdLimiter(initial_limit=8, max_limit=8, latency_threshold=None))
+        for _ in range(10):
+            dsp_client.get("/admin/groups")
+    concurrency = dsp_client.metrics.snapshot()["concurrency"]
+    assert concurrency["change_reasons"]["HTTP 500"] > 0
+    assert concurrency["limit"] < 8
+
+
+def test_parallel_requests_limited_is_scoped() -> None:
+    dsp_client = DspClient("http://0.0.0.0:3333")
+    adapter = dsp_client.session.get_adapter("http://0.0.0.0:3333")
+    with dsp_client.parallel_requests_limited(3):
+        assert dsp_client.concurrency_limiter is not None
+        assert dsp_client.concurrency_limiter.limit == 3
+        assert dsp_client.session.get_adapter("http://0.0.0.0:3333") is not adapter
+    assert dsp_client.concurrency_limiter is None
+    assert dsp_client.metrics.concurrency is None
+    assert dsp_client.session.get_adapter("http://0.0.0.0:3333") is adapter
+
+
+def test_clients_own_their_connection_pools() -> None:
+    dsp_client = DspClient("http://0.0.0.0:3333")
+    other_client = DspClient("http://0.0.0.0:4444")
+    dsp_client.limit_parallel_requests(3)
+    assert dsp_client.session is not other_client.session
+    assert other_client.session.get_adapter("http://0.0.0.0:4444") is not dsp_client.session.get_adapter(
+        "http://0.0.0.0:3333"
+    )
+
+
+def test_adaptive_limiter_of_the_oap_updates_is_scoped() -> None:
+    project = FakeProject(shortcode="4123", shortname="test", onto_name="testonto", resclasses=["testonto:Thing"])
+    iris = [f"http://rdfh.ch/4123/thing-{i}" for i in range(5)]
+    for iri in iris:
+        project.add_resource(FakeResource(iri, "testonto:Thing", "CR knora-admin:ProjectAdmin"))
+    with FakeDspApi(projects=[project]) as api:
+        dsp_client = DspClient(api.url)
+        dsp_client.login("root@example.com", "test")
+        adapter = dsp_client.session.get_adapter(api.url)
+        oaps = [ModifiedOap(resource_oap=ResourceOap(scope=PUBLIC, resource_iri=iri)) for iri in iris]
+        apply_updated_oaps_on_server(oaps, "4123", dsp_client)
+        assert dsp_client.concurrency_limiter is None
+        assert dsp_client.session.get_adapter(api.url) is adapter
+    assert api.request_counts["PUT /v2/resources"] == len(iris)
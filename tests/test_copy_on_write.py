@@ -0,0 +1,31 @@
+from dsp_permissions_scripts.doap.doap_model import Doap
+from dsp_permissions_scripts.doap.doap_model import GroupDoapTarget
+from dsp_permissions_scripts.models import group
+from dsp_permissions_scripts.models.scope import PUBLIC
+from dsp_permissions_scripts.models.scope import PermissionScope
+from dsp_permissions_scripts.utils.copy_on_write import modified_copies
+
+PROJ_IRI = "http://rdfh.ch/projects/P7Uo3YvDT7Kvv3EvLCl2tw"
+PRIVATE = PermissionScope.create(CR=[group.PROJECT_ADMIN], V=[group.PROJECT_MEMBER])
+
+
+def _doap(grp: group.Group, scope: PermissionScope) -> Doap:
+    return Doap(
+        target=GroupDoapTarget(project_iri=PROJ_IRI, group=grp),
+        scope=scope,
+        doap_iri=f"http://rdfh.ch/doap-{grp.prefixed_iri}",
+    )
+
+
+def test_modified_copies() -> None:
+    doaps = [_doap(group.PROJECT_ADMIN, PRIVATE), _doap(group.PROJECT_MEMBER, PUBLIC), _doap(group.CREATOR, PRIVATE)]
+
+    def modify(doap: Doap) -> Doap | None:
+        if isinstance(doap.target, GroupDoapTarget) and doap.target.group == group.CREATOR:
+            return None
+        return doap.with_scope(PUBLIC)
+
+    [modified] = modified_copies(doaps, modify)
+    assert modified.scope == PUBLIC
+    assert modified.target is doaps[0].target
+    assert doaps[0].scope == PRIVATE
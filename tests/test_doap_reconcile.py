@@ -0,0 +1,100 @@
+from typing import Any
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+
+from dsp_permissions_scripts.doap.doap_model import Doap
+from dsp_permissions_scripts.doap.doap_model import EntityDoapTarget
+from dsp_permissions_scripts.doap.doap_model import GroupDoapTarget
+from dsp_permissions_scripts.doap.doap_reconcile import DoapPlan
+from dsp_permissions_scripts.doap.doap_reconcile import DoapTarget
+from dsp_permissions_scripts.doap.doap_reconcile import compute_doap_plan
+from dsp_permissions_scripts.doap.doap_reconcile import execute_doap_plan
+from dsp_permissions_scripts.doap.doap_reconcile import reconcile_doaps_of_project
+from dsp_permissions_scripts.models import group
+from dsp_permissions_scripts.models.errors import ApiError
+from dsp_permissions_scripts.models.scope import PRIVATE
+from dsp_permissions_scripts.models.scope import PUBLIC
+from dsp_permissions_scripts.models.scope import PermissionScope
+
+PROJ_IRI = "http://rdfh.ch/projects/P7Uo3YvDT7Kvv3EvLCl2tw"
+ADMIN_TARGET = GroupDoapTarget(project_iri=PROJ_IRI, group=group.PROJECT_ADMIN)
+MEMBER_TARGET = GroupDoapTarget(project_iri=PROJ_IRI, group=group.PROJECT_MEMBER)
+CREATOR_TARGET = GroupDoapTarget(project_iri=PROJ_IRI, group=group.CREATOR)
+CLASS_TARGET_V2 = EntityDoapTarget(
+    project_iri=PROJ_IRI, resclass_iri="http://api.dasch.swiss/ontology/0806/limc/v2#Image"
+)
+CLASS_TARGET_INTERNAL = EntityDoapTarget(
+    project_iri=PROJ_IRI, resclass_iri="http://www.knora.org/ontology/0806/limc#Image"
+)
+
+
+def _doap(target: DoapTarget, scope: PermissionScope, iri_suffix: str) -> Doap:
+    return Doap(target=target, scope=scope, doap_iri=f"http://rdfh.ch/permissions/0806/{iri_suffix}")
+
+
+@pytest.fixture
+def current() -> list[Doap]:
+    return [
+        _doap(ADMIN_TARGET, PRIVATE, "admin"),
+        _doap(MEMBER_TARGET, PRIVATE, "member"),
+        _doap(MEMBER_TARGET, PUBLIC, "member-duplicate"),
+        _doap(CLASS_TARGET_INTERNAL, PUBLIC, "image"),
+    ]
+
+
+def test_compute_doap_plan(current: list[Doap]) -> None:
+    desired: dict[DoapTarget, PermissionScope | None] = {
+        ADMIN_TARGET: PUBLIC,
+        MEMBER_TARGET: PRIVATE,
+        CREATOR_TARGET: PUBLIC,
+        CLASS_TARGET_V2: PUBLIC,
+    }
+    plan = compute_doap_plan(current, desired)
+    assert plan.to_create == [(CREATOR_TARGET, PUBLIC)]
+    assert plan.to_update == [_doap(ADMIN_TARGET, PUBLIC, "admin")]
+    assert plan.to_delete == [current[2]]
+
+
+def test_compute_doap_plan_deletions(current: list[Doap]) -> None:
+    plan = compute_doap_plan(current, {MEMBER_TARGET: None}, delete_unlisted=False)
+    assert plan == DoapPlan(to_delete=[current[1], current[2]])
+    plan = compute_doap_plan(current, {ADMIN_TARGET: PRIVATE}, delete_unlisted=True)
+    assert plan == DoapPlan(to_delete=current[1:])
+
+
+def test_compute_doap_plan_already_in_desired_state(current: list[Doap]) -> None:
+    plan = compute_doap_plan(current, {ADMIN_TARGET: PRIVATE, CLASS_TARGET_V2: PUBLIC})
+    assert plan.is_empty()
+
+
+def test_execute_doap_plan(current: list[Doap]) -> None:
+    plan = DoapPlan(
+        to_create=[(CREATOR_TARGET, PUBLIC), (CLASS_TARGET_V2, PRIVATE)],
+        to_update=[_doap(ADMIN_TARGET, PUBLIC, "admin")],
+        to_delete=[current[2]],
+    )
+
+    def post(route: str, data: dict[str, Any]) -> dict[str, Any]:  # noqa: ARG001
+        if data["forResourceClass"]:
+            raise ApiError("Permanently unable to execute the network action", "", 400)
+        return {}
+
+    dsp_client = Mock(post=Mock(side_effect=post), put=Mock(return_value={}), delete=Mock(return_value={}))
+    result = execute_doap_plan(plan, dsp_client, nthreads=2)
+    assert result.failed_creations == [CLASS_TARGET_V2]
+    assert not result.failed_updates
+    assert not result.failed_deletions
+    assert not result.is_success()
+    assert dsp_client.post.call_count == 2  # noqa: PLR2004 (magic value used in comparison)
+    assert dsp_client.post.call_args_list[0].kwargs["data"]["forGroup"].endswith("#Creator")
+    dsp_client.put.assert_called_once()
+    dsp_client.delete.assert_called_once()
+
+
+@patch("dsp_permissions_scripts.doap.doap_reconcile.get_proj_iri_and_onto_iris_by_shortcode")
+def test_reconcile_rejects_foreign_targets(get_proj_iri: Mock) -> None:
+    get_proj_iri.return_value = ("http://rdfh.ch/projects/other", [])
+    with pytest.raises(ValueError, match="don't belong to project"):
+        reconcile_doaps_of_project("0806", {ADMIN_TARGET: PUBLIC}, Mock())
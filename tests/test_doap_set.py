@@ -4,10 +4,16 @@ from unittest.mock import patch
 
 import pytest
 
+from dsp_permissions_scripts.doap.doap_delete import delete_doap_of_group_on_server
+from dsp_permissions_scripts.doap.doap_model import Doap
+from dsp_permissions_scripts.doap.doap_model import GroupDoapTarget
 from dsp_permissions_scripts.doap.doap_model import NewEntityDoapTarget
 from dsp_permissions_scripts.doap.doap_model import NewGroupDoapTarget
+from dsp_permissions_scripts.doap.doap_set import apply_updated_scopes_of_doaps_on_server
 from dsp_permissions_scripts.doap.doap_set import create_new_doap_on_server
 from dsp_permissions_scripts.models import group
+from dsp_permissions_scripts.models.errors import ApiError
+from dsp_permissions_scripts.models.group import CustomGroup
 from dsp_permissions_scripts.models.scope import PermissionScope
 
 SHORTCODE = "0000"
@@ -185,3 +191,56 @@ def test_create_doap_for_prop(
     create_doap_from_admin_route_response.assert_called_once_with(
         response_for_prop["default_object_access_permission"], dsp_client
     )
+
+
+def _make_doap(number: int, for_group: group.BuiltinGroup | CustomGroup) -> Doap:
+    return Doap(
+        target=GroupDoapTarget(project_iri=PROJ_IRI, group=for_group),
+        scope=PermissionScope.create(CR=[group.PROJECT_ADMIN], V=[CustomGroup(prefixed_iri="limc:limc-editors")]),
+        doap_iri=f"http://rdfh.ch/permissions/{SHORTCODE}/doap-{number}",
+    )
+
+
+def test_apply_updated_scopes_of_doaps_reports_failures() -> None:
+    groups_response = {
+        "groups": [
+            {"id": "http://rdfh.ch/groups/0000/editors", "name": "limc-editors", "project": {"shortname": "limc"}}
+        ]
+    }
+    doaps = [_make_doap(i, group.PROJECT_ADMIN) for i in range(5)]
+
+    def put(route: str, data: dict[str, Any]) -> dict[str, Any]:  # noqa: ARG001
+        if "doap-3" in route:
+            raise ApiError("Permanently unable to execute the network action", "", 400)
+        return {}
+
+    dsp_client = Mock(get=Mock(return_value=groups_response), put=Mock(side_effect=put), server=HTTPS_HOST)
+    failed = apply_updated_scopes_of_doaps_on_server(doaps, dsp_client, nthreads=3)
+    assert failed == [doaps[3]]
+    assert dsp_client.put.call_count == 5  # noqa: PLR2004 (magic value used in comparison)
+    dsp_client.get.assert_called_once_with("/admin/groups")
+    expected_payload = {
+        "hasPermissions": [
+            {
+                "additionalInformation": "http://www.knora.org/ontology/knora-admin#ProjectAdmin",
+                "name": "CR",
+                "permissionCode": None,
+            },
+            {"additionalInformation": "http://rdfh.ch/groups/0000/editors", "name": "V", "permissionCode": None},
+        ]
+    }
+    assert all(c.kwargs["data"] == expected_payload for c in dsp_client.put.call_args_list)
+
+
+def test_delete_doap_of_group_keeps_failed_doaps() -> None:
+    doaps = [_make_doap(i, group.PROJECT_MEMBER) for i in range(3)] + [_make_doap(3, group.PROJECT_ADMIN)]
+
+    def delete(route: str) -> dict[str, Any]:
+        if "doap-1" in route:
+            raise ApiError("Permanently unable to execute the network action", "", 400)
+        return {}
+
+    dsp_client = Mock(delete=Mock(side_effect=delete), server=HTTPS_HOST)
+    remaining = delete_doap_of_group_on_server(list(doaps), group.PROJECT_MEMBER, dsp_client, nthreads=2)
+    assert remaining == [doaps[1], doaps[3]]
+    assert dsp_client.delete.call_count == 3  # noqa: PLR2004 (magic value used in comparison)
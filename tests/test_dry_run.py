@@ -0,0 +1,85 @@
+from typing import Iterator
+
+import pytest
+
+from dsp_permissions_scripts.ap.ap_batch import ApOperation
+from dsp_permissions_scripts.ap.ap_batch import CreateAp
+from dsp_permissions_scripts.ap.ap_batch import UpdateAp
+from dsp_permissions_scripts.ap.ap_batch import execute_ap_operations
+from dsp_permissions_scripts.ap.ap_get import get_aps_of_project
+from dsp_permissions_scripts.ap.ap_model import ApValue
+from dsp_permissions_scripts.models import group
+from dsp_permissions_scripts.models.scope import PUBLIC
+from dsp_permissions_scripts.oap.oap_get import get_all_oaps_of_project
+from dsp_permissions_scripts.oap.oap_model import ModifiedOap
+from dsp_permissions_scripts.oap.oap_model import OapRetrieveConfig
+from dsp_permissions_scripts.oap.oap_set import apply_updated_oaps_on_server
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeDspApi
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeProject
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeResource
+from dsp_permissions_scripts.utils import project
+from dsp_permissions_scripts.utils.dry_run import DryRun
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+from dsp_permissions_scripts.utils.helpers import KNORA_ADMIN_ONTO_NAMESPACE
+
+# ruff: noqa: PLR2004 (magic value used in comparison)
+
+PERMS = "CR knora-admin:ProjectAdmin|V knora-admin:UnknownUser"
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches() -> Iterator[None]:
+    project._caches.clear()
+    yield
+    project._caches.clear()
+
+
+@pytest.fixture
+def fake_project() -> FakeProject:
+    proj = FakeProject(shortcode="4123", shortname="test", onto_name="testonto", resclasses=["testonto:Thing"])
+    proj.aps.append(
+        {
+            "iri": "http://rdfh.ch/permissions/4123/ap-1",
+            "forProject": proj.iri,
+            "forGroup": f"{KNORA_ADMIN_ONTO_NAMESPACE}ProjectAdmin",
+            "hasPermissions": [{"additionalInformation": None, "name": "ProjectResourceCreateAllPermission"}],
+        }
+    )
+    for i in range(10):
+        proj.add_resource(FakeResource(f"http://rdfh.ch/4123/thing-{i}", "testonto:Thing", PERMS))
+    return proj
+
+
+def test_dry_run(fake_project: FakeProject) -> None:
+    with FakeDspApi(projects=[fake_project]) as api:
+        dsp_client = DspClient(api.url)
+        dsp_client.login("root@example.com", "test")
+        dsp_client.use_dry_run(dry_run := DryRun())
+        with dsp_client.phase("update_aps"):
+            [ap] = get_aps_of_project("4123", dsp_client)
+            ap.add_permission(ApValue.ProjectAdminAllPermission)
+            operations: list[ApOperation] = [
+                UpdateAp(ap),
+                CreateAp(group.PROJECT_MEMBER, (ApValue.ProjectResourceCreateAllPermission,)),
+            ]
+            results = execute_ap_operations(operations, "4123", dsp_client)
+        with dsp_client.phase("update_oaps"):
+            oaps = get_all_oaps_of_project("4123", dsp_client, OapRetrieveConfig(retrieve_resources="all"))
+            modified = [ModifiedOap(resource_oap=o.resource_oap.model_copy(update={"scope": PUBLIC})) for o in oaps]
+            apply_updated_oaps_on_server(modified, "4123", dsp_client, nthreads=4)
+
+    assert all(r.success for r in results)
+    assert results[0].ap == ap
+    assert len(fake_project.aps) == 1
+    assert fake_project.aps[0]["hasPermissions"] == [
+        {"additionalInformation": None, "name": "ProjectResourceCreateAllPermission"}
+    ]
+    assert {r.permissions for r in fake_project.resources.values()} == {PERMS}
+    assert api.request_counts["PUT /v2/resources"] == 0
+
+    estimate = dry_run.estimate(concurrency={"update_oaps": 4})
+    assert estimate["phases"]["update_aps"]["requests"]["PUT"] == 1
+    assert estimate["phases"]["update_aps"]["requests"]["POST"] == 1
+    assert estimate["phases"]["update_oaps"]["requests"]["PUT"] == 10
+    assert estimate["total"]["requests"]["GET"] > 10
+    assert estimate["mean_read_seconds"] > 0
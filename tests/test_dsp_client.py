@@ -0,0 +1,84 @@
+import json
+import logging
+from typing import Any
+from typing import Iterator
+from unittest.mock import patch
+
+import pytest
+
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeDspApi
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeProject
+from dsp_permissions_scripts.utils import json_codec
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+from dsp_permissions_scripts.utils.dsp_client import HttpLogConfig
+from dsp_permissions_scripts.utils.dsp_client import _truncated_json
+
+LOGGER_NAME = "dsp_permissions_scripts.utils.dsp_client"
+JSON_CODEC = "dsp_permissions_scripts.utils.json_codec"
+
+
+@pytest.fixture(scope="module")
+def api() -> Iterator[FakeDspApi]:
+    project = FakeProject(
+        shortcode="4123", shortname="test", onto_name="testonto", resclasses=[], custom_groups=["a", "b", "c"]
+    )
+    with FakeDspApi(projects=[project]) as api:
+        yield api
+
+
+def _logged_responses(caplog: pytest.LogCaptureFixture) -> list[dict[str, Any]]:
+    messages = [r.getMessage() for r in caplog.records if r.name == LOGGER_NAME]
+    return [json.loads(m.removeprefix("RESPONSE: ")) for m in messages if m.startswith("RESPONSE: ")]
+
+
+def test_response_is_parsed_once(api: FakeDspApi, caplog: pytest.LogCaptureFixture) -> None:
+    caplog.set_level(logging.DEBUG, logger=LOGGER_NAME)
+    dsp_client = DspClient(api.url)
+    with patch(f"{JSON_CODEC}.loads", wraps=json_codec.loads) as loads:
+        response = dsp_client.get("/admin/groups")
+        assert loads.call_count == 1
+    [logged] = _logged_responses(caplog)
+    assert logged["content"] == response
+
+
+def test_logged_bodies_are_encoded_with_the_json_codec(api: FakeDspApi, caplog: pytest.LogCaptureFixture) -> None:
+    caplog.set_level(logging.DEBUG, logger=LOGGER_NAME)
+    dsp_client = DspClient(api.url, log_config=HttpLogConfig(max_body_chars=None))
+    with patch(f"{JSON_CODEC}.dumps_str", wraps=json_codec.dumps_str) as dumps_str:
+        response = dsp_client.get("/admin/groups")
+        [logged] = _logged_responses(caplog)
+    assert logged["content"] == response
+    assert any(c.args[0].get("content") == response for c in dumps_str.call_args_list)
+
+
+def test_bodies_are_truncated(api: FakeDspApi, caplog: pytest.LogCaptureFixture) -> None:
+    caplog.set_level(logging.DEBUG, logger=LOGGER_NAME)
+    dsp_client = DspClient(api.url, log_config=HttpLogConfig(max_body_chars=20))
+    dsp_client.get("/admin/groups")
+    [logged] = _logged_responses(caplog)
+    assert logged["content"] == '{"groups":[{"id":"ht...[truncated after 20 chars]'
+
+
+def test_only_the_logged_part_of_a_body_is_serialized() -> None:
+    unserializable_tail = [*range(100), object()]
+    assert _truncated_json(unserializable_tail, 20) == "[0,1,2,3,4,5,6,7,8,9...[truncated after 20 chars]"
+    assert _truncated_json([1, 2], 20) is None
+    assert _truncated_json("x" * 30, 20) == f"{'x' * 20}...[truncated after 20 chars]"
+
+
+def test_bodies_are_sampled(api: FakeDspApi, caplog: pytest.LogCaptureFixture) -> None:
+    caplog.set_level(logging.DEBUG, logger=LOGGER_NAME)
+    dsp_client = DspClient(api.url, log_config=HttpLogConfig(body_sample_rate=0))
+    dsp_client.get("/admin/groups")
+    [logged] = _logged_responses(caplog)
+    assert "content" not in logged
+    assert logged["status_code"] == 200  # noqa: PLR2004 (magic value used in comparison)
+
+
+def test_nothing_is_serialized_if_debug_is_disabled(api: FakeDspApi, caplog: pytest.LogCaptureFixture) -> None:
+    caplog.set_level(logging.INFO, logger=LOGGER_NAME)
+    dsp_client = DspClient(api.url)
+    with patch("dsp_permissions_scripts.utils.dsp_client._LazyJson") as lazy_json:
+        dsp_client.get("/admin/groups")
+    lazy_json.assert_not_called()
+    assert not _logged_responses(caplog)
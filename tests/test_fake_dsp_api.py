@@ -0,0 +1,144 @@
+from typing import Iterator
+from unittest.mock import patch
+
+import pytest
+
+from dsp_permissions_scripts.ap.ap_batch import ApOperation
+from dsp_permissions_scripts.ap.ap_batch import CreateAp
+from dsp_permissions_scripts.ap.ap_batch import execute_ap_operations
+from dsp_permissions_scripts.ap.ap_get import get_aps_of_project
+from dsp_permissions_scripts.ap.ap_model import ApValue
+from dsp_permissions_scripts.doap.doap_get import get_doaps_of_project
+from dsp_permissions_scripts.models import group
+from dsp_permissions_scripts.models.errors import ApiError
+from dsp_permissions_scripts.models.scope import PUBLIC
+from dsp_permissions_scripts.models.scope import PermissionScope
+from dsp_permissions_scripts.oap.oap_get import get_all_oaps_of_project
+from dsp_permissions_scripts.oap.oap_model import ModifiedOap
+from dsp_permissions_scripts.oap.oap_model import OapRetrieveConfig
+from dsp_permissions_scripts.oap.oap_set import apply_updated_oaps_on_server
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeDspApi
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeProject
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeResource
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeValue
+from dsp_permissions_scripts.testing.fake_dsp_api import FaultConfig
+from dsp_permissions_scripts.utils import project
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+from dsp_permissions_scripts.utils.helpers import KNORA_ADMIN_ONTO_NAMESPACE
+from dsp_permissions_scripts.utils.scope_serialization import create_string_from_scope
+
+# ruff: noqa: PLR2004 (magic value used in comparison)
+
+_SLEEP = "dsp_permissions_scripts.utils.dsp_client.time.sleep"
+PERMS = "CR knora-admin:ProjectAdmin|V knora-admin:UnknownUser"
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches() -> Iterator[None]:
+    project._caches.clear()
+    yield
+    project._caches.clear()
+
+
+@pytest.fixture
+def fake_project() -> FakeProject:
+    proj = FakeProject(
+        shortcode="4123",
+        shortname="test",
+        onto_name="testonto",
+        resclasses=["testonto:ImageThing", "knora-api:Region"],
+        custom_groups=["editors"],
+    )
+    proj.aps.append(
+        {
+            "iri": "http://rdfh.ch/permissions/4123/ap-1",
+            "forProject": proj.iri,
+            "forGroup": f"{KNORA_ADMIN_ONTO_NAMESPACE}ProjectAdmin",
+            "hasPermissions": [{"additionalInformation": None, "name": "ProjectAdminAllPermission"}],
+        }
+    )
+    proj.doaps.append(
+        {
+            "iri": "http://rdfh.ch/permissions/4123/doap-1",
+            "forProject": proj.iri,
+            "forGroup": proj.group_iri("editors"),
+            "hasPermissions": [{"additionalInformation": proj.group_iri("editors"), "name": "D"}],
+        }
+    )
+    for i in range(30):
+        iri = f"http://rdfh.ch/4123/image-{i}"
+        value = FakeValue(f"{iri}/values/text", "testonto:hasText", "knora-api:TextValue", PERMS, text=f"text {i}")
+        proj.add_resource(FakeResource(iri, "testonto:ImageThing", PERMS, values=[value]))
+    proj.add_resource(FakeResource("http://rdfh.ch/4123/region-0", "knora-api:Region", PERMS))
+    return proj
+
+
+@pytest.fixture
+def api(fake_project: FakeProject) -> Iterator[FakeDspApi]:
+    with FakeDspApi(projects=[fake_project]) as api:
+        yield api
+
+
+@pytest.fixture
+def dsp_client(api: FakeDspApi) -> DspClient:
+    dsp_client = DspClient(api.url)
+    dsp_client.login("root@example.com", "test")
+    return dsp_client
+
+
+def test_get_aps_and_doaps(dsp_client: DspClient) -> None:
+    aps = get_aps_of_project("4123", dsp_client)
+    doaps = get_doaps_of_project("4123", dsp_client)
+    assert [ap.forGroup for ap in aps] == [group.PROJECT_ADMIN]
+    assert [doap.scope for doap in doaps] == [PermissionScope.create(D=[group.group_builder("test:editors")])]
+
+
+def test_get_all_oaps(dsp_client: DspClient, api: FakeDspApi) -> None:
+    oaps = get_all_oaps_of_project(
+        "4123", dsp_client, OapRetrieveConfig(retrieve_resources="all", retrieve_values="all")
+    )
+    assert len(oaps) == 31
+    assert sum(len(oap.value_oaps) for oap in oaps) == 30
+    assert api.request_counts["GET /v2/resources"] == 3  # 2 full pages and 1 empty page
+
+
+def test_apply_updated_oaps(dsp_client: DspClient, fake_project: FakeProject) -> None:
+    oaps = get_all_oaps_of_project(
+        "4123", dsp_client, OapRetrieveConfig(retrieve_resources="all", retrieve_values="all")
+    )
+    modified = [ModifiedOap(resource_oap=oap.resource_oap.model_copy(update={"scope": PUBLIC})) for oap in oaps]
+    apply_updated_oaps_on_server(modified, "4123", dsp_client, nthreads=4)
+    assert {r.permissions for r in fake_project.resources.values()} == {create_string_from_scope(PUBLIC)}
+
+
+def test_expired_token_is_renewed(dsp_client: DspClient, fake_project: FakeProject, api: FakeDspApi) -> None:
+    oaps = get_all_oaps_of_project("4123", dsp_client, OapRetrieveConfig(retrieve_resources="all"))
+    modified = [ModifiedOap(resource_oap=oap.resource_oap.model_copy(update={"scope": PUBLIC})) for oap in oaps]
+    api.expire_tokens()
+    apply_updated_oaps_on_server(modified, "4123", dsp_client, nthreads=4)
+    assert {r.permissions for r in fake_project.resources.values()} == {create_string_from_scope(PUBLIC)}
+    assert api.request_counts["POST /v2/authentication"] == 2  # the first login and a single re-login
+
+
+def test_create_ap(dsp_client: DspClient, fake_project: FakeProject) -> None:
+    operations: list[ApOperation] = [CreateAp(group.PROJECT_MEMBER, (ApValue.ProjectResourceCreateAllPermission,))]
+    [result] = execute_ap_operations(operations, "4123", dsp_client)
+    assert result.success
+    assert len(fake_project.aps) == 2
+
+
+def test_mutations_need_a_token(api: FakeDspApi) -> None:
+    dsp_client = DspClient(api.url)
+    dsp_client.session.headers.pop("Authorization", None)
+    with pytest.raises(ApiError) as exc_info:
+        dsp_client.delete("/admin/permissions/http%3A%2F%2Frdfh.ch%2Fpermissions%2F4123%2Fap-1")
+    assert exc_info.value.status_code == 401
+
+
+def test_transient_faults_are_retried(fake_project: FakeProject) -> None:
+    faults = FaultConfig(error_rate=0.2, try_again_later_rate=0.2, seed=42)
+    with FakeDspApi(projects=[fake_project], faults=faults) as api, patch(_SLEEP):
+        dsp_client = DspClient(api.url)
+        dsp_client.login("root@example.com", "test")
+        oaps = get_all_oaps_of_project("4123", dsp_client, OapRetrieveConfig(retrieve_resources="all"))
+    assert len(oaps) == 31
@@ -0,0 +1,58 @@
+import logging
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from dsp_permissions_scripts.utils import get_logger as get_logger_module
+from dsp_permissions_scripts.utils.get_logger import configure_logging
+from dsp_permissions_scripts.utils.get_logger import get_logger
+from dsp_permissions_scripts.utils.get_logger import shutdown_logging
+
+
+@pytest.fixture
+def logfile(tmp_path: Path) -> Iterator[Path]:
+    path = tmp_path / "test.log"
+    configure_logging(path)
+    yield path
+    configure_logging()
+
+
+def test_handlers_are_not_accumulated() -> None:
+    for _ in range(3):
+        logger = get_logger("dsp_permissions_scripts.some_module")
+    get_logger("dsp_permissions_scripts.other_module")
+    package_logger = logging.getLogger("dsp_permissions_scripts")
+    assert package_logger.handlers == [get_logger_module._queue_handler]
+    assert not logger.handlers
+
+
+def test_records_are_written_by_the_listener(logfile: Path) -> None:
+    logger = get_logger("dsp_permissions_scripts.some_module")
+    logger.info("first message")
+    get_logger("__main__").info("second message")
+    shutdown_logging()
+    lines = logfile.read_text(encoding="utf-8").splitlines()
+    assert [line.split(" ")[-2:] for line in lines] == [["first", "message"], ["second", "message"]]
+
+
+def test_lazy_arguments_are_formatted_by_the_listener(logfile: Path) -> None:
+    class Lazy:
+        def __str__(self) -> str:
+            return "formatted"
+
+    get_logger("dsp_permissions_scripts.some_module").debug("value: %s", Lazy())
+    shutdown_logging()
+    assert logfile.read_text(encoding="utf-8").endswith("value: formatted\n")
+
+
+def test_rotation(tmp_path: Path) -> None:
+    configure_logging(tmp_path / "rotated.log", max_bytes=1000, backup_count=2)
+    try:
+        logger = get_logger("dsp_permissions_scripts.some_module")
+        for i in range(100):
+            logger.info(f"message {i}")
+        shutdown_logging()
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["rotated.log", "rotated.log.1", "rotated.log.2"]
+    finally:
+        configure_logging()
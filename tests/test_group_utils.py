@@ -14,6 +14,7 @@ from dsp_permissions_scripts.models.group import SYSTEM_ADMIN
 from dsp_permissions_scripts.models.group import UNKNOWN_USER
 from dsp_permissions_scripts.models.group import BuiltinGroup
 from dsp_permissions_scripts.models.group import CustomGroup
+from dsp_permissions_scripts.models.group_utils import GroupRegistry
 from dsp_permissions_scripts.models.group_utils import _get_full_iri_from_builtin_group
 from dsp_permissions_scripts.models.group_utils import _get_full_iri_from_custom_group
 from dsp_permissions_scripts.models.group_utils import get_full_iri_from_prefixed_iri
@@ -141,5 +142,26 @@ def test_get_full_iri_from_custom_group_invalid(dsp_client_with_2_groups: DspCli
         _get_full_iri_from_custom_group("limc", "limc-editors", dsp_client_with_2_groups)
 
 
+def test_group_registry_fetches_groups_only_once(
+    dsp_client_with_2_groups: DspClient, new_custom_group_iri: str, old_custom_group_iri: str
+) -> None:
+    registry = GroupRegistry(dsp_client_with_2_groups)
+    assert registry.get_full_iri("btt:btt-editors") == new_custom_group_iri
+    assert registry.get_full_iri("knora-admin:ProjectAdmin") == f"{KNORA_ADMIN_ONTO_NAMESPACE}ProjectAdmin"
+    assert registry.get_prefixed_iri(old_custom_group_iri) == "anything:Thing searcher"
+    assert registry.get_prefixed_iri(f"{KNORA_ADMIN_ONTO_NAMESPACE}Creator") == "knora-admin:Creator"
+    dsp_client_with_2_groups.get.assert_called_once_with("/admin/groups")  # type: ignore[attr-defined]
+
+
+def test_group_registry_invalid(dsp_client_with_2_groups: DspClient) -> None:
+    registry = GroupRegistry(dsp_client_with_2_groups)
+    with pytest.raises(InvalidGroupError):
+        registry.get_full_iri("limc:limc-editors")
+    with pytest.raises(InvalidIRIError):
+        registry.get_full_iri("knora-base:Value")
+    with pytest.raises(InvalidIRIError):
+        registry.get_prefixed_iri("http://www.knora.org/ontology/knora-base#Value")
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,74 @@
+import json
+from pathlib import Path
+from unittest.mock import MagicMock
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from dsp_permissions_scripts.ap.ap_model import Ap
+from dsp_permissions_scripts.ap.ap_model import ApValue
+from dsp_permissions_scripts.models import group
+from dsp_permissions_scripts.models.errors import ApiError
+from dsp_permissions_scripts.models.group_utils import GroupRegistry
+from dsp_permissions_scripts.oap.oap_model import OapRetrieveConfig
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+from dsp_permissions_scripts.utils.harvest import HarvestStore
+from dsp_permissions_scripts.utils.harvest import harvest_permissions_of_projects
+from dsp_permissions_scripts.utils.project import get_all_project_shortcodes
+
+_HARVEST = "dsp_permissions_scripts.utils.harvest"
+
+
+def _ap(shortcode: str) -> Ap:
+    return Ap(
+        forGroup=group.PROJECT_ADMIN,
+        forProject=f"http://rdfh.ch/projects/{shortcode}",
+        hasPermissions=frozenset({ApValue.ProjectAdminAllPermission}),
+        iri=f"http://rdfh.ch/permissions/{shortcode}/ap",
+    )
+
+
+def test_get_all_project_shortcodes() -> None:
+    response = {
+        "projects": [
+            {"id": "http://rdfh.ch/projects/abc", "shortcode": "4123"},
+            {"id": "http://www.knora.org/ontology/knora-admin#SystemProject", "shortcode": "FFFF"},
+            {"id": "http://rdfh.ch/projects/def", "shortcode": "0001"},
+        ]
+    }
+    dsp_client = Mock(spec=DspClient, get=Mock(return_value=response))
+    assert get_all_project_shortcodes(dsp_client) == ["0001", "4123"]
+    dsp_client.get.assert_called_once_with("/admin/projects")
+
+
+@patch(f"{_HARVEST}.get_all_oaps_of_project", return_value=[])
+@patch(f"{_HARVEST}.get_doaps_of_project", return_value=[])
+@patch(f"{_HARVEST}.get_aps_of_project")
+@patch(f"{_HARVEST}.get_all_project_shortcodes", return_value=["0001", "0002", "0003"])
+def test_harvest_permissions_of_projects(
+    get_all_project_shortcodes: Mock,  # noqa: ARG001
+    get_aps_of_project: Mock,
+    get_doaps_of_project: Mock,
+    get_all_oaps_of_project: Mock,
+    tmp_path: Path,
+) -> None:
+    def get_aps(shortcode: str, dsp_client: DspClient, group_registry: GroupRegistry) -> list[Ap]:  # noqa: ARG001
+        if shortcode == "0002":
+            raise ApiError("Could not get APs")
+        return [_ap(shortcode)]
+
+    get_aps_of_project.side_effect = get_aps
+    dsp_client = MagicMock(spec=DspClient)
+    store = HarvestStore(tmp_path / "harvest.jsonl")
+    oap_config = OapRetrieveConfig(retrieve_resources="all", retrieve_values="none")
+
+    failed = harvest_permissions_of_projects(dsp_client, store, oap_config=oap_config, nprojects=3)
+
+    assert failed == ["0002"]
+    dsp_client.parallel_requests_limited.assert_called_once_with(8)
+    registries = {id(c.args[2]) for c in get_aps_of_project.call_args_list + get_doaps_of_project.call_args_list}
+    assert len(registries) == 1
+    assert get_all_oaps_of_project.call_count == 2  # noqa: PLR2004 (magic value used in comparison)
+    records = sorted((sc, kind) for sc, kind, _ in store.read())
+    assert records == [("0001", "AP"), ("0002", "ERROR"), ("0003", "AP")]
+    first_line = json.loads((tmp_path / "harvest.jsonl").read_text(encoding="utf-8").splitlines()[0])
+    assert set(first_line) == {"shortcode", "kind", "data"}
@@ -0,0 +1,48 @@
+import json
+from typing import Any
+from typing import Iterator
+
+import pytest
+
+from dsp_permissions_scripts.utils import json_codec
+from dsp_permissions_scripts.utils.json_codec import OrjsonCodec
+from dsp_permissions_scripts.utils.json_codec import StdlibJsonCodec
+
+DATA: dict[str, Any] = {"b": [1, 2.5, None, True], "a": {"label": "Zürich 北京"}, "empty": []}
+
+
+@pytest.fixture
+def _restore_codec() -> Iterator[None]:
+    codec = json_codec.get_json_codec()
+    yield
+    json_codec.set_json_codec(codec)
+
+
+def test_stdlib_codec() -> None:
+    codec = StdlibJsonCodec()
+    assert codec.dumps(DATA) == '{"b":[1,2.5,null,true],"a":{"label":"Zürich 北京"},"empty":[]}'.encode()
+    assert codec.dumps(DATA, indent=True) == json.dumps(DATA, ensure_ascii=False, indent=2).encode()
+    assert codec.dumps(DATA, sort_keys=True).startswith(b'{"a":')
+    assert codec.loads(codec.dumps(DATA)) == DATA
+    assert codec.loads(codec.dumps(DATA).decode()) == DATA
+
+
+def test_invalid_json_raises_json_decode_error() -> None:
+    with pytest.raises(json_codec.JSONDecodeError):
+        json_codec.loads(b"{")
+
+
+def test_orjson_codec_gives_the_same_bytes() -> None:
+    orjson_codec = OrjsonCodec(pytest.importorskip("orjson"))
+    stdlib_codec = StdlibJsonCodec()
+    for kwargs in ({}, {"indent": True}, {"sort_keys": True}):
+        assert orjson_codec.dumps(DATA, **kwargs) == stdlib_codec.dumps(DATA, **kwargs)
+    assert orjson_codec.loads(stdlib_codec.dumps(DATA)) == DATA
+
+
+@pytest.mark.usefixtures("_restore_codec")
+def test_set_json_codec() -> None:
+    codec = StdlibJsonCodec(name="test")
+    json_codec.set_json_codec(codec)
+    assert json_codec.get_json_codec() is codec
+    assert json_codec.dumps_str({"a": 1}) == '{"a":1}'
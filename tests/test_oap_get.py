@@ -1,3 +1,4 @@
+import json
 from typing import Any
 from unittest.mock import Mock
 from unittest.mock import patch
@@ -17,6 +18,8 @@ from dsp_permissions_scripts.oap.oap_model import Oap
 from dsp_permissions_scripts.oap.oap_model import OapRetrieveConfig
 from dsp_permissions_scripts.oap.oap_model import ResourceOap
 from dsp_permissions_scripts.oap.oap_model import ValueOap
+from dsp_permissions_scripts.oap.oap_page_parser import PageFilter
+from dsp_permissions_scripts.oap.oap_page_parser import parse_page
 from dsp_permissions_scripts.utils.dsp_client import DspClient
 
 # ruff: noqa: PT019
@@ -381,6 +384,27 @@ def test_get_oap_of_one_resource_some_classes_some_values(resource: dict[str, An
     assert res == expected
 
 
+def test_parse_page(resource: dict[str, Any]) -> None:
+    page_filter = PageFilter(retrieve_values=True, props=frozenset(["my-data-model:hasSecondProp"]))
+    expected_record = (
+        "http://rdfh.ch/0838/dBu563hjSN6RmJZp6NU3_Q",
+        "CR knora-admin:ProjectMember|V knora-admin:UnknownUser",
+        [
+            (
+                "my-data-model:hasSecondProp",
+                "knora-api:TextValue",
+                "http://rdfh.ch/0838/dBu563hjSN6RmJZp6NU3_Q/values/ziOT-nhmQiqvCV8LSxAyHA",
+                "CR knora-admin:ProjectAdmin|V knora-admin:KnownUser",
+            )
+        ],
+    )
+    assert parse_page(json.dumps({"@graph": [resource]}).encode(), page_filter) == (True, [expected_record])
+    assert parse_page(json.dumps(resource).encode(), page_filter) == (False, [expected_record])
+    assert parse_page(b"{}", page_filter) == (False, [])
+    other_class = PageFilter(res_classes=frozenset(["my-data-model:Other"]))
+    assert parse_page(json.dumps({"@graph": [resource]}).encode(), other_class) == (True, [])
+
+
 class Test_get_oaps_of_one_kb_resclass:
     def test_get_oaps_of_one_kb_resclass_0_results(self) -> None:
         dsp_client = Mock(spec=DspClient, get=Mock(side_effect=[{}]))
@@ -0,0 +1,90 @@
+from unittest.mock import Mock
+
+import pytest
+
+from dsp_permissions_scripts.models import group
+from dsp_permissions_scripts.models.scope import PUBLIC
+from dsp_permissions_scripts.models.scope import PermissionScope
+from dsp_permissions_scripts.oap.oap_model import ModifiedOap
+from dsp_permissions_scripts.oap.oap_model import Oap
+from dsp_permissions_scripts.oap.oap_model import ResourceOap
+from dsp_permissions_scripts.oap.oap_model import ValueOap
+from dsp_permissions_scripts.oap.oap_rules import OapRule
+from dsp_permissions_scripts.oap.oap_rules import apply_oap_rules
+from dsp_permissions_scripts.oap.oap_table import OapTable
+
+# ruff: noqa: PLR2004 (magic value used in comparison)
+
+PRIVATE = PermissionScope.create(CR=[group.PROJECT_ADMIN], V=[group.PROJECT_MEMBER])
+RESTRICTED = PermissionScope.create(CR=[group.PROJECT_ADMIN], RV=[group.UNKNOWN_USER])
+
+
+def _oap(resource_iri: str, scope: PermissionScope, values: list[tuple[str, str, PermissionScope]]) -> Oap:
+    return Oap(
+        resource_oap=ResourceOap(scope=scope, resource_iri=resource_iri),
+        value_oaps=[
+            ValueOap(
+                scope=value_scope,
+                property=prop,
+                value_type=value_type,
+                value_iri=f"{resource_iri}/values/{i}",
+                resource_iri=resource_iri,
+            )
+            for i, (prop, value_type, value_scope) in enumerate(values)
+        ],
+    )
+
+
+@pytest.fixture
+def table() -> OapTable:
+    table = OapTable()
+    book = _oap(
+        "http://rdfh.ch/4123/book",
+        PRIVATE,
+        [("onto:hasTitle", "knora-api:TextValue", PRIVATE), ("onto:hasFile", "knora-api:StillImageFileValue", PRIVATE)],
+    )
+    table.extend([book], "onto:Book")
+    page = _oap("http://rdfh.ch/4123/page", PUBLIC, [("onto:hasTitle", "knora-api:TextValue", PRIVATE)])
+    table.extend([page], "onto:Page")
+    return table
+
+
+def test_first_matching_rule_wins(table: OapTable) -> None:
+    rules = [
+        OapRule(property="onto:hasFile", new_scope=RESTRICTED),
+        OapRule(resource_class="onto:Book", new_scope=PUBLIC),
+    ]
+    [modified_book] = apply_oap_rules(table, rules)
+    book = table.to_oaps()[0]
+    expected = ModifiedOap(
+        resource_oap=book.resource_oap.model_copy(update={"scope": PUBLIC}),
+        value_oaps=[
+            book.value_oaps[0].model_copy(update={"scope": PUBLIC}),
+            book.value_oaps[1].model_copy(update={"scope": RESTRICTED}),
+        ],
+    )
+    assert modified_book == expected
+
+
+def test_criteria(table: OapTable) -> None:
+    assert not apply_oap_rules(table, [OapRule(resource_class="onto:Other", new_scope=PUBLIC)])
+    modified = apply_oap_rules(table, [OapRule(applies_to="resources", new_scope=PUBLIC)])
+    assert [(m.resource_oap, len(m.value_oaps)) for m in modified] == [
+        (ResourceOap(scope=PUBLIC, resource_iri="http://rdfh.ch/4123/book"), 0)
+    ]
+    modified = apply_oap_rules(table, [OapRule(value_type="knora-api:TextValue", scope=PRIVATE, new_scope=PUBLIC)])
+    assert [m.resource_oap for m in modified] == [None, None]
+    assert [v.property for m in modified for v in m.value_oaps] == ["onto:hasTitle", "onto:hasTitle"]
+
+
+def test_rules_are_evaluated_once_per_group(table: OapTable) -> None:
+    new_scope = Mock(side_effect=lambda scope: scope.model_copy(update={"V": frozenset([group.KNOWN_USER])}))
+    modified = apply_oap_rules(table, [OapRule(applies_to="values", new_scope=new_scope)])
+    # the values "hasTitle" of the book and of the page differ only in their resource class
+    assert new_scope.call_count == 3
+    assert sum(len(m.value_oaps) for m in modified) == 3
+
+
+def test_list_of_oaps(table: OapTable) -> None:
+    oaps = table.to_oaps()
+    assert apply_oap_rules(oaps, [OapRule(new_scope=PUBLIC)]) == table.modified_oaps(lambda _: PUBLIC)
@@ -0,0 +1,121 @@
+from pathlib import Path
+from typing import Iterator
+from unittest.mock import Mock
+
+import pytest
+from pytest_unordered import unordered
+
+from dsp_permissions_scripts.models import group
+from dsp_permissions_scripts.models.scope import PUBLIC
+from dsp_permissions_scripts.models.scope import PermissionScope
+from dsp_permissions_scripts.oap.oap_get import get_all_oaps_of_project
+from dsp_permissions_scripts.oap.oap_get import get_oap_table_of_project
+from dsp_permissions_scripts.oap.oap_model import ModifiedOap
+from dsp_permissions_scripts.oap.oap_model import Oap
+from dsp_permissions_scripts.oap.oap_model import OapRetrieveConfig
+from dsp_permissions_scripts.oap.oap_model import ResourceOap
+from dsp_permissions_scripts.oap.oap_model import ValueOap
+from dsp_permissions_scripts.oap.oap_serialize import deserialize_oap_table
+from dsp_permissions_scripts.oap.oap_serialize import serialize_oap_table
+from dsp_permissions_scripts.oap.oap_table import OapTable
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeDspApi
+from dsp_permissions_scripts.testing.synthetic_project import SyntheticProjectConfig
+from dsp_permissions_scripts.testing.synthetic_project import generate_synthetic_project
+from dsp_permissions_scripts.utils import project
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+
+# ruff: noqa: PLR2004 (magic value used in comparison)
+
+PRIVATE = PermissionScope.create(CR=[group.PROJECT_ADMIN], V=[group.PROJECT_MEMBER])
+RES_1 = "http://rdfh.ch/4123/resource-1"
+RES_2 = "http://rdfh.ch/4123/resource-2"
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches() -> Iterator[None]:
+    project._caches.clear()
+    yield
+    project._caches.clear()
+
+
+def _value_oap(resource_iri: str, value_iri: str, scope: PermissionScope, prop: str = "onto:hasText") -> ValueOap:
+    return ValueOap(
+        scope=scope, property=prop, value_type="knora-api:TextValue", value_iri=value_iri, resource_iri=resource_iri
+    )
+
+
+@pytest.fixture
+def oaps() -> list[Oap]:
+    return [
+        Oap(
+            resource_oap=ResourceOap(scope=PRIVATE, resource_iri=RES_1),
+            value_oaps=[
+                _value_oap(RES_1, f"{RES_1}/values/v1", PUBLIC),
+                _value_oap(RES_1, f"{RES_1}/values/v2", PRIVATE, prop="onto:hasOtherText"),
+                _value_oap(RES_1, "http://rdfh.ch/4123/unusual-value-iri", PRIVATE),
+            ],
+        ),
+        Oap(resource_oap=ResourceOap(scope=PUBLIC, resource_iri=RES_2), value_oaps=[]),
+    ]
+
+
+def test_conversion(oaps: list[Oap]) -> None:
+    table = OapTable.from_oaps(oaps)
+    assert table.to_oaps() == oaps
+    assert len(table) == 2
+    assert table.value_count == 3
+    assert table.scopes == [PRIVATE, PUBLIC]
+    assert table.properties == ["onto:hasText", "onto:hasOtherText"]
+    assert table.value_types == ["knora-api:TextValue"]
+    assert table.value_iris == ["v1", "v2", "http://rdfh.ch/4123/unusual-value-iri"]
+
+
+def test_values_are_grouped_by_resource(oaps: list[Oap]) -> None:
+    table = OapTable()
+    table.add_resource_oap(oaps[0].resource_oap)
+    table.add_resource_oap(oaps[1].resource_oap)
+    value_of_res_2 = _value_oap(RES_2, f"{RES_2}/values/v3", PUBLIC)
+    for value_oap in [oaps[0].value_oaps[0], value_of_res_2, *oaps[0].value_oaps[1:]]:
+        table.add_value_oap(value_oap)
+    assert table.to_oaps() == [oaps[0], oaps[1].model_copy(update={"value_oaps": [value_of_res_2]})]
+
+
+def test_value_of_unknown_resource() -> None:
+    with pytest.raises(KeyError):
+        OapTable().add_value_oap(_value_oap(RES_1, f"{RES_1}/values/v1", PUBLIC))
+
+
+def test_modified_oaps(oaps: list[Oap]) -> None:
+    table = OapTable.from_oaps(oaps)
+    new_scope_of = Mock(side_effect=lambda _: PUBLIC)
+    modified = table.modified_oaps(new_scope_of)
+    assert new_scope_of.call_count == 2
+    expected = ModifiedOap(
+        resource_oap=ResourceOap(scope=PUBLIC, resource_iri=RES_1),
+        value_oaps=[v.model_copy(update={"scope": PUBLIC}) for v in oaps[0].value_oaps[1:]],
+    )
+    assert modified == [expected]
+    assert table.to_oaps() == oaps
+
+
+def test_serialization(oaps: list[Oap], tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    oaps[0].value_oaps.pop()  # the file names of the values are derived from "<resource IRI>/values/<id>"
+    serialize_oap_table(OapTable.from_oaps(oaps), "4123", "original")
+    deserialized = deserialize_oap_table("4123", "original")
+    assert deserialized.to_oaps() == unordered(
+        [oap.model_copy(update={"value_oaps": unordered(oap.value_oaps)}) for oap in oaps]
+    )
+
+
+def test_retrieval() -> None:
+    synthetic = generate_synthetic_project(SyntheticProjectConfig(n_resources=100, n_resclasses=3))
+    oap_config = OapRetrieveConfig(retrieve_resources="all", retrieve_values="all")
+    with FakeDspApi(projects=[synthetic.fake_project]) as api:
+        dsp_client = DspClient(api.url)
+        dsp_client.login("root@example.com", "test")
+        table = get_oap_table_of_project(synthetic.config.shortcode, dsp_client, oap_config)
+        oaps = get_all_oaps_of_project(synthetic.config.shortcode, dsp_client, oap_config)
+    assert table.to_oaps() == oaps
+    assert len(table.scopes) <= synthetic.config.n_permission_strings
+    assert set(table.resource_classes) <= set(synthetic.fake_project.resclasses)
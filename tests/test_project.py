@@ -0,0 +1,163 @@
+import json
+from pathlib import Path
+from typing import Any
+from typing import Iterator
+from unittest.mock import Mock
+from urllib.parse import quote_plus
+
+import pytest
+
+from dsp_permissions_scripts.oap.oap_model import OapRetrieveConfig
+from dsp_permissions_scripts.utils import project
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+from dsp_permissions_scripts.utils.project import get_all_resource_class_localnames_of_project
+from dsp_permissions_scripts.utils.project import get_proj_iri_and_onto_iris_by_shortcode
+from dsp_permissions_scripts.utils.project import invalidate_project_metadata_cache
+from dsp_permissions_scripts.utils.project import persist_project_metadata_cache
+
+ONTO_IRI = "http://0.0.0.0:3333/ontology/4123/testonto/v2"
+
+
+def _fake_get(route: str, last_modification_date: str = "2024-01-01T12:00:00Z") -> dict[str, Any]:
+    date = {"@type": "xsd:dateTimeStamp", "@value": last_modification_date}
+    if route.startswith("/admin/projects/shortcode/"):
+        return {"project": {"id": "http://rdfh.ch/projects/4123", "ontologies": [ONTO_IRI]}}
+    if route == "/v2/ontologies/metadata":
+        return {"@id": ONTO_IRI, "@type": "owl:Ontology", "knora-api:lastModificationDate": date}
+    return {
+        "@id": ONTO_IRI,
+        "knora-api:lastModificationDate": date,
+        "@graph": [
+            {"@id": "testonto:ImageThing", "knora-api:isResourceClass": True},
+            {"@id": "testonto:hasText", "knora-api:isResourceProperty": True},
+        ],
+        "@context": {"testonto": f"{ONTO_IRI}#"},
+    }
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches() -> Iterator[None]:
+    project._caches.clear()
+    yield
+    project._caches.clear()
+
+
+@pytest.fixture
+def dsp_client() -> DspClient:
+    return Mock(spec=DspClient, server="http://0.0.0.0:3333", get=Mock(side_effect=_fake_get))
+
+
+def test_project_metadata_is_fetched_once(dsp_client: Mock) -> None:
+    for _ in range(3):
+        proj_iri, onto_iris = get_proj_iri_and_onto_iris_by_shortcode("4123", dsp_client)
+        assert proj_iri == "http://rdfh.ch/projects/4123"
+        assert onto_iris == [ONTO_IRI]
+        onto_iris.clear()  # the caller must not be able to corrupt the cache
+    dsp_client.get.assert_called_once_with("/admin/projects/shortcode/4123")
+
+
+def test_cache_is_per_server(dsp_client: Mock) -> None:
+    other_client = Mock(spec=DspClient, server="https://api.dasch.swiss", get=Mock(side_effect=_fake_get))
+    get_proj_iri_and_onto_iris_by_shortcode("4123", dsp_client)
+    get_proj_iri_and_onto_iris_by_shortcode("4123", other_client)
+    dsp_client.get.assert_called_once()
+    other_client.get.assert_called_once()
+
+
+def test_ontologies_are_cached(dsp_client: Mock) -> None:
+    for _ in range(2):
+        oap_config = OapRetrieveConfig(retrieve_resources="all")
+        classes = get_all_resource_class_localnames_of_project([ONTO_IRI], dsp_client, oap_config)
+        assert classes == ["testonto:ImageThing"]
+        assert oap_config.context == {"testonto": f"{ONTO_IRI}#"}
+    dsp_client.get.assert_called_once()
+
+
+def test_invalidate(dsp_client: Mock) -> None:
+    _, onto_iris = get_proj_iri_and_onto_iris_by_shortcode("4123", dsp_client)
+    get_all_resource_class_localnames_of_project(onto_iris, dsp_client, OapRetrieveConfig(retrieve_resources="all"))
+    invalidate_project_metadata_cache(dsp_client, "4123")
+    _, onto_iris = get_proj_iri_and_onto_iris_by_shortcode("4123", dsp_client)
+    get_all_resource_class_localnames_of_project(onto_iris, dsp_client, OapRetrieveConfig(retrieve_resources="all"))
+    assert dsp_client.get.call_count == 4  # noqa: PLR2004 (magic value used in comparison)
+
+
+def test_persistence(dsp_client: Mock, tmp_path: Path) -> None:
+    cache_file = tmp_path / "project_metadata.json"
+    cache = persist_project_metadata_cache(dsp_client, cache_file)
+    _, onto_iris = get_proj_iri_and_onto_iris_by_shortcode("4123", dsp_client)
+    get_all_resource_class_localnames_of_project(onto_iris, dsp_client, OapRetrieveConfig(retrieve_resources="all"))
+    assert not cache_file.exists()  # the updates don't write the file, only save() does
+    cache.save()
+    assert cache_file.exists()
+
+    # simulate a new run: only the project and the cheap metadata request are necessary
+    project._caches.clear()
+    new_client = Mock(spec=DspClient, server="http://0.0.0.0:3333", get=Mock(side_effect=_fake_get))
+    persist_project_metadata_cache(new_client, cache_file)
+    proj_iri, onto_iris = get_proj_iri_and_onto_iris_by_shortcode("4123", new_client)
+    oap_config = OapRetrieveConfig(retrieve_resources="all")
+    classes = get_all_resource_class_localnames_of_project(onto_iris, new_client, oap_config)
+    classes = get_all_resource_class_localnames_of_project(onto_iris, new_client, oap_config)
+    assert proj_iri == "http://rdfh.ch/projects/4123"
+    assert classes == ["testonto:ImageThing"]
+    assert oap_config.context == {"testonto": f"{ONTO_IRI}#"}
+    assert [c.args[0] for c in new_client.get.call_args_list] == [
+        "/admin/projects/shortcode/4123",
+        "/v2/ontologies/metadata",
+    ]
+
+
+def test_persisted_onto_is_refetched_if_modified(dsp_client: Mock, tmp_path: Path) -> None:
+    cache_file = tmp_path / "project_metadata.json"
+    cache = persist_project_metadata_cache(dsp_client, cache_file)
+    get_all_resource_class_localnames_of_project([ONTO_IRI], dsp_client, OapRetrieveConfig(retrieve_resources="all"))
+    cache.save()
+
+    project._caches.clear()
+    new_client = Mock(
+        spec=DspClient,
+        server="http://0.0.0.0:3333",
+        get=Mock(side_effect=lambda route: _fake_get(route, last_modification_date="2024-06-01T08:00:00Z")),
+    )
+    new_cache = persist_project_metadata_cache(new_client, cache_file)
+    for _ in range(2):
+        get_all_resource_class_localnames_of_project(
+            [ONTO_IRI], new_client, OapRetrieveConfig(retrieve_resources="all")
+        )
+    new_cache.save()
+    assert [c.args[0] for c in new_client.get.call_args_list] == [
+        "/v2/ontologies/metadata",
+        f"/v2/ontologies/allentities/{quote_plus(ONTO_IRI)}",
+    ]
+    persisted = json.loads(cache_file.read_text(encoding="utf-8"))
+    assert persisted["ontologies"][ONTO_IRI]["last_modification_date"] == "2024-06-01T08:00:00Z"
+
+
+def test_unreadable_persisted_cache_is_ignored(dsp_client: Mock, tmp_path: Path) -> None:
+    cache_file = tmp_path / "project_metadata.json"
+    cache_file.write_text('{"projects": {"4123": {"project_iri": "http://rdfh.ch/pro', encoding="utf-8")
+    cache = persist_project_metadata_cache(dsp_client, cache_file)
+    proj_iri, _ = get_proj_iri_and_onto_iris_by_shortcode("4123", dsp_client)
+    cache.save()
+    assert proj_iri == "http://rdfh.ch/projects/4123"
+    assert json.loads(cache_file.read_text(encoding="utf-8"))["projects"]["4123"]["project_iri"] == proj_iri
+    assert [p.name for p in tmp_path.iterdir()] == [cache_file.name]
+
+
+def test_persisted_project_is_refetched_once_per_run(dsp_client: Mock, tmp_path: Path) -> None:
+    cache_file = tmp_path / "project_metadata.json"
+    cache = persist_project_metadata_cache(dsp_client, cache_file)
+    get_proj_iri_and_onto_iris_by_shortcode("4123", dsp_client)
+    cache.save()
+
+    # simulate a new run, after an ontology has been added to the project
+    project._caches.clear()
+    new_onto_iri = "http://0.0.0.0:3333/ontology/4123/newonto/v2"
+    new_response = {"project": {"id": "http://rdfh.ch/projects/4123", "ontologies": [ONTO_IRI, new_onto_iri]}}
+    new_client = Mock(spec=DspClient, server="http://0.0.0.0:3333", get=Mock(return_value=new_response))
+    persist_project_metadata_cache(new_client, cache_file)
+    for _ in range(2):
+        _, onto_iris = get_proj_iri_and_onto_iris_by_shortcode("4123", new_client)
+        assert onto_iris == [ONTO_IRI, new_onto_iri]
+    new_client.get.assert_called_once_with("/admin/projects/shortcode/4123")
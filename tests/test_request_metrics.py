@@ -0,0 +1,83 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeDspApi
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeProject
+from dsp_permissions_scripts.testing.fake_dsp_api import FaultConfig
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+from dsp_permissions_scripts.utils.request_metrics import RequestMetrics
+from dsp_permissions_scripts.utils.request_metrics import normalize_route
+
+# ruff: noqa: PLR2004 (magic value used in comparison)
+
+_SLEEP = "dsp_permissions_scripts.utils.dsp_client.time.sleep"
+
+
+@pytest.mark.parametrize(
+    ("url", "expected"),
+    [
+        ("http://0.0.0.0:3333/v2/resources/http%3A%2F%2Frdfh.ch%2F4123%2Fabc", "/v2/resources/{iri}"),
+        ("http://0.0.0.0:3333/v2/resources?resourceClass=http%3A%2F%2Fx&page=3", "/v2/resources"),
+        (
+            "http://0.0.0.0:3333/admin/permissions/http%3A%2F%2Frdfh.ch%2Fp/hasPermissions",
+            "/admin/permissions/{iri}/hasPermissions",
+        ),
+        ("http://0.0.0.0:3333/admin/projects/shortcode/4123", "/admin/projects/shortcode/{shortcode}"),
+        ("http://0.0.0.0:3333/v2/searchextended/PREFIX%20knora-api", "/v2/searchextended/{query}"),
+        ("http://0.0.0.0:3333/admin/groups", "/admin/groups"),
+    ],
+)
+def test_normalize_route(url: str, expected: str) -> None:
+    assert normalize_route(url) == expected
+
+
+def test_snapshot() -> None:
+    metrics = RequestMetrics()
+    metrics.record_response(
+        "GET", "/v2/resources/{iri}", status_code=200, seconds=0.02, request_bytes=0, response_bytes=10
+    )
+    metrics.record_response("GET", "/v2/resources/{iri}", status_code=500, seconds=3, request_bytes=0, response_bytes=5)
+    metrics.record_exception("GET", "/v2/resources/{iri}", exception=TimeoutError(), seconds=40)
+    metrics.record_retry("GET", "/v2/resources/{iri}", sleep_seconds=1)
+    metrics.record_retry("GET", "/v2/resources/{iri}", sleep_seconds=2)
+    metrics.record_response("PUT", "/v2/values", status_code=200, seconds=0.2, request_bytes=100, response_bytes=7)
+    snapshot = metrics.snapshot()
+    get = snapshot["routes"]["GET /v2/resources/{iri}"]
+    assert get["requests"] == 3
+    assert get["retries"] == 2
+    assert get["retry_sleep_seconds"] == 3
+    assert get["response_bytes"] == 15
+    assert get["outcomes"] == {"200": 1, "500": 1, "TimeoutError": 1}
+    assert get["latency_histogram"]["0.025"] == 1
+    assert get["latency_histogram"]["5.0"] == 1
+    assert get["latency_histogram"]["+Inf"] == 1
+    assert snapshot["totals"]["requests"] == 4
+    assert snapshot["totals"]["request_bytes"] == 100
+
+
+def test_write_prometheus(tmp_path: Path) -> None:
+    metrics = RequestMetrics()
+    metrics.record_response("GET", "/admin/groups", status_code=200, seconds=0.02, request_bytes=0, response_bytes=10)
+    metrics.write(tmp_path / "metrics.prom")
+    lines = (tmp_path / "metrics.prom").read_text(encoding="utf-8").splitlines()
+    assert 'dsp_requests_total{method="GET",route="/admin/groups"} 1' in lines
+    assert 'dsp_responses_total{method="GET",route="/admin/groups",outcome="200"} 1' in lines
+    assert 'dsp_request_duration_seconds_bucket{method="GET",route="/admin/groups",le="0.01"} 0' in lines
+    assert 'dsp_request_duration_seconds_bucket{method="GET",route="/admin/groups",le="0.025"} 1' in lines
+    assert 'dsp_request_duration_seconds_bucket{method="GET",route="/admin/groups",le="+Inf"} 1' in lines
+
+
+def test_dsp_client_records_requests_and_retries() -> None:
+    project = FakeProject(shortcode="4123", shortname="test", onto_name="testonto", resclasses=[])
+    faults = FaultConfig(error_rate=0.3, seed=1)
+    with FakeDspApi(projects=[project], faults=faults) as api, patch(_SLEEP):
+        dsp_client = DspClient(api.url)
+        for _ in range(20):
+            dsp_client.get("/admin/groups")
+    groups = dsp_client.metrics.snapshot()["routes"]["GET /admin/groups"]
+    assert groups["outcomes"]["200"] == 20
+    assert groups["retries"] == groups["outcomes"]["500"] > 0
+    assert groups["requests"] == api.request_counts["GET /admin/groups"]
+    assert groups["response_bytes"] > 0
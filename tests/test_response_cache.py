@@ -0,0 +1,142 @@
+import time
+from pathlib import Path
+from typing import Iterator
+from unittest.mock import patch
+from urllib.parse import quote_plus
+
+import pytest
+
+from dsp_permissions_scripts.ap.ap_batch import CreateAp
+from dsp_permissions_scripts.ap.ap_batch import execute_ap_operations
+from dsp_permissions_scripts.ap.ap_get import get_aps_of_project
+from dsp_permissions_scripts.ap.ap_model import ApValue
+from dsp_permissions_scripts.models import group
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeDspApi
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeProject
+from dsp_permissions_scripts.utils import project
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+from dsp_permissions_scripts.utils.response_cache import ResponseCache
+
+# ruff: noqa: PLR2004 (magic value used in comparison)
+
+ROUTE = "/admin/groups"
+URL = "http://api/admin/groups"
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches() -> Iterator[None]:
+    project._caches.clear()
+    yield
+    project._caches.clear()
+
+
+@pytest.fixture
+def api() -> Iterator[FakeDspApi]:
+    proj = FakeProject(shortcode="4123", shortname="test", onto_name="testonto", resclasses=[])
+    with FakeDspApi(projects=[proj]) as api:
+        yield api
+
+
+def test_responses_are_copied() -> None:
+    cache = ResponseCache()
+    content = {"groups": [1]}
+    cache.put(URL, ROUTE, content, cache.generation)
+    content["groups"].append(2)
+    cached = cache.get(URL, ROUTE)
+    assert cached == {"groups": [1]}
+    cached["groups"].append(3)
+    assert cache.get(URL, ROUTE) == {"groups": [1]}
+
+
+def test_expired_responses_are_dropped() -> None:
+    cache = ResponseCache(ttls={ROUTE: 10})
+    cache.put(URL, ROUTE, {}, cache.generation)
+    with patch("dsp_permissions_scripts.utils.response_cache.time.time", return_value=time.time() + 11):
+        assert cache.get(URL, ROUTE) is None
+    assert cache.snapshot()["entries"] == 0
+
+
+def test_least_recently_used_responses_are_evicted() -> None:
+    cache = ResponseCache(max_entries=2)
+    for i in range(2):
+        cache.put(f"{URL}/{i}", ROUTE, i, cache.generation)
+    cache.get(f"{URL}/0", ROUTE)
+    cache.put(f"{URL}/2", ROUTE, 2, cache.generation)
+    assert cache.get(f"{URL}/1", ROUTE) is None
+    assert cache.get(f"{URL}/0", ROUTE) == 0
+    assert cache.evictions == 1
+
+
+def test_responses_of_invalidated_generations_are_not_stored() -> None:
+    cache = ResponseCache()
+    generation = cache.generation
+    cache.invalidate()
+    cache.put(URL, ROUTE, {}, generation)
+    assert cache.get(URL, ROUTE) is None
+
+
+def test_mutations_invalidate_the_responses_of_their_project() -> None:
+    cache = ResponseCache()
+    route = "/admin/permissions/ap/{iri}"
+    for shortcode in ["0001", "0002"]:
+        url = f"http://api/admin/permissions/ap/{quote_plus(f'http://rdfh.ch/projects/{shortcode}', safe='')}"
+        cache.put(url, route, {"shortcode": shortcode}, cache.generation)
+    cache.put(URL, ROUTE, {}, cache.generation)
+    cache.invalidate_after_mutation("http://api/admin/permissions/ap", {"forProject": "http://rdfh.ch/projects/0001"})
+    assert cache.snapshot()["entries"] == 2
+    cache.invalidate_after_mutation("http://api/admin/permissions/http%3A%2F%2Frdfh.ch%2Fpermissions%2Fx", None)
+    assert cache.snapshot()["entries"] == 1
+    assert cache.get(URL, ROUTE) == {}
+
+
+def test_cache_is_persisted(tmp_path: Path) -> None:
+    path = tmp_path / "cache.json"
+    first_run = ResponseCache(path=path)
+    first_run.put(URL, ROUTE, {"groups": []}, 0)
+    assert not path.exists()  # the puts don't write the file, only save() does
+    first_run.save()
+    cache = ResponseCache(path=path)
+    cache.load()
+    assert cache.get(URL, ROUTE) == {"groups": []}
+
+
+def test_dsp_client_loads_the_cache_of_a_previous_run(api: FakeDspApi, tmp_path: Path) -> None:
+    path = tmp_path / "cache.json"
+    responses = []
+    for _ in range(2):
+        dsp_client = DspClient(api.url)
+        dsp_client.use_response_cache(cache := ResponseCache(path=path))
+        responses.append(dsp_client.get("/admin/groups"))
+        cache.save()
+    assert responses[0] == responses[1]
+    assert api.request_counts["GET /admin/groups"] == 1
+    assert cache.snapshot()["hits"] == 1
+
+
+def test_unreadable_cache_file_is_ignored(tmp_path: Path) -> None:
+    path = tmp_path / "cache.json"
+    path.write_text('{"entries": [{"url": ', encoding="utf-8")
+    cache = ResponseCache(path=path)
+    cache.load()
+    assert cache.snapshot()["entries"] == 0
+
+
+def test_dsp_client_uses_the_cache(api: FakeDspApi) -> None:
+    dsp_client = DspClient(api.url)
+    dsp_client.login("root@example.com", "test")
+    dsp_client.use_response_cache(ResponseCache())
+    for _ in range(3):
+        dsp_client.get("/admin/groups")
+        get_aps_of_project("4123", dsp_client)
+    assert api.request_counts["GET /admin/groups"] == 1
+    assert api.request_counts["GET /admin/permissions/ap/([^/]+)"] == 1
+
+    [result] = execute_ap_operations(
+        [CreateAp(group.PROJECT_MEMBER, (ApValue.ProjectResourceCreateAllPermission,))], "4123", dsp_client
+    )
+    assert result.success
+    assert len(get_aps_of_project("4123", dsp_client)) == 1
+    assert api.request_counts["GET /admin/permissions/ap/([^/]+)"] == 2
+    cache_metrics = dsp_client.metrics.snapshot()["response_cache"]
+    assert cache_metrics["hits"] > 0
+    assert 'dsp_response_cache_hits_total{route="/admin/groups"}' in dsp_client.metrics.to_prometheus()
@@ -0,0 +1,175 @@
+import time
+from email.utils import formatdate
+from typing import Iterator
+from unittest.mock import patch
+
+import pytest
+
+from dsp_permissions_scripts.models.errors import ApiError
+from dsp_permissions_scripts.models.errors import RetryLaterError
+from dsp_permissions_scripts.models.scope import PUBLIC
+from dsp_permissions_scripts.oap.oap_model import ModifiedOap
+from dsp_permissions_scripts.oap.oap_model import ResourceOap
+from dsp_permissions_scripts.oap.oap_set import apply_updated_oaps_on_server
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeDspApi
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeProject
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeResource
+from dsp_permissions_scripts.testing.fake_dsp_api import FaultConfig
+from dsp_permissions_scripts.utils import project
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+from dsp_permissions_scripts.utils.retry import RetryBudget
+from dsp_permissions_scripts.utils.retry import RetryPolicy
+from dsp_permissions_scripts.utils.retry import deferred_retries
+from dsp_permissions_scripts.utils.retry import parse_retry_after
+from dsp_permissions_scripts.utils.retry import run_with_retries
+from dsp_permissions_scripts.utils.scope_serialization import create_string_from_scope
+
+# ruff: noqa: PLR2004 (magic value used in comparison)
+
+_SLEEP = "dsp_permissions_scripts.utils.dsp_client.time.sleep"
+PERMS = "CR knora-admin:ProjectAdmin|V knora-admin:UnknownUser"
+FAST_POLICY = RetryPolicy(base_delay=0.001, max_delay=0.01, budget=None)
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches() -> Iterator[None]:
+    project._caches.clear()
+    yield
+    project._caches.clear()
+
+
+@pytest.fixture
+def fake_project() -> FakeProject:
+    proj = FakeProject(shortcode="4123", shortname="test", onto_name="testonto", resclasses=["testonto:Thing"])
+    for i in range(10):
+        proj.add_resource(FakeResource(f"http://rdfh.ch/4123/thing-{i}", "testonto:Thing", PERMS))
+    return proj
+
+
+def test_delays_grow_exponentially_up_to_the_cap() -> None:
+    policy = RetryPolicy(base_delay=1, max_delay=10, full_jitter=False)
+    assert [policy.get_delay(i) for i in range(6)] == [1, 2, 4, 8, 10, 10]
+    assert policy.get_delay(1000) == 10
+
+
+def test_full_jitter_stays_below_the_exponential_delay() -> None:
+    policy = RetryPolicy(base_delay=1, max_delay=10)
+    delays = [policy.get_delay(3) for _ in range(100)]
+    assert all(0 <= d <= 8 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_retry_after_is_respected_up_to_its_maximum() -> None:
+    policy = RetryPolicy(base_delay=1, full_jitter=False, max_retry_after=60)
+    assert policy.get_delay(0, retry_after=30) == 30
+    assert policy.get_delay(0, retry_after=3600) == 60
+    assert policy.get_delay(3, retry_after=2) == 8
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"), [("120", 120.0), (" 5 ", 5.0), ("soon", None), ("", None), (None, None)]
+)
+def test_parse_retry_after(value: str | None, expected: float | None) -> None:
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_date() -> None:
+    in_the_past = parse_retry_after(formatdate(timeval=time.time() - 100, usegmt=True))
+    assert in_the_past == 0
+    in_the_future = parse_retry_after(formatdate(timeval=time.time() + 100, usegmt=True))
+    assert in_the_future is not None
+    assert 95 <= in_the_future <= 100
+
+
+def test_budget_runs_out_and_is_refilled_by_successes() -> None:
+    budget = RetryBudget(max_tokens=2, refill_per_success=0.5)
+    assert budget.try_spend()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    budget.on_success()
+    assert not budget.try_spend()
+    budget.on_success()
+    assert budget.try_spend()
+    for _ in range(10):
+        budget.on_success()
+    assert budget.tokens == 2
+
+
+def test_deferred_items_are_run_again() -> None:
+    failures = {"a": 2, "b": 0, "c": 1}
+
+    def func(item: str) -> str:
+        if failures[item] > 0:
+            failures[item] -= 1
+            raise RetryLaterError(f"{item} failed", delay=0)
+        return item
+
+    results = run_with_retries(func, iter("abc"), nthreads=2, give_up=lambda item, _: f"gave up {item}")
+    assert sorted(results) == ["a", "b", "c"]
+
+
+def test_items_are_given_up_after_max_deferrals() -> None:
+    attempts: list[str] = []
+
+    def func(item: str) -> str:
+        attempts.append(item)
+        raise RetryLaterError(f"{item} failed", delay=0)
+
+    results = run_with_retries(func, ["a"], nthreads=1, give_up=lambda item, _: f"gave up {item}", max_deferrals=3)
+    assert results == ["gave up a"]
+    assert attempts == ["a"] * 4
+
+
+def test_dsp_client_raises_retry_later_error_within_deferred_retries(fake_project: FakeProject) -> None:
+    with FakeDspApi(projects=[fake_project], faults=FaultConfig(error_rate=1.0)) as api, patch(_SLEEP) as sleep:
+        dsp_client = DspClient(api.url, retry_policy=RetryPolicy(base_delay=4, full_jitter=False))
+        with deferred_retries(previous_deferrals=2), pytest.raises(RetryLaterError) as exc_info:
+            dsp_client.get("/admin/groups")
+    assert exc_info.value.delay == 16
+    sleep.assert_not_called()
+    assert api.request_counts["GET /admin/groups"] == 1
+
+
+def test_retry_after_header_is_respected(fake_project: FakeProject) -> None:
+    faults = FaultConfig(try_again_later_rate=1.0, retry_after=7)
+    policy = RetryPolicy(max_retries=2, base_delay=0.001, full_jitter=False)
+    with FakeDspApi(projects=[fake_project], faults=faults) as api, patch(_SLEEP) as sleep:
+        dsp_client = DspClient(api.url, retry_policy=policy)
+        dsp_client.get("/admin/groups")
+    assert [c.args for c in sleep.call_args_list] == [(7.0,), (7.0,)]
+
+
+def test_exhausted_budget_fails_fast(fake_project: FakeProject) -> None:
+    policy = RetryPolicy(base_delay=0.001, budget=RetryBudget(max_tokens=1))
+    with FakeDspApi(projects=[fake_project], faults=FaultConfig(error_rate=1.0)) as api, patch(_SLEEP) as sleep:
+        dsp_client = DspClient(api.url, retry_policy=policy)
+        with pytest.raises(ApiError, match="retry budget is exhausted"):
+            dsp_client.get("/admin/groups")
+    assert sleep.call_count == 1
+    assert api.request_counts["GET /admin/groups"] == 2
+
+
+def test_exhausted_budget_on_connection_errors_raises_api_error() -> None:
+    policy = RetryPolicy(base_delay=0.001, budget=RetryBudget(max_tokens=1))
+    dsp_client = DspClient("http://127.0.0.1:1", retry_policy=policy)
+    with patch(_SLEEP) as sleep, pytest.raises(ApiError, match="retry budget is exhausted"):
+        dsp_client.get("/admin/groups")
+    assert sleep.call_count == 1
+
+
+def test_budget_is_opt_in() -> None:
+    assert RetryPolicy().budget is None
+
+
+def test_failed_oap_updates_are_requeued(fake_project: FakeProject) -> None:
+    with FakeDspApi(projects=[fake_project]) as api, patch(_SLEEP) as sleep:
+        dsp_client = DspClient(api.url, retry_policy=FAST_POLICY)
+        dsp_client.login("root@example.com", "test")
+        api.faults = FaultConfig(error_rate=0.2, try_again_later_rate=0.1)
+        modified = [
+            ModifiedOap(resource_oap=ResourceOap(scope=PUBLIC, resource_iri=iri)) for iri in fake_project.resources
+        ]
+        apply_updated_oaps_on_server(modified, "4123", dsp_client, nthreads=4)
+    sleep.assert_not_called()
+    assert dsp_client.metrics.snapshot()["totals"]["retries"] > 0
+    assert {r.permissions for r in fake_project.resources.values()} == {create_string_from_scope(PUBLIC)}
@@ -0,0 +1,108 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from typing import Any
+from typing import Callable
+
+import pytest
+
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeDspApi
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeProject
+from dsp_permissions_scripts.testing.fake_dsp_api import FaultConfig
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+from dsp_permissions_scripts.utils.single_flight import SingleFlight
+
+# ruff: noqa: PLR2004 (magic value used in comparison)
+
+
+def _run_concurrently(single_flight: SingleFlight[str, int], func: Callable[[], int], nthreads: int) -> list[Any]:
+    """Calls func in nthreads threads, the first one starts a bit earlier"""
+    started = Event()
+
+    def leader_func() -> int:
+        started.set()
+        time.sleep(0.2)  # the other threads call in the meantime
+        return func()
+
+    def call(f: Callable[[], int]) -> Any:
+        try:
+            return single_flight.do("key", f)
+        except ValueError as err:
+            return err
+
+    with ThreadPoolExecutor(nthreads) as pool:
+        leader = pool.submit(call, leader_func)
+        started.wait(timeout=5)
+        followers = [pool.submit(call, func) for _ in range(nthreads - 1)]
+        return [leader.result()] + [f.result() for f in followers]
+
+
+def test_concurrent_calls_are_merged() -> None:
+    calls = 0
+
+    def func() -> int:
+        nonlocal calls
+        calls += 1
+        return 42
+
+    results = _run_concurrently(SingleFlight(), func, nthreads=4)
+    assert results == [(42, False), (42, True), (42, True), (42, True)]
+    assert calls == 1
+
+
+def test_exceptions_are_shared() -> None:
+    def func() -> int:
+        raise ValueError("failed")
+
+    single_flight: SingleFlight[str, int] = SingleFlight()
+    results = _run_concurrently(single_flight, func, nthreads=3)
+    assert all(isinstance(r, ValueError) for r in results)
+    assert not single_flight._in_flight
+
+
+def test_calls_after_the_leader_are_not_merged() -> None:
+    single_flight: SingleFlight[str, int] = SingleFlight()
+    assert single_flight.do("key", lambda: 1) == (1, False)
+    assert single_flight.do("key", lambda: 2) == (2, False)
+
+
+@pytest.mark.parametrize(("coalesced_routes", "expected_requests"), [(None, 1), (frozenset(), 8)])
+def test_dsp_client_coalesces_identical_gets(coalesced_routes: frozenset[str] | None, expected_requests: int) -> None:
+    project = FakeProject(shortcode="4123", shortname="test", onto_name="testonto", resclasses=[])
+    with FakeDspApi(projects=[project], faults=FaultConfig(latency=0.3)) as api:
+        dsp_client = DspClient(api.url)
+        if coalesced_routes is not None:
+            dsp_client.coalesced_routes = coalesced_routes
+        with ThreadPoolExecutor(8) as pool:
+            responses = list(pool.map(lambda _: dsp_client.get("/admin/groups"), range(8)))
+    assert all(r == responses[0] for r in responses)
+    assert len({id(r) for r in responses}) == 8
+    assert api.request_counts["GET /admin/groups"] == expected_requests
+    assert dsp_client.metrics.snapshot()["totals"]["coalesced"] == 8 - expected_requests
+
+
+def test_unshared_exceptions_make_the_followers_retry() -> None:
+    leader_started = Event()
+    calls = 0
+
+    def leader_func() -> int:
+        leader_started.set()
+        time.sleep(0.2)
+        raise KeyError("only meaningful for the leader")
+
+    def follower_func() -> int:
+        nonlocal calls
+        calls += 1
+        return 42
+
+    single_flight: SingleFlight[str, int] = SingleFlight(shared_exceptions=(ValueError,))
+    with ThreadPoolExecutor(3) as pool:
+        leader = pool.submit(single_flight.do, "key", leader_func)
+        leader_started.wait(timeout=5)
+        followers = [pool.submit(single_flight.do, "key", follower_func) for _ in range(2)]
+        with pytest.raises(KeyError):
+            leader.result()
+        results = sorted(f.result() for f in followers)
+    assert [value for value, _ in results] == [42, 42]
+    assert 1 <= calls <= 2
+    assert not single_flight._in_flight
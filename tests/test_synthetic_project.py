@@ -0,0 +1,125 @@
+from pathlib import Path
+from typing import Iterable
+from typing import Iterator
+
+import pytest
+from pytest_unordered import unordered
+
+from dsp_permissions_scripts.ap.ap_get import get_aps_of_project
+from dsp_permissions_scripts.ap.ap_serialize import deserialize_aps_of_project
+from dsp_permissions_scripts.doap.doap_get import get_doaps_of_project
+from dsp_permissions_scripts.doap.doap_serialize import deserialize_doaps_of_project
+from dsp_permissions_scripts.oap.oap_get import get_all_oaps_of_project
+from dsp_permissions_scripts.oap.oap_model import Oap
+from dsp_permissions_scripts.oap.oap_model import OapRetrieveConfig
+from dsp_permissions_scripts.oap.oap_serialize import deserialize_oaps
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeDspApi
+from dsp_permissions_scripts.testing.fake_dsp_api import FakeProject
+from dsp_permissions_scripts.testing.synthetic_project import SyntheticProjectConfig
+from dsp_permissions_scripts.testing.synthetic_project import _zipf_sizes
+from dsp_permissions_scripts.testing.synthetic_project import generate_synthetic_project
+from dsp_permissions_scripts.utils import project
+from dsp_permissions_scripts.utils.dsp_client import DspClient
+
+# ruff: noqa: PLR2004 (magic value used in comparison)
+
+CONFIG = SyntheticProjectConfig(n_resources=200, n_resclasses=5, kb_resource_ratio=0.05, values_per_resource=(0, 3))
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches() -> Iterator[None]:
+    project._caches.clear()
+    yield
+    project._caches.clear()
+
+
+def _normalized(oaps: Iterable[Oap]) -> list[Oap]:
+    """The order of the values depends on where the OAPs come from"""
+    return [oap.model_copy(update={"value_oaps": sorted(oap.value_oaps, key=lambda v: v.value_iri)}) for oap in oaps]
+
+
+def test_zipf_sizes() -> None:
+    sizes = _zipf_sizes(1000, 5, 1.0)
+    assert sum(sizes) == 1000
+    assert sizes == sorted(sizes, reverse=True)
+    assert sizes[0] > 2 * sizes[1] - 5
+
+
+def test_generation_is_reproducible() -> None:
+    first = generate_synthetic_project(CONFIG)
+    second = generate_synthetic_project(CONFIG)
+    assert list(first.fake_project.resources) == list(second.fake_project.resources)
+    assert list(first.iter_oaps()) == list(second.iter_oaps())
+    other_seed = generate_synthetic_project(SyntheticProjectConfig(n_resources=200, seed=1))
+    assert list(first.fake_project.resources) != list(other_seed.fake_project.resources)
+
+
+def test_shape() -> None:
+    synthetic = generate_synthetic_project(CONFIG)
+    fake_project = synthetic.fake_project
+    assert len(fake_project.resources) == 200
+    assert (
+        len(fake_project.resources_of_class("knora-api:Region"))
+        + len(fake_project.resources_of_class("knora-api:LinkObj"))
+        == 10
+    )
+    assert len(synthetic.scopes) == CONFIG.n_permission_strings
+    used = {r.permissions for r in fake_project.resources.values()}
+    assert used <= set(synthetic.scopes)
+    assert any("synthetic:group" in s for s in synthetic.scopes)
+
+
+def test_fake_server_serves_the_synthetic_project() -> None:
+    synthetic = generate_synthetic_project(CONFIG)
+    with FakeDspApi(projects=[synthetic.fake_project]) as api:
+        dsp_client = DspClient(api.url)
+        dsp_client.login("root@example.com", "test")
+        oap_config = OapRetrieveConfig(retrieve_resources="all", retrieve_values="all")
+        oaps = get_all_oaps_of_project(CONFIG.shortcode, dsp_client, oap_config)
+        aps = get_aps_of_project(CONFIG.shortcode, dsp_client)
+        doaps = get_doaps_of_project(CONFIG.shortcode, dsp_client)
+    assert _normalized(oaps) == unordered(_normalized(synthetic.iter_oaps()))
+    assert aps == unordered(synthetic.aps)
+    assert [d.scope for d in doaps] == [d.scope for d in synthetic.doaps]
+
+
+def test_write_project_data(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    synthetic = generate_synthetic_project(CONFIG)
+    synthetic.write_project_data()
+    assert deserialize_oaps(CONFIG.shortcode, "original") == unordered(_normalized(synthetic.iter_oaps()))
+    assert deserialize_aps_of_project(CONFIG.shortcode, "original") == synthetic.aps
+    assert deserialize_doaps_of_project(CONFIG.shortcode, "original") == synthetic.doaps
+
+
+def test_write_server_fixture(tmp_path: Path) -> None:
+    synthetic = generate_synthetic_project(CONFIG)
+    synthetic.write_server_fixture(tmp_path / "fixture.json")
+    loaded = FakeProject.load(tmp_path / "fixture.json")
+    assert loaded == synthetic.fake_project
+    assert loaded.resources_of_class("synthonto:Class000") == synthetic.fake_project.resources_of_class(
+        "synthonto:Class000"
+    )
+
+
+@pytest.mark.parametrize(
+    "oap_config",
+    [
+        OapRetrieveConfig(retrieve_resources="all", retrieve_values="all"),
+        OapRetrieveConfig(
+            retrieve_resources="specified_res_classes",
+            specified_res_classes=["synthonto:Class000", "synthonto:Class001"],
+            retrieve_values="specified_props",
+            specified_props=["synthonto:hasProp0"],
+        ),
+    ],
+)
+def test_parsing_in_worker_processes_gives_the_same_oaps(oap_config: OapRetrieveConfig) -> None:
+    synthetic = generate_synthetic_project(CONFIG)
+    with FakeDspApi(projects=[synthetic.fake_project]) as api:
+        dsp_client = DspClient(api.url)
+        dsp_client.login("root@example.com", "test")
+        serial = get_all_oaps_of_project(CONFIG.shortcode, dsp_client, oap_config)
+        parallel = get_all_oaps_of_project(CONFIG.shortcode, dsp_client, oap_config, parse_processes=2)
+    assert serial
+    assert _normalized(parallel) == unordered(_normalized(serial))